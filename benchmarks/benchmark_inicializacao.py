@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos pesados que não devem ser carregados só para abrir a tela inicial
+MODULOS_PESADOS = ("pandas", "requests", "selenium", "webdriver_manager", "classe_requisicoes",
+                   "classe_navegador", "classe_auto")
+
+_SCRIPT_IMPORTACAO = """
+import json, sys, time
+inicio = time.perf_counter()
+import classe_aplicacao_web
+duracao = time.perf_counter() - inicio
+print(json.dumps({"segundos": duracao, "carregados": [m for m in %r if m in sys.modules]}))
+"""
+
+_SCRIPT_RENDERIZACAO = """
+import json, time
+from streamlit.testing.v1 import AppTest
+inicio = time.perf_counter()
+app = AppTest.from_string("from classe_aplicacao_web import WebApp\\nWebApp().run()", default_timeout=120)
+app.run()
+primeira = time.perf_counter() - inicio
+inicio = time.perf_counter()
+app.run()
+segunda = time.perf_counter() - inicio
+print(json.dumps({"primeira": primeira, "reexecucao": segunda, "erros": [str(e.value) for e in app.exception]}))
+"""
+
+
+def _executar(script):
+    # Cada medição roda em um interpretador novo, para medir a importação a frio
+    saida = subprocess.run([sys.executable, "-c", script], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def medir_importacao(repeticoes):
+    """
+    Mede o tempo de 'import classe_aplicacao_web' em interpretadores novos.
+
+    Args:
+        repeticoes (int): Quantidade de medições.
+
+    Returns:
+        dict: Mediana e mínimo em ms, e os módulos pesados que foram carregados.
+    """
+    medicoes = [_executar(_SCRIPT_IMPORTACAO % (MODULOS_PESADOS,)) for _ in range(repeticoes)]
+    tempos = [medicao["segundos"] * 1000 for medicao in medicoes]
+    return {
+        "importacao_mediana_ms": round(statistics.median(tempos), 1),
+        "importacao_minimo_ms": round(min(tempos), 1),
+        "modulos_pesados_carregados": medicoes[-1]["carregados"],
+    }
+
+
+def medir_renderizacao(repeticoes):
+    """
+    Mede a primeira execução do app (importações + primeira tela) e uma reexecução,
+    usando o AppTest do Streamlit, sem abrir o navegador.
+
+    Args:
+        repeticoes (int): Quantidade de medições.
+
+    Returns:
+        dict: Medianas em ms da primeira execução e da reexecução.
+    """
+    medicoes = [_executar(_SCRIPT_RENDERIZACAO) for _ in range(repeticoes)]
+    erros = [erro for medicao in medicoes for erro in medicao["erros"]]
+    if erros:
+        raise RuntimeError(f"O app falhou ao renderizar: {erros[0]}")
+    return {
+        "primeira_renderizacao_mediana_ms": round(statistics.median(m["primeira"] for m in medicoes) * 1000, 1),
+        "reexecucao_mediana_ms": round(statistics.median(m["reexecucao"] for m in medicoes) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de importação e da primeira tela do app Streamlit.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--sem-renderizacao", action="store_true", help="Mede apenas a importação.")
+    args = parser.parse_args()
+
+    resultado = medir_importacao(args.repeticoes)
+    if not args.sem_renderizacao:
+        resultado.update(medir_renderizacao(args.repeticoes))
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
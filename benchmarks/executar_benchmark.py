@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classe_requisicoes import RequisicoesLiberty
+from classe_requisicoes.limitador import LimitadorTaxa
+from classe_requisicoes.catalogo import ESTRATEGIAS, CatalogoLote, executar_agenda, ordenar_itens
+from classe_rastreamento import RASTREADOR
+from benchmarks.servidor_simulado import ConfiguracaoServidor, ServidorSimulado
+
+CENARIOS = ("auto", "auto_detectando", "danos_eletricos", "auto_planejado")
+
+
+class RequisicoesMedidas(RequisicoesLiberty):
+    """
+    RequisicoesLiberty que registra a duração de cada download de arquivo.
+
+    A duração medida vai do pedido até o último byte gravado em disco,
+    incluindo novas tentativas. Downloads com a extensão identificada pelo
+    conteúdo também são medidos; os que falham (extensão errada na URL) não.
+
+    Atributos:
+        latencias (list): Duração, em segundos, de cada download concluído.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencias = []
+        self._lock_latencias = threading.Lock()
+
+    def _baixar_para_arquivo(self, sessao, url, caminho_final, retomar=False, **kwargs):
+        inicio = time.perf_counter()
+        arquivo = super()._baixar_para_arquivo(sessao, url, caminho_final, retomar=retomar, **kwargs)
+        self._registrar_latencia(inicio)
+        return arquivo
+
+    def _baixar_detectando_extensao(self, sessao, url, pasta, nome_base, **kwargs):
+        inicio = time.perf_counter()
+        resultado = super()._baixar_detectando_extensao(sessao, url, pasta, nome_base, **kwargs)
+        self._registrar_latencia(inicio)
+        return resultado
+
+    def _registrar_latencia(self, inicio):
+        with self._lock_latencias:
+            self.latencias.append(time.perf_counter() - inicio)
+
+
+def percentil(valores, p):
+    """
+    Percentil por interpolação linear.
+
+    Args:
+        valores (list): Amostras.
+        p (float): Percentil entre 0 e 100.
+
+    Returns:
+        float: Valor do percentil, ou None sem amostras.
+    """
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def pico_memoria_mb():
+    """
+    Pico de memória residente (RSS) do processo atual.
+
+    Usa o módulo resource (Linux/macOS) ou, no Windows, o psutil se estiver instalado.
+
+    Returns:
+        float: Pico de RSS em MB, ou None se não for possível medir.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está em KB no Linux e em bytes no macOS
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def processo_auto(requisicoes, sessao, processo, detectar_extensao):
+    documentos = requisicoes.obter_documentos_auto(sessao, processo)
+    if detectar_extensao:
+        arquivos = requisicoes.download_documentos_auto_detectando(sessao, documentos, processo)
+    else:
+        documentos = requisicoes.adicionar_extensoes_auto(sessao, documentos, processo)
+        arquivos = requisicoes.download_documentos_auto_concorrente(sessao, documentos, processo)
+    return [arquivo for arquivo in arquivos if arquivo is not None]
+
+
+def processo_danos_eletricos(requisicoes, sessao, processo):
+    documentos = requisicoes.obter_documentos_danos_eletricos(sessao, processo)
+    arquivos = requisicoes.download_documentos_danos_eletricos_concorrente(documentos, processo)
+    return [arquivo for arquivo in arquivos if arquivo["caminho"] is not None]
+
+
+def lote_planejado(requisicoes, sessao, processos, processos_simultaneos, downloads_simultaneos, estrategia):
+    # Catálogo de todos os processos, tamanhos por HEAD e uma única agenda de transferências
+    catalogo = CatalogoLote("auto").carregar(requisicoes, sessao, processos, max_workers=processos_simultaneos)
+    catalogo.medir_tamanhos(requisicoes, sessao, max_workers=downloads_simultaneos)
+    itens = ordenar_itens(catalogo.itens, estrategia)
+    agenda = executar_agenda(requisicoes, sessao, itens, max_workers=downloads_simultaneos * processos_simultaneos)
+    return [arquivo for _, arquivo in agenda if arquivo is not None], len(catalogo.erros)
+
+
+def executar_cenario(cenario, url_base, processos, processos_simultaneos, downloads_simultaneos, limitador,
+                     estrategia="maior_primeiro"):
+    """
+    Executa um fluxo completo (login, metadados e downloads) contra o servidor informado.
+
+    Args:
+        cenario (str): 'auto', 'auto_detectando', 'danos_eletricos' ou 'auto_planejado'.
+        url_base (str): URL do servidor simulado.
+        processos (list): Números dos processos.
+        processos_simultaneos (int): Processos executados ao mesmo tempo.
+        downloads_simultaneos (int): Downloads simultâneos por host.
+        limitador (LimitadorTaxa): Limitador de taxa usado pelas requisições.
+        estrategia (str): Ordem das transferências no cenário 'auto_planejado' (ver ordenar_itens).
+
+    Returns:
+        dict: Métricas do cenário.
+    """
+    requisicoes = RequisicoesMedidas("benchmark", "benchmark", limitador=limitador,
+                                     limites_por_host={"127.0.0.1": downloads_simultaneos,
+                                                       "localhost": downloads_simultaneos})
+    requisicoes.url_autenticacao = f"{url_base}/api/sessao/autenticacaousuario"
+    requisicoes.url_portal_integracao = f"{url_base}/LibertySinistroUpload"
+    requisicoes.url_upload_residencia = url_base
+    requisicoes.criar_gerenciador_sessao(tamanho_pool=downloads_simultaneos * processos_simultaneos)
+
+    def tarefa(processo):
+        if cenario == "danos_eletricos":
+            return processo_danos_eletricos(requisicoes, sessao, processo)
+        return processo_auto(requisicoes, sessao, processo, cenario == "auto_detectando")
+
+    inicio = time.perf_counter()
+    sessao = requisicoes.fazer_login()
+    falhas = 0
+    arquivos = []
+    if cenario == "auto_planejado":
+        arquivos, falhas = lote_planejado(requisicoes, sessao, processos, processos_simultaneos,
+                                          downloads_simultaneos, estrategia)
+    else:
+        with ThreadPoolExecutor(max_workers=processos_simultaneos) as executor:
+            for futuro in [executor.submit(tarefa, processo) for processo in processos]:
+                try:
+                    arquivos.extend(futuro.result())
+                except Exception:
+                    falhas += 1
+    # Documentos que falharam são tentados de novo no fim do lote, como no app
+    arquivos.extend(arquivo for _, arquivo in requisicoes.fila_repeticao.drenar(espera_base=0.1))
+    duracao = time.perf_counter() - inicio
+    requisicoes.gerenciador_sessao.fechar()
+    requisicoes.fechar_sessao_transferencias()
+
+    total_bytes = sum(arquivo["tamanho"] if isinstance(arquivo, dict) else arquivo.tamanho for arquivo in arquivos)
+    return {
+        "cenario": cenario,
+        "processos": len(processos),
+        "processos_com_falha": falhas,
+        "documentos": len(arquivos),
+        "documentos_com_falha": len(requisicoes.fila_repeticao),
+        "segundos": round(duracao, 3),
+        "documentos_por_segundo": round(len(arquivos) / duracao, 2),
+        "mb_por_segundo": round(total_bytes / duracao / (1024 * 1024), 2),
+        "latencia_p50_ms": _milissegundos(percentil(requisicoes.latencias, 50)),
+        "latencia_p95_ms": _milissegundos(percentil(requisicoes.latencias, 95)),
+        "pico_rss_mb": _arredondar(pico_memoria_mb()),
+        "etapas": requisicoes.metricas.tabela_etapas(),
+    }
+
+
+def _milissegundos(segundos):
+    return None if segundos is None else round(segundos * 1000, 1)
+
+
+def _arredondar(valor):
+    return None if valor is None else round(valor, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede a vazão dos fluxos AUTO e danos elétricos contra o servidor simulado."
+    )
+    parser.add_argument("--cenarios", nargs="+", choices=CENARIOS, default=list(CENARIOS))
+    parser.add_argument("--processos", type=int, default=5)
+    parser.add_argument("--processos-simultaneos", type=int, default=1)
+    parser.add_argument("--downloads-simultaneos", type=int, default=4)
+    parser.add_argument("--estrategia", choices=list(ESTRATEGIAS), default="maior_primeiro",
+                        help="Ordem das transferências no cenário auto_planejado.")
+    parser.add_argument("--taxa-inicial", type=float, default=50.0,
+                        help="Requisições por segundo no início (o padrão do app é 1, lento demais para medir).")
+    parser.add_argument("--taxa-maxima", type=float, default=500.0)
+    parser.add_argument("--url", help="Usa um servidor simulado já em execução em vez de iniciar um.")
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--variacao-latencia", type=float, default=0.0)
+    parser.add_argument("--tamanho-arquivo", type=int, default=256 * 1024)
+    parser.add_argument("--banda", type=float, default=0)
+    parser.add_argument("--documentos-por-processo", type=int, default=10)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados.")
+    parser.add_argument("--rastro", help="Arquivo onde salvar a linha do tempo (Chrome trace) de todos os cenários.")
+    args = parser.parse_args()
+
+    servidor = None
+    url_base = args.url
+    if url_base is None:
+        configuracao = ConfiguracaoServidor(
+            latencia=args.latencia, variacao_latencia=args.variacao_latencia, tamanho_arquivo=args.tamanho_arquivo,
+            banda=args.banda, documentos_por_processo=args.documentos_por_processo, taxa_erro=args.taxa_erro,
+            taxa_429=args.taxa_429, retry_after=args.retry_after,
+        )
+        servidor = ServidorSimulado(configuracao).iniciar()
+        url_base = servidor.url_base()
+        # Com o servidor no mesmo processo, o pico de RSS inclui a memória dele
+        print(f"Servidor simulado em {url_base} (no mesmo processo)")
+
+    processos = list(range(1, args.processos + 1))
+    if args.rastro:
+        RASTREADOR.ativar()
+    resultados = []
+    diretorio_original = os.getcwd()
+    try:
+        for cenario in args.cenarios:
+            # Os fluxos gravam em download/ e dados/ relativos à pasta atual
+            with tempfile.TemporaryDirectory() as pasta, RASTREADOR.span(cenario, "cenario"):
+                os.chdir(pasta)
+                try:
+                    limitador = LimitadorTaxa(taxa_inicial=args.taxa_inicial, taxa_maxima=args.taxa_maxima,
+                                              capacidade=args.taxa_inicial)
+                    resultado = executar_cenario(cenario, url_base, processos, args.processos_simultaneos,
+                                                 args.downloads_simultaneos, limitador, args.estrategia)
+                finally:
+                    os.chdir(diretorio_original)
+            resultados.append(resultado)
+            print(json.dumps(resultado, ensure_ascii=False))
+    finally:
+        if servidor is not None:
+            servidor.parar()
+
+    if args.rastro:
+        RASTREADOR.salvar(args.rastro)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Primeiros bytes de cada tipo de arquivo servido, para a detecção por conteúdo funcionar
+_ASSINATURAS = {
+    "pdf": b"%PDF-1.4\n",
+    "png": b"\x89PNG\r\n\x1a\n",
+    "jpg": b"\xff\xd8\xff\xe0",
+}
+_EXTENSOES = tuple(_ASSINATURAS)
+_TAMANHO_BLOCO = 64 * 1024
+
+_ROTA_AUTENTICACAO = "/api/sessao/autenticacaousuario"
+_ROTA_CARREGA_DOCUMENTOS = "/LibertySinistroUpload/Upload/PUD_Default_Novo.aspx/CarregaDocumentosNecessarios"
+_ROTA_RECEBER_DOCUMENTO = "/LibertySinistroUpload/Upload/PUD_Default_Novo.aspx/ReceberDocumentoOnBase"
+_PADRAO_FILE_UPLOAD = re.compile(r"^/LibertySinistroUpload/file_upload/(\d+)_api\.(\w+)$")
+_PADRAO_SOLICITADOS = re.compile(r"^/tipodocumento/solicitados/2/1400/2/(\d+)/96011528$")
+_PADRAO_EXIBIR = re.compile(r"^/tipoDocOcorrencia/exibir/(\d+)/(\w+)/2/(\d+)$")
+_PADRAO_ARQUIVO = re.compile(r"^/arquivos/(\d+)\.(\w+)$")
+_PADRAO_RANGE = re.compile(r"^bytes=(\d+)-$")
+
+
+class ConfiguracaoServidor:
+    """
+    Parâmetros do servidor simulado.
+
+    Atributos:
+        latencia (float): Atraso, em segundos, antes de cada resposta.
+        variacao_latencia (float): Atraso extra sorteado entre 0 e este valor.
+        tamanho_arquivo (int): Tamanho, em bytes, de cada arquivo servido.
+        banda (float): Limite de bytes por segundo por download (0 = sem limite).
+        documentos_por_processo (int): Documentos retornados para cada processo.
+        taxa_erro (float): Probabilidade de responder 500.
+        taxa_429 (float): Probabilidade de responder 429 com Retry-After.
+        retry_after (float): Valor do Retry-After, em segundos, nas respostas 429.
+        semente (int): Semente do sorteio de latências e falhas.
+    """
+
+    def __init__(self, latencia=0.05, variacao_latencia=0.0, tamanho_arquivo=256 * 1024, banda=0,
+                 documentos_por_processo=10, taxa_erro=0.0, taxa_429=0.0, retry_after=1.0, semente=0):
+        self.latencia = latencia
+        self.variacao_latencia = variacao_latencia
+        self.tamanho_arquivo = tamanho_arquivo
+        self.banda = banda
+        self.documentos_por_processo = documentos_por_processo
+        self.taxa_erro = taxa_erro
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.semente = semente
+
+
+class _ManipuladorLiberty(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LibertySimulado/1.0"
+
+    def log_message(self, formato, *args):
+        pass
+
+    @property
+    def configuracao(self):
+        return self.server.configuracao
+
+    def do_POST(self):
+        self._atender()
+
+    def do_GET(self):
+        self._atender()
+
+    def do_HEAD(self):
+        self._atender()
+
+    def _atender(self):
+        corpo = self._ler_corpo()
+        self.server.contar(self.path)
+
+        time.sleep(self.configuracao.latencia + self.server.sortear() * self.configuracao.variacao_latencia)
+        if self.path != _ROTA_AUTENTICACAO:
+            if self.server.sortear() < self.configuracao.taxa_429:
+                self._responder_json({"message": "Too Many Requests"}, status=429,
+                                     headers={"Retry-After": str(self.configuracao.retry_after)})
+                return
+            if self.server.sortear() < self.configuracao.taxa_erro:
+                self._responder_json({"message": "Erro simulado"}, status=500)
+                return
+
+        caminho = self.path.split("?", 1)[0]
+        if self.command == "POST" and caminho == _ROTA_AUTENTICACAO:
+            self._responder_json({"autenticado": True}, headers={"Set-Cookie": "sessao_simulada=1; Path=/"})
+        elif self.command == "POST" and caminho == _ROTA_CARREGA_DOCUMENTOS:
+            self._carrega_documentos(corpo)
+        elif self.command == "POST" and caminho == _ROTA_RECEBER_DOCUMENTO:
+            self._receber_documento(corpo)
+        elif self.command == "GET" and _PADRAO_SOLICITADOS.match(caminho):
+            self._solicitados(int(_PADRAO_SOLICITADOS.match(caminho).group(1)))
+        elif self.command == "GET" and _PADRAO_EXIBIR.match(caminho):
+            self._exibir(int(_PADRAO_EXIBIR.match(caminho).group(3)))
+        elif self.command in ("GET", "HEAD") and (_PADRAO_FILE_UPLOAD.match(caminho) or _PADRAO_ARQUIVO.match(caminho)):
+            padrao = _PADRAO_FILE_UPLOAD.match(caminho) or _PADRAO_ARQUIVO.match(caminho)
+            self._arquivo(int(padrao.group(1)), padrao.group(2))
+        else:
+            self._responder_json({"message": "Rota não encontrada"}, status=404)
+
+    def _ler_corpo(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if not tamanho:
+            return {}
+        try:
+            return json.loads(self.rfile.read(tamanho))
+        except ValueError:
+            return {}
+
+    def _responder_json(self, dados, status=200, headers=None):
+        corpo = json.dumps(dados).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _url_base(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def _carrega_documentos(self, corpo):
+        processo = int(corpo.get("pNumeroOcorrencia") or 0)
+        documentos = [
+            {
+                "NomeDocumento": f"Documento {indice % 3}",
+                "CodigoTipoDocumento": 100 + indice % 3,
+                "IDOnbase": self.server.id_documento(processo, indice),
+            }
+            for indice in range(self.configuracao.documentos_por_processo)
+        ]
+        # A plataforma devolve tipos de documento ainda não enviados com IDOnbase 0
+        documentos.append({"NomeDocumento": "Pendente", "CodigoTipoDocumento": 999, "IDOnbase": 0})
+        self._responder_json({"d": documentos})
+
+    def _receber_documento(self, corpo):
+        id_onbase = int(corpo.get("idOnBase") or 0)
+        extensao = self.server.extensao(id_onbase)
+        link = f"{self._url_base()}/LibertySinistroUpload/file_upload/{id_onbase}_api.{extensao}"
+        self._responder_json({"d": {"Result": link}})
+
+    def _solicitados(self, processo):
+        tipos = {}
+        for indice in range(self.configuracao.documentos_por_processo):
+            tipos.setdefault(indice % 3, []).append({"idOnbase": self.server.id_documento(processo, indice)})
+        dados = [
+            {"codigo": 200 + tipo, "descricao": f"Tipo/{tipo}", "documentosOcorrencia": documentos}
+            for tipo, documentos in tipos.items()
+        ]
+        # ETag pelo conteúdo, para exercitar a revalidação condicional (If-None-Match -> 304)
+        etag = '"' + hashlib.sha256(json.dumps(dados).encode("utf-8")).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._responder_json(dados, headers={"ETag": etag})
+
+    def _exibir(self, id_onbase):
+        extensao = self.server.extensao(id_onbase)
+        self._responder_json({"message": f"{self._url_base()}/arquivos/{id_onbase}.{extensao}?assinatura=simulada"})
+
+    def _arquivo(self, id_onbase, extensao_pedida):
+        extensao = self.server.extensao(id_onbase)
+        # Como a plataforma, a URL só existe com a extensão real do arquivo
+        if extensao_pedida != extensao:
+            self._responder_json({"message": "Arquivo não encontrado"}, status=404)
+            return
+        conteudo = self.server.conteudo(extensao)
+        inicio = 0
+        padrao = _PADRAO_RANGE.match(self.headers.get("Range") or "")
+        if padrao:
+            inicio = int(padrao.group(1))
+            if inicio >= len(conteudo):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(conteudo)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {inicio}-{len(conteudo) - 1}/{len(conteudo)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(conteudo) - inicio))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        visao = memoryview(conteudo)
+        for posicao in range(inicio, len(conteudo), _TAMANHO_BLOCO):
+            bloco = visao[posicao:posicao + _TAMANHO_BLOCO]
+            self.wfile.write(bloco)
+            self.server.contar_bytes(len(bloco))
+            if self.configuracao.banda:
+                time.sleep(len(bloco) / self.configuracao.banda)
+
+
+class ServidorSimulado(ThreadingHTTPServer):
+    """
+    Servidor HTTP local que imita as rotas da plataforma usadas por RequisicoesLiberty.
+
+    Atende autenticacaousuario, CarregaDocumentosNecessarios, ReceberDocumentoOnBase,
+    file_upload/{id}_api.{ext}, tipodocumento/solicitados e tipoDocOcorrencia/exibir
+    (cujo link aponta para /arquivos/{id}.{ext}, no papel do storage assinado).
+    Latência, tamanho dos arquivos, erros e respostas 429 são configuráveis.
+
+    Atributos:
+        configuracao (ConfiguracaoServidor): Parâmetros do servidor.
+        requisicoes (dict): Quantidade de requisições recebidas por rota.
+        bytes_enviados (int): Total de bytes de arquivos enviados.
+
+    Métodos:
+        - url_base(): URL do servidor, ex: http://127.0.0.1:8765.
+        - iniciar(): Atende em uma thread em segundo plano.
+        - parar(): Encerra o servidor.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, configuracao=None, host="127.0.0.1", porta=0):
+        super().__init__((host, porta), _ManipuladorLiberty)
+        self.configuracao = configuracao or ConfiguracaoServidor()
+        self.requisicoes = {}
+        self.bytes_enviados = 0
+        self._aleatorio = random.Random(self.configuracao.semente)
+        self._conteudos = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def url_base(self):
+        host, porta = self.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.shutdown()
+        self.server_close()
+
+    def sortear(self):
+        with self._lock:
+            return self._aleatorio.random()
+
+    def contar(self, caminho):
+        rota = re.sub(r"\d+", "{n}", caminho.split("?", 1)[0])
+        with self._lock:
+            self.requisicoes[rota] = self.requisicoes.get(rota, 0) + 1
+
+    def contar_bytes(self, quantidade):
+        with self._lock:
+            self.bytes_enviados += quantidade
+
+    @staticmethod
+    def id_documento(processo, indice):
+        return processo * 1000 + indice + 1
+
+    @staticmethod
+    def extensao(id_onbase):
+        return _EXTENSOES[id_onbase % len(_EXTENSOES)]
+
+    def conteudo(self, extensao):
+        # O conteúdo é o mesmo para todos os arquivos de uma extensão; gerado uma vez só
+        with self._lock:
+            if extensao not in self._conteudos:
+                assinatura = _ASSINATURAS[extensao]
+                tamanho = max(self.configuracao.tamanho_arquivo, len(assinatura))
+                self._conteudos[extensao] = assinatura + bytes(tamanho - len(assinatura))
+            return self._conteudos[extensao]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que simula a plataforma Yelum/Liberty.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--variacao-latencia", type=float, default=0.0)
+    parser.add_argument("--tamanho-arquivo", type=int, default=256 * 1024)
+    parser.add_argument("--banda", type=float, default=0)
+    parser.add_argument("--documentos-por-processo", type=int, default=10)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    configuracao = ConfiguracaoServidor(
+        latencia=args.latencia, variacao_latencia=args.variacao_latencia, tamanho_arquivo=args.tamanho_arquivo,
+        banda=args.banda, documentos_por_processo=args.documentos_por_processo, taxa_erro=args.taxa_erro,
+        taxa_429=args.taxa_429, retry_after=args.retry_after, semente=args.semente,
+    )
+    servidor = ServidorSimulado(configuracao, args.host, args.porta)
+    print(f"Servidor simulado em {servidor.url_base()}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
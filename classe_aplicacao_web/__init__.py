@@ -1,19 +1,41 @@
 import streamlit as st
-import pandas as pd
 import os
 import shutil
-import zipfile
-from classe_requisicoes import RequisicoesLiberty
-from classe_navegador import LibertyAutomation
-from classe_auto import Procedimentos as Procedimentos_auto
-
+import threading
 import time
+from collections import Counter
+from classe_aplicacao_web.execucao import ExecutorProcessos, ResultadoProcesso
+from classe_rastreamento import RASTREADOR
+
+# O Streamlit executa o script de novo a cada interação. pandas, requests, selenium e
+# webdriver_manager só são importados dentro dos métodos, quando o pipeline que usa
+# cada um começa; a tela inicial carrega apenas o streamlit.
 
 class WebApp:
     def __init__(self):
         self.login_credencial = None
         self.senha_credencial = None
         self.tipo_processo = None
+        self.modo_auto = None
+        self.downloads_simultaneos = 1
+        self.processos_simultaneos = 1
+        self.retomar_lote = False
+        self.sincronizacao_incremental = False
+        self.usar_armazem = False
+        self.planejar_lote = False
+        self.estrategia_transferencias = "maior_primeiro"
+        self.medir_tamanhos = False
+        self.gerar_rastro = False
+        self.rastreador = None
+        self.modo_zip = "Não gerar"
+        # Fora de qualquer pasta servida pelo Streamlit: os pacotes só saem pelo download_button
+        self.pasta_pacotes = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pacotes")
+        # O download_button carrega o arquivo inteiro na memória do servidor
+        self.tamanho_maximo_download_mb = 200
+        self.caminho_manifesto = "manifesto_downloads.sqlite3"
+        self.caminho_cache_extensoes = "cache_extensoes.sqlite3"
+        self.caminho_cache_metadados = "cache_metadados.sqlite3"
+        self.caminho_armazem = "armazem"
         self.caminho = r"C:\Users\Vitor\Documents\Repositórios\automação\ressarcimento_requisicoes\dados"
 
     def run(self):
@@ -26,10 +48,16 @@ class WebApp:
         st.header("Configuração para download")
         self.get_credenciais()
         self.select_tipo_processo()
+        self.select_rastreamento()
 
         if self.login_credencial and self.senha_credencial and self.tipo_processo:
             if self.tipo_processo == "AUTO":
-                self.processos_auto_pipeline()
+                if self.modo_auto == "Somente requisições (sem navegador)":
+                    self.processos_auto_pipeline_requisicoes()
+                elif self.modo_auto == "Híbrido (login no navegador, downloads por requisições)":
+                    self.processos_auto_pipeline_requisicoes(hibrido=True)
+                else:
+                    self.processos_auto_pipeline()
             elif self.tipo_processo == "DANOS ELÉTRICOS":
                 self.processos_danos_eletricos_pipeline()
 
@@ -45,14 +73,350 @@ class WebApp:
     def select_tipo_processo(self):
         st.subheader("Tipo de Processo")
         self.tipo_processo = st.selectbox("Você deseja baixar as informações de qual tipo de Processo?", ("AUTO", "DANOS ELÉTRICOS"))
+        if self.tipo_processo == "AUTO":
+            self.modo_auto = st.selectbox("Como os documentos AUTO devem ser baixados?", ("Navegador (Chrome)", "Somente requisições (sem navegador)", "Híbrido (login no navegador, downloads por requisições)"))
+
+    def select_rastreamento(self):
+        self.gerar_rastro = st.checkbox("Gerar linha do tempo da execução (Chrome trace, para análise de desempenho)", value=False)
+
+    def iniciar_rastreamento(self):
+        # Um rastreador por execução: as outras sessões do servidor continuam com o seu (ou sem nenhum)
+        self.rastreador = RASTREADOR.inscrever() if self.gerar_rastro else None
+
+    def encerrar_rastreamento(self):
+        if self.rastreador is not None:
+            RASTREADOR.cancelar_inscricao(self.rastreador)
+
+    def exportar_rastro(self):
+        if self.rastreador is None:
+            return
+        self.encerrar_rastreamento()
+        st.download_button("Baixar linha do tempo (abrir em ui.perfetto.dev)", self.rastreador.json(),
+                           file_name="linha_do_tempo.json", mime="application/json")
+
+    def select_downloads_simultaneos(self):
+        st.subheader("Downloads simultâneos")
+        self.downloads_simultaneos = st.number_input("Quantos documentos baixar ao mesmo tempo em cada processo?", min_value=1, max_value=16, value=1, step=1)
+
+    def limite_por_host(self):
+        # O semáforo do host é único para o lote: cada processo simultâneo tem direito às suas vagas
+        return self.downloads_simultaneos * self.processos_simultaneos
+
+    def select_processos_simultaneos(self):
+        st.subheader("Processos simultâneos")
+        self.processos_simultaneos = st.number_input("Quantos processos executar ao mesmo tempo?", min_value=1, max_value=8, value=1, step=1)
+
+    def select_retomar_lote(self):
+        st.subheader("Retomada")
+        self.retomar_lote = st.checkbox("Pular documentos já baixados em execuções anteriores", value=True)
+        self.sincronizacao_incremental = st.checkbox(
+            "Baixar apenas documentos novos desde a última execução (mesmo que as pastas dos processos tenham sido apagadas)",
+            value=False,
+        )
+
+    def select_armazem(self):
+        self.usar_armazem = st.checkbox("Reaproveitar arquivos já baixados em outros processos (sem baixar de novo)", value=True)
+
+    def select_planejamento(self):
+        st.subheader("Planejamento do lote")
+        self.planejar_lote = st.checkbox("Listar os documentos de todos os processos antes de baixar (catálogo, ordem das transferências e previsão de término)", value=False)
+        if self.planejar_lote:
+            # Mesmas chaves de classe_requisicoes.catalogo.ESTRATEGIAS (não importado aqui para não carregar o requests)
+            estrategias = {"maior_primeiro": "Maiores primeiro", "round_robin": "Alternando entre processos",
+                           "planilha": "Ordem da planilha"}
+            self.estrategia_transferencias = st.selectbox("Ordem das transferências", list(estrategias), format_func=estrategias.get)
+            self.medir_tamanhos = st.checkbox("Consultar o tamanho dos arquivos antes (uma requisição HEAD por documento AUTO)", value=True)
+
+    def select_empacotamento(self):
+        st.subheader("Pacote ZIP")
+        self.modo_zip = st.selectbox("Gerar um ZIP com os arquivos baixados?", ("Não gerar", "Um ZIP para o lote", "Um ZIP por processo"))
+
+    def criar_empacotamento(self, tarefa, pasta_base):
+        # Cada processo entra no ZIP assim que termina, enquanto os outros ainda estão baixando
+        from classe_aplicacao_web.empacotamento import EmpacotadorZip, remover_pacotes_antigos
+
+        if self.modo_zip == "Não gerar":
+            return tarefa, []
+        # Os pacotes de execuções anteriores não ficam no disco indefinidamente
+        remover_pacotes_antigos(self.pasta_pacotes)
+        carimbo = time.strftime("%Y%m%d_%H%M%S")
+        pacote_lote = None
+        if self.modo_zip == "Um ZIP para o lote":
+            pacote_lote = EmpacotadorZip(os.path.join(self.pasta_pacotes, f"lote_{carimbo}.zip"))
+        pacotes = [pacote_lote] if pacote_lote is not None else []
+
+        def empacotar(processo, emitir):
+            pasta = os.path.join(pasta_base, str(processo))
+            if not os.path.isdir(pasta):
+                return
+            try:
+                with RASTREADOR.span(f"empacotar {processo}", "etapa"):
+                    if pacote_lote is not None:
+                        pacote_lote.adicionar_pasta(pasta, prefixo=str(processo))
+                    else:
+                        with EmpacotadorZip(os.path.join(self.pasta_pacotes, f"{processo}_{carimbo}.zip")) as pacote:
+                            pacote.adicionar_pasta(pasta, prefixo=str(processo))
+                        pacotes.append(pacote)
+            except OSError as e:
+                emitir(f"Problema ao adicionar o processo {processo} ao ZIP: {e}", "warning")
+
+        def tarefa_empacotada(processo, emitir):
+            try:
+                return tarefa(processo, emitir)
+            finally:
+                # Também empacota o que foi baixado quando o processo falha no meio
+                empacotar(processo, emitir)
+
+        # Usado de novo para os processos com documentos recuperados no fim do lote
+        tarefa_empacotada.empacotar = empacotar
+        return tarefa_empacotada, pacotes
+
+    def empacotar_recuperados(self, tarefa, recuperados):
+        empacotar = getattr(tarefa, "empacotar", None)
+        if empacotar is None:
+            return
+        for processo in recuperados:
+            empacotar(processo, lambda mensagem, tipo="write": st.warning(mensagem, icon="⚠️"))
+
+    def oferecer_pacotes(self, pacotes):
+        if not pacotes:
+            return
+        st.subheader("Pacotes ZIP")
+        # Um ZIP por processo refeito no fim do lote substitui o anterior com o mesmo caminho
+        pacotes = sorted({pacote.caminho: pacote for pacote in pacotes}.values(), key=lambda pacote: pacote.caminho)
+        for pacote in pacotes:
+            pacote.fechar()
+
+        if len(pacotes) > 1:
+            # Um botão por processo manteria todos os ZIPs na memória da sessão ao mesmo tempo
+            st.info(f"{len(pacotes)} pacotes gravados em {self.pasta_pacotes}. "
+                    "Para baixar pelo navegador, escolha um ZIP para o lote.")
+            st.text("\n".join(
+                f"{os.path.basename(pacote.caminho)} ({os.path.getsize(pacote.caminho) / (1024 * 1024):.1f} MB)"
+                for pacote in pacotes
+            ))
+            return
+
+        pacote = pacotes[0]
+        nome = os.path.basename(pacote.caminho)
+        tamanho_mb = os.path.getsize(pacote.caminho) / (1024 * 1024)
+        if tamanho_mb > self.tamanho_maximo_download_mb:
+            st.warning(f"{nome} tem {tamanho_mb:.1f} MB, acima do limite de {self.tamanho_maximo_download_mb} MB "
+                       f"para download pelo navegador. O arquivo ficou em {pacote.caminho}.", icon="⚠️")
+            return
+        # Enviado apenas para a sessão que gerou o pacote (sem URL pública no servidor)
+        with open(pacote.caminho, "rb") as arquivo:
+            st.download_button(f"Baixar {nome} ({tamanho_mb:.1f} MB)", arquivo, file_name=nome,
+                               mime="application/zip", key=nome)
+
+    def criar_manifesto(self):
+        # O modo incremental compara a listagem atual com a registrada no manifesto
+        if self.retomar_lote or self.sincronizacao_incremental:
+            from classe_requisicoes import ManifestoDownloads
+            return ManifestoDownloads(self.caminho_manifesto)
+        return None
+
+    def criar_armazem(self):
+        # Os arquivos das pastas dos processos viram hardlinks para o armazém (mesmo disco)
+        if self.usar_armazem:
+            from classe_requisicoes import ArmazemConteudo
+            return ArmazemConteudo(self.caminho_armazem)
+        return None
+
+    def obter_documentos(self, requisicoes, sessao, processo, fluxo, emitir):
+        if not self.sincronizacao_incremental:
+            if fluxo == "danos_eletricos":
+                return requisicoes.obter_documentos_danos_eletricos(sessao, processo)
+            return requisicoes.obter_documentos_auto(sessao, processo)
+        documentos = requisicoes.sincronizar_documentos(sessao, processo, fluxo)
+        emitir(f"{len(documentos)} documento(s) novo(s) desde a última execução.")
+        return documentos
+
+    def fechar_requisicoes(self, requisicoes):
+        requisicoes.gerenciador_sessao.fechar()
+        requisicoes.fechar_sessao_transferencias()
+        for recurso in (requisicoes.cache_extensoes, requisicoes.cache_metadados, requisicoes.manifesto, requisicoes.armazem):
+            if recurso is not None:
+                recurso.fechar()
+
+    def executar_processos(self, processos, tarefa, metricas=None):
+        barra_progresso = st.progress(0.0, text="Nenhum processo concluído")
+        painel_metricas = st.empty() if metricas is not None else None
+
+        def ao_evento(evento):
+            if evento.tipo == "warning":
+                st.warning(evento.mensagem, icon="⚠️")
+            else:
+                st.write(evento.mensagem)
+
+        def ao_concluir(concluidos, total):
+            barra_progresso.progress(concluidos / total, text=f"{concluidos} de {total} processos concluídos")
+            if painel_metricas is not None:
+                with painel_metricas.container():
+                    self.mostrar_metricas(metricas)
+
+        executor = ExecutorProcessos(self.processos_simultaneos)
+        return executor.executar(processos, tarefa, ao_evento, ao_concluir)
+
+    def baixar_orcamentos(self, processos, baixar_orcamento):
+        # Retorna os processos cujo orçamento falhou
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.processos_simultaneos) as executor:
+            futuros = {processo: executor.submit(baixar_orcamento, processo) for processo in processos}
+        problemas = set()
+        for processo, futuro in futuros.items():
+            try:
+                futuro.result()
+            except Exception as e:
+                problemas.add(processo)
+                st.warning(f"Problema no download do orçamento do processo {processo}: {e}", icon="⚠️")
+        return problemas
+
+    def mostrar_catalogo(self, catalogo):
+        import io
+        import pandas as pd
+
+        contagens = catalogo.contagens()
+        total_mb = sum(linha["MB conhecidos"] for linha in contagens)
+        sem_tamanho = sum(linha["Sem tamanho"] for linha in contagens)
+        st.write(f"Catálogo: {len(catalogo.itens)} documentos em {len(contagens)} processos, "
+                 f"{total_mb:.1f} MB conhecidos" + (f" ({sem_tamanho} sem tamanho informado)." if sem_tamanho else "."))
+        st.dataframe(pd.DataFrame(contagens), hide_index=True)
+        arquivo = io.BytesIO()
+        catalogo.salvar(arquivo)
+        st.download_button("Baixar catálogo (Parquet)", arquivo.getvalue(), file_name="catalogo_lote.parquet",
+                           mime="application/vnd.apache.parquet")
+
+    def executar_planejado(self, requisicoes, sessao, processos, fluxo, pasta_base, baixar_orcamento=None, detectar_extensao=False):
+        # Lote planejado: metadados de todos os processos em paralelo, uma agenda única de
+        # transferências para o lote inteiro e previsão de término pelo progresso em bytes
+        from classe_requisicoes.catalogo import CatalogoLote, EstimativaTermino, executar_agenda, ordenar_itens
+
+        processos = list(processos)
+        problemas_orcamento = self.baixar_orcamentos(processos, baixar_orcamento) if baixar_orcamento else set()
+
+        st.write("Listando os documentos de todos os processos...")
+        # As listagens são requisições curtas ao mesmo host: usam todas as vagas do host, não as de processos
+        catalogo = CatalogoLote(fluxo).carregar(requisicoes, sessao, processos, max_workers=self.limite_por_host(),
+                                                resolver_extensoes=not detectar_extensao,
+                                                incremental=self.sincronizacao_incremental)
+        for processo, erro in catalogo.erros.items():
+            st.warning(f"Problema ao listar os documentos do processo {processo}: {erro}", icon="⚠️")
+        if self.medir_tamanhos and fluxo == "auto":
+            catalogo.medir_tamanhos(requisicoes, sessao, max_workers=self.downloads_simultaneos)
+        self.mostrar_catalogo(catalogo)
+
+        itens = ordenar_itens(catalogo.itens, self.estrategia_transferencias)
+        estimativa = EstimativaTermino(itens)
+        barra_progresso = st.progress(0.0, text=estimativa.texto())
+        tarefa, pacotes = self.criar_empacotamento(None, pasta_base)
+        empacotar = getattr(tarefa, "empacotar", None)
+        avisar = lambda mensagem, tipo="write": st.warning(mensagem, icon="⚠️")
+        restantes = Counter(item.processo for item in itens)
+        baixados = Counter()
+        falhas = Counter()
+
+        for item, arquivo in executar_agenda(requisicoes, sessao, itens, max_workers=self.limite_por_host()):
+            estimativa.registrar(item, arquivo)
+            (baixados if arquivo is not None else falhas)[item.processo] += 1
+            restantes[item.processo] -= 1
+            if restantes[item.processo] == 0 and empacotar is not None:
+                empacotar(item.processo, avisar)
+            barra_progresso.progress(estimativa.fracao(), text=estimativa.texto())
+
+        if empacotar is not None:
+            for processo in processos:
+                if processo not in restantes:
+                    empacotar(processo, avisar)
+
+        resultados = [
+            ResultadoProcesso(processo, None, catalogo.erros[processo]) if processo in catalogo.erros
+            else ResultadoProcesso(processo, (baixados[processo], falhas[processo], processo in problemas_orcamento), None)
+            for processo in processos
+        ]
+        return resultados, tarefa, pacotes
+
+    def mostrar_metricas(self, metricas):
+        # Onde o tempo está indo: etapas do pipeline e cada endpoint chamado
+        import pandas as pd
+
+        st.caption("Etapas")
+        st.dataframe(pd.DataFrame(metricas.tabela_etapas()), hide_index=True)
+        st.caption("Endpoints")
+        st.dataframe(pd.DataFrame(metricas.tabela_endpoints()), hide_index=True)
+
+    def exportar_metricas(self, metricas):
+        st.subheader("Métricas")
+        self.mostrar_metricas(metricas)
+        st.download_button("Baixar métricas (JSON)", metricas.json(), file_name="metricas.json", mime="application/json")
+        st.download_button("Baixar métricas (Prometheus)", metricas.prometheus(), file_name="metricas.prom", mime="text/plain")
+
+    def repetir_adiados(self, requisicoes):
+        # Documentos que falharam são tentados de novo no fim do lote, com espera exponencial e jitter
+        fila = requisicoes.fila_repeticao
+        if not len(fila):
+            return {}
+        st.write(f"Tentando de novo {len(fila)} documento(s) que falharam...")
+        recuperados = Counter(item.processo for item, _ in fila.drenar())
+        if len(fila):
+            st.warning(f"{len(fila)} documento(s) continuam com falha.", icon="⚠️")
+        return recuperados
+
+    def mostrar_resumo(self, df_processo_show, resultados, recuperados=None):
+        # Cada tarefa retorna (documentos baixados, documentos com falha ou None se desconhecido, problema)
+        recuperados = recuperados or {}
+        lista_docs_baixados = []
+        lista_docs_falha = []
+        lista_situacao = []
+        lista_docs_problema = []
+        for resultado in resultados:
+            if resultado.erro is not None:
+                lista_docs_baixados.append(0)
+                lista_docs_falha.append(None)
+                lista_situacao.append("Falhou")
+                lista_docs_problema.append(resultado.processo)
+                continue
+            documentos_baixados, documentos_falha, flag_problema = resultado.resultado
+            recuperado = recuperados.get(resultado.processo, 0)
+            documentos_baixados += recuperado
+            if documentos_falha is not None:
+                documentos_falha -= recuperado
+            lista_docs_baixados.append(documentos_baixados)
+            lista_docs_falha.append(documentos_falha)
+            if documentos_falha:
+                lista_situacao.append("Parcial" if documentos_baixados else "Falhou")
+            elif flag_problema:
+                lista_situacao.append("Com problema")
+            else:
+                lista_situacao.append("Completo")
+            if documentos_falha or flag_problema:
+                lista_docs_problema.append(resultado.processo)
+
+        st.subheader("Geral")
+        df_processo_show['Documentos Baixados'] = lista_docs_baixados
+        df_processo_show['Documentos com Falha'] = lista_docs_falha
+        df_processo_show['Situação'] = lista_situacao
+        st.table(df_processo_show)
+
+        for doc in lista_docs_problema:
+            st.warning(f'Problema no download no processo {str(doc)}', icon="⚠️")
+
+    def ler_planilha(self, excel_file):
+        # Retorna a planilha de processos e uma cópia com o número do processo como texto, para exibição
+        import pandas as pd
+
+        df_processo = pd.read_excel(excel_file)
+        df_processo_show = df_processo.copy()
+        df_processo_show['Processo'] = df_processo_show['Processo'].astype('str')
+        return df_processo, df_processo_show
 
     def create_zip(self, folder_path, output_filename):
-        with zipfile.ZipFile(output_filename, 'w') as zipf:
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    zipf.write(os.path.join(root, file),
-                               os.path.relpath(os.path.join(root, file),
-                               os.path.join(folder_path, '..')))
+        # Formatos já comprimidos (pdf, jpg, png, docx...) entram sem recompressão
+        from classe_aplicacao_web.empacotamento import EmpacotadorZip
+
+        with EmpacotadorZip(output_filename) as pacote:
+            pacote.adicionar_pasta(folder_path, prefixo=os.path.basename(os.path.normpath(folder_path)))
                     
     def delete_files_and_folders_in_directory(self, directory_path):
         # Remove todos os arquivos e subpastas na pasta
@@ -65,14 +429,18 @@ class WebApp:
     def processos_auto_pipeline(self):
         st.subheader("Orçamento")
         opcao_orcamento = st.selectbox("Você deseja baixar as informações do orçamento?", ("Não", "Sim"))
+        self.select_processos_simultaneos()
+        st.subheader("Navegador")
+        headless = st.checkbox("Executar o navegador sem janela (headless)", value=False)
+        max_usos_navegador = st.number_input("Reiniciar cada navegador depois de quantos processos?", min_value=1, max_value=100, value=20, step=1)
+        capturar_rede = st.checkbox("Capturar os links dos documentos na rede e baixar por HTTP (sem cliques)", value=False)
+        self.select_empacotamento()
 
         st.subheader("Processo")
         excel_file = st.file_uploader('Insira um arquivo com o número dos processos', type='xlsx')
 
         if excel_file is not None:
-            df_processo = pd.read_excel(excel_file)
-            df_processo_show = df_processo.copy()
-            df_processo_show['Processo'] = df_processo_show['Processo'].astype('str')
+            df_processo, df_processo_show = self.ler_planilha(excel_file)
 
             st.subheader("Procedimento")
 
@@ -81,107 +449,231 @@ class WebApp:
             #self.delete_files_and_folders_in_directory("dados")
 
             if botao_iniciar:
-                lista_docs_baixados = []
-                lista_docs_problema = []
+                from classe_navegador.pool import PoolNavegadores
+
+                self.iniciar_rastreamento()
                 with st.status("Fazendo download dos arquivos ..."):
-                    for processo in df_processo.Processo:
-                        st.write(f'**Iniciando procedimento para o processo: {processo}**')
-                        navegador = LibertyAutomation(self.caminho, processo)  # Instanciando a classe LibertyAutomation
-                        #navegador.configurar_navegador_para_download(self.caminho, processo)
-                        st.write("Configuração concluída")
-                        navegador.realizar_login_liberty(self.login_credencial, self.senha_credencial)
-                        st.write("Login concluído.")
-                        navegador.localizar_processo()
-                        
-                        procedimentos = Procedimentos_auto(navegador)  # Instanciando a classe Procedimentos
-
-                        if opcao_orcamento == "Sim":
-                            try:
-                                procedimentos.baixar_orcamento()
-                                st.write("Download do orçamento concluído.")
-                            except:
-                                navegador.navegador.close()
-                                lista_docs_problema.append(processo)
-                                st.write("Problema no download do orçamento.")
-                                navegador = LibertyAutomation(self.caminho, processo)  # Reinstancia o navegador
-
-                                navegador.realizar_login_liberty(self.login_credencial, self.senha_credencial)
-                                navegador.localizar_processo()
-                                procedimentos = Procedimentos_auto(navegador)
-
-                        documentos_baixados, flag_problema = procedimentos.downloads()
-                        if flag_problema:
-                            lista_docs_problema.append(processo)
-                        lista_docs_baixados.append(documentos_baixados)
-                        st.write("Download dos documentos concluído.")
-
-                st.subheader("Geral")
-                df_processo_show['Documentos Baixados'] = lista_docs_baixados
-                st.table(df_processo_show)
-
-                for doc in lista_docs_problema:
-                    st.warning(f'Problema no download no processo {str(doc)}', icon="⚠️")
+                    pool = PoolNavegadores(self.caminho, self.login_credencial, self.senha_credencial,
+                                           tamanho=self.processos_simultaneos, max_usos=max_usos_navegador,
+                                           headless=headless, capturar_rede=capturar_rede)
+                    tarefa, pacotes = self.criar_empacotamento(
+                        lambda processo, emitir: self.processo_auto(pool, processo, emitir, opcao_orcamento, capturar_rede),
+                        self.caminho,
+                    )
+                    try:
+                        resultados = self.executar_processos(df_processo.Processo, tarefa)
+                    finally:
+                        pool.fechar()
+                        self.encerrar_rastreamento()
+
+                self.mostrar_resumo(df_processo_show, resultados)
+                self.oferecer_pacotes(pacotes)
+                self.exportar_rastro()
 
                 st.button("Reiniciar Procedimento")
 
+    def processo_auto(self, pool, processo, emitir, opcao_orcamento, capturar_rede=False):
+        from classe_auto import Procedimentos as Procedimentos_auto
+
+        flag_problema_orcamento = False
+        emitir(f'**Iniciando procedimento para o processo: {processo}**')
+        navegador = pool.obter(processo)  # Navegador já logado, com a pasta de download do processo
+        emitir("Configuração e login concluídos.")
+        descartar = False
+        try:
+            navegador.localizar_processo()
+
+            procedimentos = Procedimentos_auto(navegador)  # Instanciando a classe Procedimentos
+
+            if opcao_orcamento == "Sim":
+                try:
+                    procedimentos.baixar_orcamento()
+                    emitir("Download do orçamento concluído.")
+                except:
+                    flag_problema_orcamento = True
+                    emitir("Problema no download do orçamento.")
+                    navegador = pool.substituir(navegador, processo)  # Troca o navegador por um novo
+
+                    navegador.localizar_processo()
+                    procedimentos = Procedimentos_auto(navegador)
+
+            if capturar_rede:
+                documentos_baixados, flag_problema, arquivos_baixados = procedimentos.downloads_por_rede(fechar_navegador=False)
+            else:
+                documentos_baixados, flag_problema, arquivos_baixados = procedimentos.downloads(fechar_navegador=False)
+            emitir(f"Download dos documentos concluído: {', '.join(arquivos_baixados) or 'nenhum arquivo'}.")
+        except Exception:
+            descartar = True
+            raise
+        finally:
+            pool.devolver(navegador, descartar=descartar)
+
+        return documentos_baixados, None, flag_problema or flag_problema_orcamento
+
+
+    def processos_auto_pipeline_requisicoes(self, hibrido=False):
+        from classe_requisicoes import RequisicoesLiberty
 
-    def processos_auto_pipeline_requisicoes(self):
         st.subheader("Orçamento")
-        opcao_orcamento = st.selectbox("Você deseja baixar as informações do orçamento?", ("Não", "Sim"))
+        if hibrido or RequisicoesLiberty.orcamento_sem_navegador():
+            opcao_orcamento = st.selectbox("Você deseja baixar as informações do orçamento?", ("Não", "Sim"))
+        else:
+            # Sem as rotas dos relatórios, o orçamento só é gerado pela página: este modo não abre navegador
+            opcao_orcamento = "Não"
+            st.info("O orçamento depende do navegador enquanto as rotas dos relatórios não forem configuradas. "
+                    "Use o modo Híbrido para baixá-lo.")
+        headless = False
+        if hibrido:
+            st.subheader("Navegador")
+            headless = st.checkbox("Executar o navegador sem janela (headless)", value=False)
+        self.select_processos_simultaneos()
+        self.select_downloads_simultaneos()
+        self.select_retomar_lote()
+        self.select_armazem()
+        st.subheader("Extensões")
+        detectar_extensao = st.checkbox("Identificar a extensão pelo conteúdo do arquivo (menos requisições)", value=False)
+        self.select_planejamento()
+        self.select_empacotamento()
 
         st.subheader("Processo")
         excel_file = st.file_uploader('Insira um arquivo com o número dos processos', type='xlsx')
 
         if excel_file is not None:
-            df_processo = pd.read_excel(excel_file)
-            df_processo_show = df_processo.copy()
-            df_processo_show['Processo'] = df_processo_show['Processo'].astype('str')
+            df_processo, df_processo_show = self.ler_planilha(excel_file)
 
             st.subheader("Procedimento")
 
             botao_iniciar = st.button("Iniciar Procedimento")
 
             if botao_iniciar:
+                from classe_requisicoes import CacheExtensoes, CacheMetadados, ColetorMetricas
+
+                self.iniciar_rastreamento()
                 with st.status("Fazendo download dos arquivos ..."):
-                    for processo in df_processo.Processo:
-                        st.write(f'**Iniciando procedimento para o processo: {processo}**')
-                        requisicoes = RequisicoesLiberty(login=self.login_credencial, senha=self.senha_credencial)
-                        st.write("Configuração concluída")
-                        sessao = requisicoes.fazer_login()
-                        time.sleep(3)
+                    requisicoes = RequisicoesLiberty(login=self.login_credencial, senha=self.senha_credencial,
+                                                     limites_por_host={"portalintegracao.yelumseguros.com.br": self.limite_por_host()},
+                                                     manifesto=self.criar_manifesto(),
+                                                     cache_extensoes=CacheExtensoes(self.caminho_cache_extensoes),
+                                                     armazem=self.criar_armazem(),
+                                                     cache_metadados=CacheMetadados(self.caminho_cache_metadados),
+                                                     metricas=ColetorMetricas())
+                    requisicoes.criar_gerenciador_sessao(tamanho_pool=self.downloads_simultaneos * self.processos_simultaneos)
+                    st.write("Configuração concluída")
+                    navegador = None
+                    try:
+                        if hibrido:
+                            import requests
+                            from classe_navegador import LibertyAutomation
+
+                            # Um único login no navegador; a sessão dele é repassada para as requisições
+                            navegador = LibertyAutomation(os.path.abspath("download"), None, headless=headless, capturar_rede=True)
+                            navegador.realizar_login_liberty(self.login_credencial, self.senha_credencial)
+                            navegador.aguardar_pagina_pesquisa()
+                            # Os cabeçalhos ficam em requisicoes.headers, que um novo login pela API substitui
+                            sessao = requisicoes.adotar_sessao(navegador.exportar_cookies(requests.Session(), incluir_headers=False),
+                                                               navegador.headers_autenticacao())
+                            baixar_orcamento = self.criar_orcamento_navegador(navegador)
+                        else:
+                            sessao = requisicoes.fazer_login()
+                            baixar_orcamento = lambda processo: requisicoes.download_orcamento_auto(sessao, processo)
                         st.write("Login concluído.")
-
-                        if opcao_orcamento == "Sim":
-                            try:
-                                st.write("Download do orçamento concluído.")
-                            except Exception as e:
-                                st.write("Problema no download do orçamento.")
-                                raise e
-                        
-                        documentos = requisicoes.obter_documentos_auto(sessao, processo)
-                        st.write("Identificação de documentos para download concluída")
-                        time.sleep(2)
-                        documentos = requisicoes.adicionar_extensoes_auto(sessao, documentos, processo)
-                        st.write("Adição de extensões dos documentos concluída.")
-                        time.sleep(2)
-                        try:
-                            requisicoes.download_documentos_auto(sessao, documentos, processo)
-                            st.write("Download dos documentos concluído.")
-                        except Exception as e:
-                            st.warning(f'Problema no download no processo {str(processo)}', icon="⚠️")
+                        if self.planejar_lote:
+                            resultados, tarefa, pacotes = self.executar_planejado(
+                                requisicoes, sessao, df_processo.Processo, "auto", "download",
+                                baixar_orcamento if opcao_orcamento == "Sim" else None, detectar_extensao,
+                            )
+                        else:
+                            tarefa, pacotes = self.criar_empacotamento(
+                                lambda processo, emitir: self.processo_auto_requisicoes(
+                                    requisicoes, sessao, processo, emitir, opcao_orcamento, detectar_extensao, baixar_orcamento
+                                ),
+                                "download",
+                            )
+                            resultados = self.executar_processos(df_processo.Processo, tarefa, metricas=requisicoes.metricas)
+                        recuperados = self.repetir_adiados(requisicoes)
+                        self.empacotar_recuperados(tarefa, recuperados)
+                    finally:
+                        if navegador is not None:
+                            navegador.navegador.quit()
+                        self.fechar_requisicoes(requisicoes)
+                        self.encerrar_rastreamento()
+
+                self.mostrar_resumo(df_processo_show, resultados, recuperados)
+                self.oferecer_pacotes(pacotes)
+                self.exportar_rastro()
+                self.exportar_metricas(requisicoes.metricas)
 
                 st.button("Reiniciar Procedimento")
 
+    def criar_orcamento_navegador(self, navegador):
+        # No modo híbrido o orçamento continua sendo gerado pela página (depende de JavaScript).
+        # Há um único navegador, então os processos se revezam nele.
+        from classe_auto import Procedimentos as Procedimentos_auto
+
+        trava = threading.Lock()
+
+        def baixar_orcamento(processo):
+            with trava:
+                navegador.definir_pasta_download(processo)
+                try:
+                    navegador.localizar_processo()
+                    Procedimentos_auto(navegador).baixar_orcamento()
+                finally:
+                    navegador.resetar_abas()
+
+        return baixar_orcamento
+
+    def processo_auto_requisicoes(self, requisicoes, sessao, processo, emitir, opcao_orcamento, detectar_extensao, baixar_orcamento):
+        flag_problema_orcamento = False
+        emitir(f'**Iniciando procedimento para o processo: {processo}**')
+
+        if opcao_orcamento == "Sim":
+            try:
+                baixar_orcamento(processo)
+                emitir("Download do orçamento concluído.")
+            except Exception as e:
+                flag_problema_orcamento = True
+                emitir(f"Problema no download do orçamento: {e}")
+
+        documentos = self.obter_documentos(requisicoes, sessao, processo, "auto", emitir)
+        emitir("Identificação de documentos para download concluída")
+        if not detectar_extensao:
+            documentos = requisicoes.adicionar_extensoes_auto(sessao, documentos, processo, max_workers=self.downloads_simultaneos)
+            emitir("Adição de extensões dos documentos concluída.")
+        try:
+            if detectar_extensao:
+                arquivos = requisicoes.download_documentos_auto_detectando(sessao, documentos, processo,
+                                                                           max_workers=self.downloads_simultaneos)
+            elif self.downloads_simultaneos > 1:
+                arquivos = requisicoes.download_documentos_auto_concorrente(sessao, documentos, processo,
+                                                                            max_workers=self.downloads_simultaneos)
+            else:
+                arquivos = requisicoes.download_documentos_auto(sessao, documentos, processo)
+        except Exception as e:
+            emitir(f'Problema no download no processo {str(processo)}', "warning")
+            return 0, len(documentos), True
+
+        documentos_falha = sum(arquivo is None for arquivo in arquivos)
+        if documentos_falha:
+            emitir(f"{documentos_falha} documento(s) falharam e serão tentados de novo no fim do lote.", "warning")
+        emitir("Download dos documentos concluído.")
+
+        return len(arquivos) - documentos_falha, documentos_falha, flag_problema_orcamento
+
 
     def processos_danos_eletricos_pipeline(self):
+        self.select_processos_simultaneos()
+        self.select_downloads_simultaneos()
+        self.select_retomar_lote()
+        self.select_armazem()
+        self.select_planejamento()
+        self.select_empacotamento()
 
         st.subheader("Processo")
         excel_file = st.file_uploader('Insira um arquivo com o número dos processos', type='xlsx')
 
         if excel_file is not None:
-            df_processo = pd.read_excel(excel_file)
-            df_processo_show = df_processo.copy()
-            df_processo_show['Processo'] = df_processo_show['Processo'].astype('str')
+            df_processo, df_processo_show = self.ler_planilha(excel_file)
 
             st.subheader("Procedimento")
 
@@ -189,23 +681,60 @@ class WebApp:
             
 
             if botao_iniciar:
+                from classe_requisicoes import RequisicoesLiberty, CacheMetadados, ColetorMetricas
+
+                self.iniciar_rastreamento()
                 with st.status("Fazendo download dos arquivos ..."):
-                    for processo in df_processo.Processo:
-                        st.write(f'**Iniciando procedimento para o processo: {processo}**'),
-                        requisicoes = RequisicoesLiberty(login=self.login_credencial, senha=self.senha_credencial)
-                        st.write("Configuração concluída")
+                    requisicoes = RequisicoesLiberty(login=self.login_credencial, senha=self.senha_credencial,
+                                                     limites_por_host={"uploadsinistroresidenciabff.yelumseguros.com.br": self.limite_por_host()},
+                                                     # Os links assinados apontam para o host do storage
+                                                     limite_padrao=self.limite_por_host(),
+                                                     manifesto=self.criar_manifesto(),
+                                                     armazem=self.criar_armazem(),
+                                                     cache_metadados=CacheMetadados(self.caminho_cache_metadados),
+                                                     metricas=ColetorMetricas())
+                    requisicoes.criar_gerenciador_sessao(tamanho_pool=self.downloads_simultaneos * self.processos_simultaneos)
+                    st.write("Configuração concluída")
+                    try:
                         sessao = requisicoes.fazer_login()
-                        time.sleep(3)
                         st.write("Login concluído.")
-                        documentos = requisicoes.obter_documentos_danos_eletricos(sessao, processo)
-                        st.write("Identificação de documentos para download concluída")
-                        for _, row in documentos.iterrows():
-                            requisicoes.download_arquivos_danos_eletricos(processo, 
-                                                         row['codigo'], 
-                                                         row['idonbase'], 
-                                                         row['descricao'], 
-                                                         row['num_documento'])
-                            st.write(f"Download do {row['num_documento']}º documento de tipo: {row['descricao']}")
-                        st.write("Download dos documentos concluído.")
+                        if self.planejar_lote:
+                            resultados, tarefa, pacotes = self.executar_planejado(
+                                requisicoes, sessao, df_processo.Processo, "danos_eletricos", os.path.join(os.getcwd(), "dados"),
+                            )
+                        else:
+                            tarefa, pacotes = self.criar_empacotamento(
+                                lambda processo, emitir: self.processo_danos_eletricos(requisicoes, sessao, processo, emitir),
+                                os.path.join(os.getcwd(), "dados"),
+                            )
+                            resultados = self.executar_processos(df_processo.Processo, tarefa, metricas=requisicoes.metricas)
+                        recuperados = self.repetir_adiados(requisicoes)
+                        self.empacotar_recuperados(tarefa, recuperados)
+                    finally:
+                        self.fechar_requisicoes(requisicoes)
+                        self.encerrar_rastreamento()
+
+                self.mostrar_resumo(df_processo_show, resultados, recuperados)
+                self.oferecer_pacotes(pacotes)
+                self.exportar_rastro()
+                self.exportar_metricas(requisicoes.metricas)
 
                 st.button("Reiniciar Procedimento")
+
+    def processo_danos_eletricos(self, requisicoes, sessao, processo, emitir):
+        emitir(f'**Iniciando procedimento para o processo: {processo}**')
+        documentos = self.obter_documentos(requisicoes, sessao, processo, "danos_eletricos", emitir)
+        emitir("Identificação de documentos para download concluída")
+        # Os links dos próximos documentos são obtidos enquanto o atual é transferido
+        arquivos = requisicoes.download_documentos_danos_eletricos_pipeline(
+            documentos, processo, transferencias=self.downloads_simultaneos,
+            ao_concluir=lambda documento, arquivo: emitir(
+                f"Download do {documento.num_documento}º documento de tipo: {documento.descricao}"
+            ),
+        )
+        documentos_baixados = sum(arquivo is not None for arquivo in arquivos)
+        if documentos_baixados < len(documentos):
+            emitir(f"{len(documentos) - documentos_baixados} documento(s) falharam e serão tentados de novo no fim do lote.", "warning")
+        emitir("Download dos documentos concluído.")
+
+        return documentos_baixados, len(documentos) - documentos_baixados, False
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import zipfile
+
+# Formatos que já são comprimidos: gravados sem compressão (deflate não reduz e só gasta CPU)
+EXTENSOES_COMPRIMIDAS = {
+    "pdf", "jpg", "jpeg", "png", "gif", "docx", "xlsx", "pptx", "zip", "7z", "rar", "mp4", "heic", "webp",
+}
+
+# Arquivos que não entram no pacote: downloads incompletos e temporários
+_SUFIXOS_IGNORADOS = (".part", ".tmp", ".crdownload")
+
+
+def tipo_compressao(nome_arquivo):
+    """
+    Escolhe o método de compressão do arquivo dentro do ZIP pela extensão.
+
+    Args:
+        nome_arquivo (str): Nome ou caminho do arquivo.
+
+    Returns:
+        int: zipfile.ZIP_STORED para formatos já comprimidos, zipfile.ZIP_DEFLATED para os
+             demais (txt, eml, doc, xls, tif...).
+    """
+    extensao = os.path.splitext(nome_arquivo)[1].lower().lstrip(".")
+    return zipfile.ZIP_STORED if extensao in EXTENSOES_COMPRIMIDAS else zipfile.ZIP_DEFLATED
+
+
+def remover_pacotes_antigos(pasta, idade_maxima=24 * 3600):
+    """
+    Apaga os ZIPs da pasta com mais de 'idade_maxima' segundos.
+
+    Args:
+        pasta (str): Pasta dos pacotes.
+        idade_maxima (float): Idade, em segundos, a partir da qual um pacote é apagado.
+
+    Returns:
+        int: Quantidade de pacotes apagados.
+    """
+    limite = time.time() - idade_maxima
+    removidos = 0
+    try:
+        nomes = os.listdir(pasta)
+    except FileNotFoundError:
+        return 0
+    for nome in nomes:
+        caminho = os.path.join(pasta, nome)
+        try:
+            if nome.lower().endswith(".zip") and os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+                removidos += 1
+        except OSError:
+            continue
+    return removidos
+
+
+class EmpacotadorZip:
+    """
+    Monta um ZIP em disco aos poucos, conforme os arquivos ficam prontos.
+
+    Cada arquivo é copiado do disco para o ZIP em blocos, sem carregar o
+    conteúdo em memória. Pode ser usado por várias threads ao mesmo tempo;
+    as escritas no ZIP são serializadas.
+
+    Atributos:
+        caminho (str): Caminho do arquivo ZIP.
+        nomes (set): Nomes já adicionados ao ZIP.
+
+    Métodos:
+        - adicionar(caminho_arquivo, nome_no_zip): Adiciona um arquivo.
+        - adicionar_pasta(pasta, prefixo): Adiciona os arquivos concluídos de uma pasta.
+        - fechar(): Grava o índice do ZIP; depois disso o arquivo está pronto para download.
+    """
+
+    def __init__(self, caminho, nivel_compressao=6):
+        """
+        Cria o ZIP (e a pasta dele, se necessário).
+
+        Args:
+            caminho (str): Caminho do arquivo ZIP.
+            nivel_compressao (int): Nível do deflate, de 1 (mais rápido) a 9.
+        """
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self.nomes = set()
+        self._zip = zipfile.ZipFile(caminho, "w", compresslevel=nivel_compressao, allowZip64=True)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        self.fechar()
+        return False
+
+    def adicionar(self, caminho_arquivo, nome_no_zip):
+        """
+        Adiciona um arquivo ao ZIP, se ainda não houver um com o mesmo nome.
+
+        Args:
+            caminho_arquivo (str): Arquivo em disco.
+            nome_no_zip (str): Caminho do arquivo dentro do ZIP.
+
+        Returns:
+            bool: True se o arquivo foi adicionado.
+        """
+        nome_no_zip = nome_no_zip.replace(os.sep, "/")
+        with self._lock:
+            if nome_no_zip in self.nomes:
+                return False
+            self._zip.write(caminho_arquivo, nome_no_zip, compress_type=tipo_compressao(nome_no_zip))
+            self.nomes.add(nome_no_zip)
+            return True
+
+    def adicionar_pasta(self, pasta, prefixo=""):
+        """
+        Adiciona ao ZIP os arquivos concluídos de uma pasta (incluindo subpastas).
+
+        Arquivos ocultos, parciais e temporários são ignorados; arquivos já
+        adicionados não são repetidos, então a mesma pasta pode ser adicionada
+        de novo depois que novos downloads terminarem.
+
+        Args:
+            pasta (str): Pasta com os arquivos.
+            prefixo (str): Pasta dentro do ZIP, ex: o número do processo.
+
+        Returns:
+            int: Quantidade de arquivos adicionados nesta chamada.
+        """
+        adicionados = 0
+        for raiz, _, arquivos in os.walk(pasta):
+            for nome in sorted(arquivos):
+                if nome.startswith(".") or nome.lower().endswith(_SUFIXOS_IGNORADOS):
+                    continue
+                caminho_arquivo = os.path.join(raiz, nome)
+                nome_no_zip = os.path.join(prefixo, os.path.relpath(caminho_arquivo, pasta))
+                if self.adicionar(caminho_arquivo, nome_no_zip):
+                    adicionados += 1
+        return adicionados
+
+    def fechar(self):
+        with self._lock:
+            if self._zip.fp is not None:
+                self._zip.close()
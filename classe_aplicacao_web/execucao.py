@@ -0,0 +1,107 @@
+import queue
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from classe_rastreamento import RASTREADOR
+
+EventoProcesso = namedtuple("EventoProcesso", ["indice", "processo", "tipo", "mensagem"])
+EventoProcesso.__doc__ = """
+Mensagem emitida por um worker durante o processamento de um processo.
+
+Atributos:
+    indice (int): Posição do processo na planilha.
+    processo (int): Número do processo.
+    tipo (str): 'write' ou 'warning'.
+    mensagem (str): Texto a exibir.
+"""
+
+ResultadoProcesso = namedtuple("ResultadoProcesso", ["processo", "resultado", "erro"])
+ResultadoProcesso.__doc__ = """
+Resultado do processamento de um processo.
+
+Atributos:
+    processo (int): Número do processo.
+    resultado: Valor retornado pela tarefa, ou None em caso de erro.
+    erro (Exception): Exceção levantada pela tarefa, ou None.
+"""
+
+_FIM = "fim"
+
+
+class ExecutorProcessos:
+    """
+    Executa vários processos em paralelo e repassa os eventos para a thread principal.
+
+    As chamadas do Streamlit só funcionam na thread do script, então os
+    workers não escrevem na tela: eles emitem eventos para uma fila que a
+    thread principal consome. Os eventos são exibidos na ordem da planilha
+    (todos os eventos de um processo antes dos do seguinte), como na execução
+    sequencial; com um único worker eles aparecem em tempo real.
+
+    Atributos:
+        num_workers (int): Número de processos executados ao mesmo tempo.
+
+    Métodos:
+        - executar(processos, tarefa, ao_evento, ao_concluir): Executa a tarefa para cada processo.
+    """
+
+    def __init__(self, num_workers=1):
+        self.num_workers = max(1, int(num_workers))
+
+    def executar(self, processos, tarefa, ao_evento, ao_concluir=None):
+        """
+        Executa a tarefa para cada processo usando o pool de workers.
+
+        Args:
+            processos (iterable): Números dos processos.
+            tarefa (callable): Função tarefa(processo, emitir) executada no worker.
+                'emitir(mensagem, tipo="write")' envia um evento para a thread principal.
+            ao_evento (callable): Chamada na thread principal para cada EventoProcesso, em ordem.
+            ao_concluir (callable, optional): Chamada na thread principal como ao_concluir(concluidos, total).
+
+        Returns:
+            list: ResultadoProcesso de cada processo, na ordem recebida.
+        """
+        processos = list(processos)
+        total = len(processos)
+        fila = queue.Queue()
+        resultados = [None] * total
+        eventos_pendentes = {indice: [] for indice in range(total)}
+        concluidos = 0
+        proximo = 0
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            for indice, processo in enumerate(processos):
+                executor.submit(self._rodar, indice, processo, tarefa, fila)
+
+            while concluidos < total:
+                evento = fila.get()
+                if evento.tipo == _FIM:
+                    resultados[evento.indice] = evento.mensagem
+                    concluidos += 1
+                    if ao_concluir is not None:
+                        ao_concluir(concluidos, total)
+                else:
+                    eventos_pendentes[evento.indice].append(evento)
+
+                # Exibir os eventos em ordem, avançando sobre os processos já concluídos
+                while proximo < total:
+                    for pendente in eventos_pendentes[proximo]:
+                        ao_evento(pendente)
+                    eventos_pendentes[proximo] = []
+                    if resultados[proximo] is None:
+                        break
+                    proximo += 1
+
+        return resultados
+
+    @staticmethod
+    def _rodar(indice, processo, tarefa, fila):
+        def emitir(mensagem, tipo="write"):
+            fila.put(EventoProcesso(indice, processo, tipo, mensagem))
+
+        try:
+            with RASTREADOR.span(f"processo {processo}", "processo"):
+                resultado = ResultadoProcesso(processo, tarefa(processo, emitir), None)
+        except Exception as erro:
+            resultado = ResultadoProcesso(processo, None, erro)
+        fila.put(EventoProcesso(indice, processo, _FIM, resultado))
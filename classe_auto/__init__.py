@@ -1,21 +1,29 @@
-import time
+import os
+import requests
+from urllib.parse import urlparse, unquote
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import UnexpectedAlertPresentException
 from classe_navegador import LibertyAutomation
+from classe_requisicoes.escrita import salvar_resposta
+from classe_rastreamento import RASTREADOR, rastrear
 
 class Procedimentos:
-    def __init__(self, liberty_automation: LibertyAutomation):
+    def __init__(self, liberty_automation: LibertyAutomation, timeout_download=60):
         self.liberty_automation = liberty_automation
+        self.timeout_download = timeout_download
+        self.arquivos_orcamento = []
 
+    @rastrear("etapa")
     def baixar_orcamento(self):
         navegador = self.liberty_automation.navegador
-        
-        time.sleep(7)
-        self.liberty_automation.clicar_botao(By.XPATH, '/html/body/app-root/app-ressarcimento/app-footer/footer/button[4]')
+        monitor = self.liberty_automation.criar_monitor_downloads()
+
+        self.liberty_automation.clicar_botao_download(By.XPATH, '/html/body/app-root/app-ressarcimento/app-footer/footer/button[4]')
 
-        time.sleep(5)
         self.liberty_automation.mudar_para_aba(1)
 
         self.liberty_automation.clicar_botao(By.XPATH, '//*[@id="budget_report"]/div/div[2]/a/center')
@@ -24,58 +32,150 @@ class Procedimentos:
 
         self.liberty_automation.clicar_botao(By.XPATH, '//*[@id="btn_pdf_report"]')
 
-        time.sleep(8)
+        # Aguarda o PDF do orçamento terminar de baixar
+        arquivos = monitor.aguardar(1, timeout=self.timeout_download)
+        if len(arquivos) < 1:
+            raise TimeoutError("O PDF do orçamento não terminou de baixar.")
         self.liberty_automation.fechar_aba()
 
         self.liberty_automation.mudar_para_aba(1)
 
         self.liberty_automation.clicar_botao(By.XPATH, '//*[@id="photos_menu"]')
 
-        time.sleep(5)
         self.liberty_automation.clicar_botao(By.XPATH, '//*[@id="budgeting-photos-content"]/div[1]/div[2]/div/label')
 
         self.liberty_automation.clicar_botao(By.XPATH, '//*[@id="budgeting-photos-print"]/div/a[2]')
 
-        time.sleep(8)
+        # Aguarda o relatório de fotos terminar de baixar
+        arquivos = monitor.aguardar(2, timeout=self.timeout_download)
+        if len(arquivos) < 2:
+            raise TimeoutError("O relatório de fotos não terminou de baixar.")
         self.liberty_automation.fechar_aba()
 
         self.liberty_automation.mudar_para_aba(0)
 
+        self.arquivos_orcamento = arquivos
         return navegador
 
-    def downloads(self):
+    @rastrear("etapa")
+    def downloads(self, fechar_navegador=True):
         navegador = self.liberty_automation.navegador
+        monitor = self.liberty_automation.criar_monitor_downloads()
 
         # Indo para o site com os arquivos
         self.liberty_automation.clicar_botao(By.XPATH, '/html/body/app-root/app-ressarcimento/app-footer/footer/button[6]')
-        
+
         # Mudando para aba com os documentos
         self.liberty_automation.mudar_para_aba(1)
 
-        time.sleep(10)
+        # Aguarda a lista de documentos carregar
+        with RASTREADOR.span("aguardar lista de documentos", "selenium"):
+            WebDriverWait(navegador, 20).until(
+                EC.presence_of_element_located((By.XPATH, '//*[@id="documento-necessario"]'))
+            )
 
-        documentos_baixados = 0
+        arquivos_baixados = []
         flag_problema = False
         tentativas = 0
-        
+
         for i in range(2, 20):
-            time.sleep(3)
             element_xpath = f'//*[@id="documento-necessario"]/div[{i}]/div[2]/div/div'
 
 
             try:
-                element = WebDriverWait(navegador, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, element_xpath))
-                )
-                self.liberty_automation.executar_script("arguments[0].scrollIntoView(true);", element)
-                element.click()
-                documentos_baixados += 1
+                with RASTREADOR.span("clicar documento", "selenium", posicao=i):
+                    element = WebDriverWait(navegador, 10).until(
+                        EC.element_to_be_clickable((By.XPATH, element_xpath))
+                    )
+                    self.liberty_automation.executar_script("arguments[0].scrollIntoView(true);", element)
+                    element.click()
+                # Libera o próximo clique assim que o arquivo terminar de baixar. A espera é por um
+                # arquivo além dos já observados, para que um clique sem download (aba de
+                # visualização, link quebrado) não faça os cliques seguintes esperarem o timeout.
+                esperados = len(arquivos_baixados) + 1
+                arquivos_baixados = monitor.aguardar(esperados, timeout=self.timeout_download)
+                if len(arquivos_baixados) < esperados:
+                    flag_problema = True
             except Exception as e:
                 tentativas = tentativas + 1
                 if tentativas > 2:
                     break
 
-        time.sleep(2)
-        navegador.quit()
+        # Aguarda os downloads pendentes (parciais) terminarem antes de liberar o navegador
+        arquivos_baixados = monitor.aguardar(len(arquivos_baixados), timeout=self.timeout_download)
+
+        if fechar_navegador:
+            navegador.quit()
+
+        return len(arquivos_baixados), flag_problema, arquivos_baixados
 
-        return documentos_baixados, flag_problema
\ No newline at end of file
+    @rastrear("etapa")
+    def downloads_por_rede(self, fechar_navegador=True, max_workers=4):
+        # Em vez de clicar documento a documento, captura as URLs dos arquivos que a página
+        # requisita ao carregar a lista e baixa todas em paralelo por HTTP.
+        # Requer um LibertyAutomation criado com capturar_rede=True.
+        navegador = self.liberty_automation.navegador
+        self.liberty_automation.limpar_eventos_rede()
+
+        # Indo para o site com os arquivos
+        self.liberty_automation.clicar_botao(By.XPATH, '/html/body/app-root/app-ressarcimento/app-footer/footer/button[6]')
+
+        # Mudando para aba com os documentos
+        self.liberty_automation.mudar_para_aba(1)
+
+        # Aguarda a lista de documentos carregar e a rede ficar ociosa
+        with RASTREADOR.span("aguardar lista de documentos", "selenium"):
+            WebDriverWait(navegador, 20).until(
+                EC.presence_of_element_located((By.XPATH, '//*[@id="documento-necessario"]'))
+            )
+        self.liberty_automation.aguardar_rede_ociosa()
+        urls = self.liberty_automation.urls_arquivos_capturados()
+
+        sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        sessao.mount("https://", adaptador)
+        self.liberty_automation.exportar_cookies(sessao)
+
+        nomes = self._nomes_arquivos(urls)
+        pasta = self.liberty_automation.pasta_download
+
+        def baixar(url, nome):
+            try:
+                with RASTREADOR.span(nome, "download"):
+                    response = sessao.get(url, stream=True)
+                    if not response.ok:
+                        response.close()
+                        return None
+                    return salvar_resposta(response, os.path.join(pasta, nome))
+            except Exception:
+                return None
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                arquivos = list(executor.map(baixar, urls, nomes))
+        finally:
+            sessao.close()
+
+        arquivos_baixados = [os.path.basename(arquivo.caminho) for arquivo in arquivos if arquivo is not None]
+        flag_problema = len(urls) == 0 or len(arquivos_baixados) < len(urls)
+
+        if fechar_navegador:
+            navegador.quit()
+
+        return len(arquivos_baixados), flag_problema, arquivos_baixados
+
+    @staticmethod
+    def _nomes_arquivos(urls):
+        # Nome de cada arquivo a partir da URL, sem repetir nomes dentro da pasta
+        nomes = []
+        usados = set()
+        for i, url in enumerate(urls, start=1):
+            nome = unquote(os.path.basename(urlparse(url).path)) or f"documento_{i}"
+            base, extensao = os.path.splitext(nome)
+            contador = 2
+            while nome in usados:
+                nome = f"{base}_{contador}{extensao}"
+                contador += 1
+            usados.add(nome)
+            nomes.append(nome)
+        return nomes
@@ -1,26 +1,55 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver import ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.core.os_manager import ChromeType
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import UnexpectedAlertPresentException, ElementClickInterceptedException
+from classe_navegador.monitor_downloads import MonitorDownloads
+from classe_rastreamento import RASTREADOR, rastrear
 import time
 import os
+import re
+import json
 
+# Tipos de conteúdo tratados como documentos na captura de rede
+TIPOS_ARQUIVO = (
+    "application/pdf", "image/jpeg", "image/png", "image/gif", "image/tiff",
+    "application/msword", "application/vnd.ms-", "application/vnd.openxmlformats",
+    "message/rfc822", "application/octet-stream",
+)
+PADRAO_URL_ARQUIVO = re.compile(r"file_upload/|\.(pdf|docx?|xlsx?|pptx?|tif|eml|jpe?g|png|gif)(\?|$)", re.IGNORECASE)
+PADRAO_URL_IGNORADA = re.compile(r"/assets/|favicon", re.IGNORECASE)
 
 
 class LibertyAutomation:
-    def __init__(self, caminho, num_processo):
+    url_login = "https://ressarcimentofianca.yelumseguros.com.br/login"
+
+    def __init__(self, caminho, num_processo, headless=False, capturar_rede=False):
         self.caminho = caminho
         self.num_processo = num_processo
-        #self.navegador = self.configurar_navegador_para_download()
-        self.navegador = self.configurar_navegador_para_download_local()
+        self.url_pesquisa = None
+        self.pasta_download = None
+        self.capturar_rede = capturar_rede
+        self.eventos_rede = []
+        self.headers_capturados = {}
+        if headless:
+            self.navegador = self.configurar_navegador_para_download()
+        else:
+            self.navegador = self.configurar_navegador_para_download_local()
+
+    def _pasta_inicial(self):
+        # Sem processo (ex: navegador do modo híbrido, que troca de pasta a cada orçamento), usa a própria pasta base
+        if self.num_processo is None:
+            return self.caminho
+        return os.path.join(self.caminho, str(self.num_processo))
 
     def configurar_navegador_para_download(self):
+        # webdriver_manager só é necessário ao abrir o navegador
+        from webdriver_manager.chrome import ChromeDriverManager
+        from webdriver_manager.core.os_manager import ChromeType
+
         servico = Service(ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install())
         chrome_options = webdriver.ChromeOptions()
         chrome_options.add_argument("--headless")
@@ -28,9 +57,10 @@ class LibertyAutomation:
         chrome_options.add_argument("--disable-dev-shm-usage")
         
         # Define o diretório de download
-        download_directory = os.path.join(self.caminho, str(self.num_processo))
+        download_directory = self._pasta_inicial()
         if not os.path.exists(download_directory):
             os.makedirs(download_directory)
+        self.pasta_download = download_directory
         
         prefs = {
             "download.default_directory": download_directory,
@@ -40,11 +70,16 @@ class LibertyAutomation:
             "profile.default_content_settings.images": 1
         }
         chrome_options.add_experimental_option("prefs", prefs)
+        if self.capturar_rede:
+            # Habilita o log de performance, que traz os eventos de rede do DevTools
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         
         navegador = webdriver.Chrome(service=servico, options=chrome_options)
         return navegador
     
     def configurar_navegador_para_download_local(self):
+        from webdriver_manager.chrome import ChromeDriverManager
+
         #servico = Service(ChromeDriverManager().install())
         chrome_install = ChromeDriverManager().install()
 
@@ -56,9 +91,10 @@ class LibertyAutomation:
         #chrome_options.add_argument("--headless")
         
         # Define o diretório de download
-        download_directory = os.path.join(self.caminho, str(self.num_processo))
+        download_directory = self._pasta_inicial()
         if not os.path.exists(download_directory):
             os.makedirs(download_directory)
+        self.pasta_download = download_directory
         
         prefs = {
             "download.default_directory": download_directory,
@@ -68,21 +104,166 @@ class LibertyAutomation:
             "profile.default_content_settings.images": 1
         }
         chrome_options.add_experimental_option("prefs", prefs)
+        if self.capturar_rede:
+            # Habilita o log de performance, que traz os eventos de rede do DevTools
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         
         navegador = webdriver.Chrome(service=servico, options=chrome_options)
         return navegador    
 
+    @rastrear("selenium")
     def realizar_login_liberty(self, login, senha):
-        self.navegador.get("https://ressarcimentofianca.yelumseguros.com.br/login")
+        self.navegador.get(self.url_login)
         self.navegador.maximize_window()
         self.enviar_valor_para_campo(By.XPATH, '/html/body/app-root/app-login-prestador/div[2]/div/div/div[2]/div[2]/div/div[1]/input', login)
         self.enviar_valor_para_campo(By.XPATH, '/html/body/app-root/app-login-prestador/div[2]/div/div/div[2]/div[2]/div/div[2]/input', senha)
         self.clicar_botao(By.XPATH, '/html/body/app-root/app-login-prestador/div[2]/div/div/div[2]/div[2]/div/div[3]/input')
 
+    @rastrear("selenium")
+    def aguardar_pagina_pesquisa(self):
+        # Aguarda a página de pesquisa após o login e guarda a URL para voltar a ela depois
+        WebDriverWait(self.navegador, 20).until(
+            EC.presence_of_element_located((By.XPATH, '//*[@id="pesquisa"]'))
+        )
+        self.url_pesquisa = self.navegador.current_url
+
+    @rastrear("selenium")
+    def definir_pasta_download(self, num_processo):
+        # Troca a pasta de download do navegador já aberto para a pasta do processo
+        self.num_processo = num_processo
+        download_directory = os.path.join(self.caminho, str(num_processo))
+        if not os.path.exists(download_directory):
+            os.makedirs(download_directory)
+        self.pasta_download = download_directory
+
+        self.navegador.execute_cdp_cmd(
+            "Browser.setDownloadBehavior",
+            {"behavior": "allow", "downloadPath": download_directory},
+        )
+        return download_directory
+
+    @rastrear("selenium")
+    def resetar_abas(self):
+        # Fecha as abas extras e volta para a pesquisa, deixando o navegador pronto para outro processo
+        abas = self.navegador.window_handles
+        for aba in abas[1:]:
+            self.navegador.switch_to.window(aba)
+            self.navegador.close()
+        self.navegador.switch_to.window(abas[0])
+
+        if self.url_pesquisa:
+            self.navegador.get(self.url_pesquisa)
+            campo = WebDriverWait(self.navegador, 20).until(
+                EC.presence_of_element_located((By.XPATH, '//*[@id="pesquisa"]'))
+            )
+            campo.clear()
+
+    def criar_monitor_downloads(self):
+        # Monitor da pasta de download atual; deve ser criado antes do clique que inicia o download
+        return MonitorDownloads(self.pasta_download)
+
+    def ler_eventos_rede(self):
+        # O log de performance é esvaziado a cada leitura, então os eventos de rede são acumulados
+        for entrada in self.navegador.get_log("performance"):
+            mensagem = json.loads(entrada["message"])["message"]
+            if mensagem.get("method", "").startswith("Network."):
+                self.eventos_rede.append(mensagem)
+                self._guardar_headers_autenticacao(mensagem)
+        return self.eventos_rede
+
+    def _guardar_headers_autenticacao(self, mensagem):
+        # Guarda os cabeçalhos de autenticação que a aplicação envia para as APIs
+        if mensagem.get("method") != "Network.requestWillBeSent":
+            return
+        for nome, valor in mensagem["params"]["request"].get("headers", {}).items():
+            if nome.lower() == "authorization" or nome.lower().startswith("x-liberty-"):
+                self.headers_capturados[nome] = valor
+
+    def headers_autenticacao(self):
+        # Cabeçalhos de autenticação vistos no log de rede (requer capturar_rede=True)
+        if self.capturar_rede:
+            self.ler_eventos_rede()
+        return dict(self.headers_capturados)
+
+    @rastrear("selenium")
+    def aguardar_rede_ociosa(self, ociosidade=1.5, timeout=30):
+        # Aguarda até a página ficar 'ociosidade' segundos sem novos eventos de rede
+        limite = time.monotonic() + timeout
+        quantidade = len(self.ler_eventos_rede())
+        ultimo_evento = time.monotonic()
+        while time.monotonic() < limite:
+            RASTREADOR.dormir(0.2)
+            atual = len(self.ler_eventos_rede())
+            if atual != quantidade:
+                quantidade = atual
+                ultimo_evento = time.monotonic()
+            elif time.monotonic() - ultimo_evento >= ociosidade:
+                break
+
+    def urls_arquivos_capturados(self):
+        # URLs de documentos que a página recebeu, sem repetição e na ordem em que chegaram
+        urls = []
+        vistas = set()
+        for evento in self.eventos_rede:
+            if evento.get("method") != "Network.responseReceived":
+                continue
+            resposta = evento["params"]["response"]
+            url = resposta.get("url", "")
+            tipo = (resposta.get("mimeType") or "").lower()
+            if url in vistas or not url.startswith("http") or PADRAO_URL_IGNORADA.search(url):
+                continue
+            if resposta.get("status") != 200:
+                continue
+            if tipo.startswith(TIPOS_ARQUIVO) or PADRAO_URL_ARQUIVO.search(url):
+                vistas.add(url)
+                urls.append(url)
+        return urls
+
+    def limpar_eventos_rede(self):
+        if self.capturar_rede:
+            self.ler_eventos_rede()
+        self.eventos_rede = []
+
+    def cookies_navegador(self):
+        # Cookies de todos os domínios (get_cookies só traz os do domínio da aba atual)
+        return self.navegador.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+
+    def exportar_cookies(self, sessao, incluir_headers=True):
+        # Copia os cookies, o User-Agent e os cabeçalhos de autenticação do navegador para uma requests.Session
+        for cookie in self.cookies_navegador():
+            sessao.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        sessao.headers["User-Agent"] = self.navegador.execute_script("return navigator.userAgent")
+        if incluir_headers:
+            sessao.headers.update(self.headers_autenticacao())
+        return sessao
+
+    def importar_cookies(self, sessao):
+        # Caminho inverso: copia os cookies de uma requests.Session autenticada para o navegador
+        for cookie in sessao.cookies:
+            parametros = {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path or "/",
+                "secure": bool(cookie.secure),
+            }
+            if cookie.expires:
+                parametros["expires"] = cookie.expires
+            self.navegador.execute_cdp_cmd("Network.setCookie", parametros)
+
+    def esta_ativo(self):
+        try:
+            self.navegador.window_handles
+            return True
+        except Exception:
+            return False
+
+    @rastrear("selenium")
     def localizar_processo(self):
         self.enviar_valor_para_campo(By.XPATH, '//*[@id="pesquisa"]', self.num_processo)
         self.clicar_botao(By.XPATH, '/html/body/app-root/app-pesquisa/div[2]/div[3]/div[2]/button[1]')
 
+    @rastrear("selenium")
     def clicar_botao(self, by, valor):
         botao = WebDriverWait(self.navegador, 20).until(
             EC.element_to_be_clickable((by, valor))
@@ -90,6 +271,7 @@ class LibertyAutomation:
 
         botao.click()
 
+    @rastrear("selenium")
     def clicar_botao_download(self, by, valor):
         botao = WebDriverWait(self.navegador, 20).until(
             EC.element_to_be_clickable((by, valor))
@@ -100,7 +282,7 @@ class LibertyAutomation:
         try:
             botao.click()
         except ElementClickInterceptedException:
-            time.sleep(1)
+            RASTREADOR.dormir(1)
             self.executar_script("arguments[0].scrollIntoView(true);", botao)
             botao.click()
         
@@ -109,6 +291,7 @@ class LibertyAutomation:
         body = self.navegador.find_element(By.TAG_NAME, 'body')  
         body.send_keys(Keys.PAGE_DOWN)  # Scroll down
 
+    @rastrear("selenium")
     def enviar_valor_para_campo(self, by, valor, texto):
         campo = WebDriverWait(self.navegador, 10).until(
             EC.presence_of_element_located((by, valor))
@@ -116,6 +299,7 @@ class LibertyAutomation:
 
         campo.send_keys(texto)
 
+    @rastrear("selenium")
     def mudar_para_aba(self, numero_aba):
         WebDriverWait(self.navegador, 10).until(
             EC.number_of_windows_to_be(numero_aba + 1)
@@ -123,6 +307,7 @@ class LibertyAutomation:
         new_window_handle = self.navegador.window_handles[numero_aba]
         self.navegador.switch_to.window(new_window_handle)
 
+    @rastrear("selenium")
     def fechar_aba(self):
         self.navegador.close()
         WebDriverWait(self.navegador, 10).until(
@@ -0,0 +1,70 @@
+import os
+import time
+from classe_rastreamento import RASTREADOR, rastrear
+
+# Extensões usadas pelo Chrome enquanto o arquivo ainda está sendo baixado
+EXTENSOES_PARCIAIS = (".crdownload", ".tmp", ".part")
+
+
+class MonitorDownloads:
+    # Observa a pasta de download do navegador e libera o fluxo assim que os arquivos terminam de baixar.
+    # Um arquivo é considerado concluído quando não há mais arquivos parciais na pasta
+    # e os tamanhos ficam estáveis por 'estabilidade' segundos.
+    def __init__(self, pasta, intervalo=0.2, estabilidade=0.5):
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.existentes = set(self._listar())
+
+    def _listar(self):
+        try:
+            return os.listdir(self.pasta)
+        except FileNotFoundError:
+            return []
+
+    def _tamanhos(self):
+        tamanhos = {}
+        for nome in self._listar():
+            try:
+                tamanhos[nome] = os.path.getsize(os.path.join(self.pasta, nome))
+            except OSError:
+                pass
+        return tamanhos
+
+    def novos_arquivos(self):
+        # Arquivos completos que apareceram desde a criação do monitor (ou da última marcação)
+        return sorted(
+            nome for nome in self._listar()
+            if nome not in self.existentes and not nome.lower().endswith(EXTENSOES_PARCIAIS)
+        )
+
+    def marcar(self):
+        # Passa a ignorar os arquivos que já estão na pasta
+        self.existentes = set(self._listar())
+
+    @rastrear("selenium", "aguardar downloads")
+    def aguardar(self, quantidade=1, timeout=60):
+        # Aguarda até existirem 'quantidade' novos arquivos completos e estáveis, ou até o timeout.
+        # Retorna a lista de novos arquivos concluídos (pode ter menos itens que 'quantidade' se o tempo acabar).
+        limite = time.monotonic() + timeout
+        ultimo_tamanho = None
+        estavel_desde = None
+
+        while True:
+            tamanhos = self._tamanhos()
+            parciais = [nome for nome in tamanhos if nome.lower().endswith(EXTENSOES_PARCIAIS)]
+            novos = [nome for nome in tamanhos if nome not in self.existentes and nome not in parciais]
+
+            if len(novos) >= quantidade and not parciais:
+                agora = time.monotonic()
+                if tamanhos != ultimo_tamanho:
+                    ultimo_tamanho = tamanhos
+                    estavel_desde = agora
+                elif agora - estavel_desde >= self.estabilidade:
+                    return sorted(novos)
+            else:
+                ultimo_tamanho = None
+
+            if time.monotonic() >= limite:
+                return self.novos_arquivos()
+            RASTREADOR.dormir(self.intervalo)
@@ -0,0 +1,103 @@
+import threading
+from contextlib import contextmanager
+from classe_navegador import LibertyAutomation
+
+
+class PoolNavegadores:
+    # Mantém até 'tamanho' navegadores já logados, emprestados um por processo.
+    # Cada navegador é descartado depois de 'max_usos' empréstimos ou quando falha.
+    def __init__(self, caminho, login, senha, tamanho=1, max_usos=20, headless=True, capturar_rede=False):
+        self.caminho = caminho
+        self.login = login
+        self.senha = senha
+        self.tamanho = tamanho
+        self.max_usos = max_usos
+        self.headless = headless
+        self.capturar_rede = capturar_rede
+        self._livres = []
+        self._usos = {}
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._lock = threading.Lock()
+
+    def _criar_navegador(self, num_processo):
+        automacao = LibertyAutomation(self.caminho, num_processo, headless=self.headless,
+                                      capturar_rede=self.capturar_rede)
+        try:
+            automacao.realizar_login_liberty(self.login, self.senha)
+            automacao.aguardar_pagina_pesquisa()
+        except Exception:
+            self._encerrar(automacao)
+            raise
+        self._usos[id(automacao)] = 0
+        return automacao
+
+    def _encerrar(self, automacao):
+        self._usos.pop(id(automacao), None)
+        try:
+            automacao.navegador.quit()
+        except Exception:
+            pass
+
+    def obter(self, num_processo):
+        # Bloqueia até existir uma vaga e devolve um navegador logado apontando para a pasta do processo
+        self._vagas.acquire()
+        try:
+            automacao = None
+            while automacao is None:
+                with self._lock:
+                    automacao = self._livres.pop() if self._livres else None
+                if automacao is None:
+                    automacao = self._criar_navegador(num_processo)
+                elif not automacao.esta_ativo():
+                    self._encerrar(automacao)
+                    automacao = None
+
+            automacao.definir_pasta_download(num_processo)
+            return automacao
+        except Exception:
+            self._vagas.release()
+            raise
+
+    def devolver(self, automacao, descartar=False):
+        # Devolve o navegador ao pool; navegadores com erro ou muito usados são fechados
+        try:
+            self._usos[id(automacao)] = self._usos.get(id(automacao), 0) + 1
+            if not descartar and self._usos[id(automacao)] < self.max_usos:
+                try:
+                    automacao.resetar_abas()
+                except Exception:
+                    descartar = True
+            else:
+                descartar = True
+
+            if descartar:
+                self._encerrar(automacao)
+            else:
+                with self._lock:
+                    self._livres.append(automacao)
+        finally:
+            self._vagas.release()
+
+    def substituir(self, automacao, num_processo):
+        # Descarta um navegador com problema e devolve outro, sem liberar a vaga no meio
+        self._encerrar(automacao)
+        automacao = self._criar_navegador(num_processo)
+        automacao.definir_pasta_download(num_processo)
+        return automacao
+
+    @contextmanager
+    def emprestar(self, num_processo):
+        automacao = self.obter(num_processo)
+        try:
+            yield automacao
+        except Exception:
+            self.devolver(automacao, descartar=True)
+            raise
+        else:
+            self.devolver(automacao)
+
+    def fechar(self):
+        with self._lock:
+            livres, self._livres = self._livres, []
+        for automacao in livres:
+            self._encerrar(automacao)
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+_NULO = nullcontext()
+
+
+class _Span:
+    """
+    Intervalo aberto no rastreador; ao sair, vira um evento completo ('X').
+    """
+
+    __slots__ = ("rastreador", "nome", "categoria", "args", "inicio")
+
+    def __init__(self, rastreador, nome, categoria, args):
+        self.rastreador = rastreador
+        self.nome = nome
+        self.categoria = categoria
+        self.args = args
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        if erro is not None:
+            self.args = {**self.args, "erro": repr(erro)}
+        self.rastreador.registrar(self.nome, self.categoria, self.inicio, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Rastreador:
+    """
+    Grava uma linha do tempo da execução no formato Chrome trace-event.
+
+    Desativado por padrão: enquanto inativo, span() devolve um contexto vazio
+    e nada é registrado. O arquivo gerado por salvar() abre no Perfetto
+    (ui.perfetto.dev) ou em chrome://tracing, com uma linha por thread.
+
+    Uma execução que não controla o processo inteiro (ex: uma sessão do
+    Streamlit) usa inscrever(): recebe um rastreador só dela, que passa a
+    receber os spans registrados neste, sem ligar, desligar ou limpar o
+    registro das outras execuções.
+
+    Atributos:
+        ativo (bool): Se os spans estão sendo registrados (ligado ou com inscritos).
+
+    Métodos:
+        - ativar() / desativar(): Liga ou desliga o registro.
+        - inscrever() / cancelar_inscricao(rastreador): Cria ou encerra o rastreador de uma execução.
+        - limpar(): Descarta os eventos registrados.
+        - span(nome, categoria, **args): Context manager que registra um intervalo.
+        - dormir(segundos, nome): time.sleep registrado como span.
+        - eventos(): Lista dos eventos no formato trace-event.
+        - json(): Documento JSON com os eventos.
+        - salvar(caminho): Grava o JSON em disco.
+    """
+
+    def __init__(self):
+        self._ligado = False
+        self._inscritos = ()
+        self._eventos = []
+        self._threads = {}
+        self._origem = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self._ligado or bool(self._inscritos)
+
+    def ativar(self):
+        self._ligado = True
+
+    def desativar(self):
+        self._ligado = False
+
+    def inscrever(self):
+        """
+        Cria o rastreador de uma execução, que recebe os spans registrados a partir de agora.
+
+        Execuções simultâneas no mesmo processo compartilham as threads
+        instrumentadas, então cada rastreador inscrito recebe todos os spans
+        do período em que esteve inscrito.
+
+        Returns:
+            Rastreador: Rastreador ativo, com a própria lista de eventos.
+        """
+        rastreador = Rastreador()
+        rastreador.ativar()
+        with self._lock:
+            self._inscritos = self._inscritos + (rastreador,)
+        return rastreador
+
+    def cancelar_inscricao(self, rastreador):
+        """
+        Deixa de repassar spans para o rastreador de uma execução.
+
+        Args:
+            rastreador (Rastreador): Rastreador retornado por inscrever().
+        """
+        with self._lock:
+            self._inscritos = tuple(inscrito for inscrito in self._inscritos if inscrito is not rastreador)
+
+    def limpar(self):
+        with self._lock:
+            self._eventos = []
+            self._threads = {}
+            self._origem = time.perf_counter_ns()
+
+    def span(self, nome, categoria="geral", **args):
+        """
+        Registra o intervalo do bloco 'with' como um span.
+
+        Args:
+            nome (str): Nome exibido na linha do tempo.
+            categoria (str): Categoria do span, ex: 'processo', 'etapa', 'http', 'selenium', 'sleep'.
+            **args: Detalhes exibidos ao selecionar o span.
+        """
+        if not self.ativo:
+            return _NULO
+        return _Span(self, nome, categoria, args)
+
+    def dormir(self, segundos, nome="time.sleep"):
+        """
+        Equivalente a time.sleep, registrando a espera na linha do tempo.
+
+        Args:
+            segundos (float): Duração da espera.
+            nome (str): Nome do span.
+        """
+        with self.span(nome, "sleep", segundos=segundos):
+            time.sleep(segundos)
+
+    def registrar(self, nome, categoria, inicio_ns, fim_ns, args=None):
+        """
+        Adiciona um evento completo. Usado por span(); os tempos vêm de time.perf_counter_ns.
+        """
+        for inscrito in self._inscritos:
+            inscrito.registrar(nome, categoria, inicio_ns, fim_ns, args)
+        if not self._ligado:
+            return
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._eventos.append({
+                "name": nome,
+                "cat": categoria,
+                "ph": "X",
+                "ts": (inicio_ns - self._origem) / 1000,
+                "dur": (fim_ns - inicio_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": {chave: _serializavel(valor) for chave, valor in (args or {}).items()},
+            })
+
+    def eventos(self):
+        """
+        Returns:
+            list: Eventos registrados, mais os metadados com o nome de cada thread.
+        """
+        with self._lock:
+            metadados = [
+                {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": ident, "args": {"name": nome}}
+                for ident, nome in self._threads.items()
+            ]
+            return metadados + list(self._eventos)
+
+    def json(self):
+        return json.dumps({"traceEvents": self.eventos(), "displayTimeUnit": "ms"}, ensure_ascii=False)
+
+    def salvar(self, caminho):
+        """
+        Grava a linha do tempo em um arquivo JSON.
+
+        Args:
+            caminho (str): Caminho do arquivo, ex: 'rastro.json'.
+
+        Returns:
+            str: O caminho gravado.
+        """
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(self.json())
+        return caminho
+
+
+def _serializavel(valor):
+    if isinstance(valor, (str, int, float, bool)) or valor is None:
+        return valor
+    return str(valor)
+
+
+# Rastreador do processo inteiro, usado pelos decoradores e pelas classes instrumentadas
+RASTREADOR = Rastreador()
+
+
+def rastrear(categoria, nome=None):
+    """
+    Decorador que registra cada chamada da função como um span em RASTREADOR.
+
+    Args:
+        categoria (str): Categoria do span.
+        nome (str, optional): Nome do span. Padrão: nome qualificado da função.
+    """
+    def decorador(funcao):
+        nome_span = nome or funcao.__qualname__
+
+        @wraps(funcao)
+        def rastreada(*args, **kwargs):
+            if not RASTREADOR.ativo:
+                return funcao(*args, **kwargs)
+            with RASTREADOR.span(nome_span, categoria):
+                return funcao(*args, **kwargs)
+        return rastreada
+    return decorador
@@ -1,9 +1,30 @@
 import requests
-import pandas as pd
 import re
 import os
+import logging
 import time
-import shutil
+import queue
+import threading
+from itertools import chain
+from functools import partial
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from classe_requisicoes.concorrencia import LimitadorConcorrencia
+from classe_requisicoes.limitador import LimitadorTaxa, LIMITADOR_COMPARTILHADO
+from classe_requisicoes.sessao import GerenciadorSessao, montar_pool
+from classe_requisicoes.escrita import ArquivoSalvo, TAMANHO_BLOCO, caminho_parcial, salvar_em_streaming, salvar_resposta
+from classe_requisicoes.manifesto import ManifestoDownloads
+from classe_requisicoes.cache_extensoes import CacheExtensoes
+from classe_requisicoes.cache_metadados import CacheMetadados
+from classe_requisicoes.armazem import ArmazemConteudo
+from classe_requisicoes.repeticao import FilaRepeticao
+from classe_requisicoes.deteccao import detectar_extensao
+from classe_requisicoes.documentos import (DocumentoAuto, DocumentoDanosEletricos, ListaDocumentos,
+                                           iterar_documentos_auto, iterar_documentos_danos_eletricos)
+from classe_requisicoes.metricas import ColetorMetricas, medir_etapa, nome_endpoint
+from classe_rastreamento import RASTREADOR, rastrear
+
+logger = logging.getLogger(__name__)
 
 class RequisicoesLiberty:
     """
@@ -12,25 +33,86 @@ class RequisicoesLiberty:
     Atributos:
         login (str): Usuário para autenticação.
         senha (str): Senha do usuário.
+        concorrencia (LimitadorConcorrencia): Limite de downloads simultâneos por host.
+        limitador (LimitadorTaxa): Limitador de taxa adaptativo usado em todas as requisições.
+        gerenciador_sessao (GerenciadorSessao): Sessão autenticada compartilhada pelo lote, se houver.
+        manifesto (ManifestoDownloads): Manifesto usado para retomar lotes interrompidos, se houver.
+        cache_extensoes (CacheExtensoes): Cache persistente de extensões por IDOnbase, se houver.
+        armazem (ArmazemConteudo): Armazém por conteúdo para reaproveitar arquivos entre processos, se houver.
+        fila_repeticao (FilaRepeticao): Documentos que falharam, para nova tentativa no fim do lote.
+        cache_metadados (CacheMetadados): Cache de curta duração das listas de documentos, se houver.
 
     Métodos:
         - definir_headers(): Retorna os headers padrão para as requisições.
         - fazer_login(): Realiza a autenticação e retorna uma sessão persistente.
+        - autenticar(session): Realiza o login em uma sessão existente.
+        - criar_gerenciador_sessao(tamanho_pool): Passa a compartilhar uma única sessão autenticada.
+        - adotar_sessao(sessao, headers_extras): Usa uma sessão autenticada fora da classe (ex: login do navegador).
         - obter_documentos_danos_eletricos(session, num_processo): Obtém e processa os documentos relacionados a danos elétricos.
+        - sincronizar_documentos(sessao, num_processo, fluxo): Obtém só os documentos novos desde as execuções anteriores.
         - identificar_extensao_permitida(texto): Verifica se uma string contém uma extensão permitida.
+        - download_documentos_auto_concorrente(sessao, documentos, num_processo): Baixa os documentos AUTO em paralelo.
+        - download_documentos_auto_detectando(sessao, documentos, num_processo): Baixa os documentos AUTO identificando a extensão pelo conteúdo.
+        - download_orcamento_auto(sessao, num_processo): Baixa o PDF do orçamento e o relatório de fotos sem navegador.
+        - orcamento_sem_navegador(): Indica se as rotas dos relatórios do orçamento estão configuradas.
+        - tamanho_documento_auto(sessao, documento): Consulta o tamanho de um documento AUTO com HEAD.
+        - baixar_item_catalogo(sessao, item): Baixa um documento do catálogo do lote.
+        - download_documentos_danos_eletricos_pipeline(documentos, num_processo): Baixa os documentos de danos elétricos em etapas encadeadas.
+        - download_documentos_danos_eletricos_concorrente(documentos, num_processo): Baixa os documentos de danos elétricos em paralelo.
+
+    As requisições e as etapas (login, metadados, extensoes, links, transferencia,
+    orcamento) são registradas em self.metricas.
     """
 
-    def __init__(self, login: str, senha: str):
+    max_tentativas = 3
+    extensao_url_padrao = "pdf"
+    url_autenticacao = "https://ressarcimentofiancabff.yelumseguros.com.br/api/sessao/autenticacaousuario"
+    url_portal_integracao = "https://portalintegracao.yelumseguros.com.br/LibertySinistroUpload"
+    url_upload_residencia = "https://uploadsinistroresidenciabff.yelumseguros.com.br"
+
+    # Rotas dos relatórios do orçamento (PDF do orçamento e relatório de fotos), formatadas com
+    # num_processo. A plataforma não documenta essas rotas: preencher com as URLs que o navegador
+    # requisita em Procedimentos.baixar_orcamento (ver o modo de captura de rede do LibertyAutomation).
+    url_relatorio_orcamento = None
+    url_relatorio_fotos = None
+
+    def __init__(self, login: str, senha: str, limites_por_host=None, limitador: LimitadorTaxa = None,
+                 gerenciador_sessao: GerenciadorSessao = None, manifesto: ManifestoDownloads = None,
+                 cache_extensoes: CacheExtensoes = None, metricas: ColetorMetricas = None,
+                 armazem: ArmazemConteudo = None, fila_repeticao: FilaRepeticao = None,
+                 cache_metadados: CacheMetadados = None, limite_padrao=4):
         """
         Inicializa a classe com login e senha.
 
         Args:
             login (str): Usuário para autenticação.
             senha (str): Senha do usuário.
+            limites_por_host (dict, optional): Máximo de downloads simultâneos por host.
+            limitador (LimitadorTaxa, optional): Limitador de taxa. Padrão: limitador compartilhado do módulo.
+            gerenciador_sessao (GerenciadorSessao, optional): Sessão autenticada compartilhada.
+            manifesto (ManifestoDownloads, optional): Manifesto para pular documentos já baixados.
+            cache_extensoes (CacheExtensoes, optional): Cache de extensões consultado antes do ReceberDocumentoOnBase.
+            metricas (ColetorMetricas, optional): Coletor de métricas das requisições. Padrão: um coletor novo.
+            armazem (ArmazemConteudo, optional): Armazém consultado por IDOnbase antes de cada download.
+            fila_repeticao (FilaRepeticao, optional): Fila dos documentos que falharam. Padrão: uma fila nova.
+            cache_metadados (CacheMetadados, optional): Cache consultado antes de listar os documentos de um processo.
+            limite_padrao (int): Máximo de downloads simultâneos nos hosts fora de limites_por_host (ex: os
+                                 links assinados do storage no fluxo de danos elétricos).
         """
         self.login = login
         self.senha = senha
         self.headers = None
+        self.concorrencia = LimitadorConcorrencia(limites_por_host, limite_padrao)
+        self.limitador = limitador or LIMITADOR_COMPARTILHADO
+        self.gerenciador_sessao = gerenciador_sessao
+        self.manifesto = manifesto
+        self.cache_extensoes = cache_extensoes
+        self.metricas = metricas or ColetorMetricas()
+        self.armazem = armazem
+        self.fila_repeticao = fila_repeticao if fila_repeticao is not None else FilaRepeticao()
+        self.cache_metadados = cache_metadados
+        self.sessao_transferencias = None
+        self._lock_sessao_transferencias = threading.Lock()
 
     def definir_headers(self):
         """
@@ -46,26 +128,317 @@ class RequisicoesLiberty:
             "x-liberty-username": self.login,
         }
 
+    @medir_etapa("login")
     def fazer_login(self):
         """
         Realiza o login na API e retorna uma sessão persistente.
 
+        Com um gerenciador de sessão, o login é feito apenas na primeira
+        chamada e as seguintes devolvem a mesma sessão.
+
         Returns:
             requests.Session: Sessão autenticada.
 
         Raises:
             requests.HTTPError: Se a requisição falhar.
         """
-        url = "https://ressarcimentofiancabff.yelumseguros.com.br/api/sessao/autenticacaousuario"
+        if self.gerenciador_sessao is not None:
+            self.headers = self.definir_headers()
+            return self.gerenciador_sessao.obter_sessao()
+
+        session = requests.Session()
+        self.autenticar(session)
+
+        return session
+
+    def autenticar(self, session):
+        """
+        Realiza o login na API usando uma sessão existente.
+
+        Args:
+            session (requests.Session): Sessão que receberá os cookies de autenticação.
+
+        Raises:
+            requests.HTTPError: Se a requisição falhar.
+        """
         payload = {"usuario": self.login, "senha": self.senha}
         self.headers = self.definir_headers()
 
-        session = requests.Session()
-        response = session.post(url, json=payload, headers=self.headers)
+        response = self._requisitar(session, "POST", self.url_autenticacao, json=payload, headers=self.headers)
         response.raise_for_status()  # Levanta erro caso o status seja diferente de 2xx
 
-        return session
-    
+    def criar_gerenciador_sessao(self, tamanho_pool=10):
+        """
+        Cria um gerenciador para compartilhar uma única sessão autenticada.
+
+        Args:
+            tamanho_pool (int): Número máximo de conexões mantidas por host.
+
+        Returns:
+            GerenciadorSessao: Gerenciador associado a esta instância.
+        """
+        self.gerenciador_sessao = GerenciadorSessao(self.autenticar, tamanho_pool)
+        return self.gerenciador_sessao
+
+    def adotar_sessao(self, sessao, headers_extras=None):
+        """
+        Usa uma sessão autenticada fora da classe, sem um novo login pela API.
+
+        Permite reaproveitar o login feito no navegador: os cookies já estão na
+        sessão e os cabeçalhos de autenticação capturados são somados aos padrão.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            headers_extras (dict, optional): Cabeçalhos de autenticação adicionais (ex: Authorization).
+
+        Returns:
+            requests.Session: Sessão que deve ser usada nas demais chamadas.
+        """
+        self.headers = {**self.definir_headers(), **(headers_extras or {})}
+        if self.gerenciador_sessao is not None:
+            return self.gerenciador_sessao.adotar(sessao)
+        return sessao
+
+    def _requisitar(self, sessao, metodo, url, **kwargs):
+        """
+        Executa uma requisição HTTP passando pelo limitador de taxa.
+
+        Respostas 429/5xx e erros de conexão reduzem a taxa do host e são
+        repetidas até max_tentativas, respeitando o Retry-After do servidor.
+        Respostas 401/403 na sessão compartilhada disparam um novo login e a
+        requisição é repetida uma única vez.
+
+        Requisições com stream=True não ocupam o semáforo do host aqui: quem
+        lê o corpo da resposta deve segurá-lo (ver _baixar_para_arquivo).
+
+        Args:
+            sessao (requests.Session): Sessão usada na requisição (ou o módulo requests).
+            metodo (str): Método HTTP.
+            url (str): URL da requisição.
+            **kwargs: Argumentos repassados para sessao.request.
+
+        Returns:
+            requests.Response: Última resposta recebida.
+
+        Raises:
+            requests.RequestException: Se todas as tentativas falharem por erro de conexão.
+        """
+        reautenticado = False
+        tentativa = 0
+        while tentativa < self.max_tentativas:
+            tentativa += 1
+            geracao = self.gerenciador_sessao.geracao if self.gerenciador_sessao is not None else None
+            self.limitador.aguardar(url)
+            inicio = time.perf_counter()
+            try:
+                semaforo = nullcontext() if kwargs.get("stream") else self.concorrencia.semaforo(url)
+                with semaforo, RASTREADOR.span(f"{metodo} {nome_endpoint(url)}", "http", tentativa=tentativa):
+                    response = sessao.request(metodo, url, **kwargs)
+            except requests.RequestException:
+                self.metricas.registrar_erro_conexao(url, time.perf_counter() - inicio, tentativa)
+                self.limitador.registrar_erro(url)
+                if tentativa == self.max_tentativas:
+                    raise
+                continue
+
+            self.metricas.registrar_requisicao(url, response.status_code, time.perf_counter() - inicio, tentativa)
+            self.limitador.registrar_resposta(url, response.status_code, response.headers.get("Retry-After"))
+
+            if response.status_code in (401, 403) and not reautenticado and self._sessao_compartilhada(sessao, url):
+                response.close()
+                reautenticado = True
+                self.gerenciador_sessao.reautenticar(geracao)
+                tentativa -= 1
+                continue
+
+            if response.status_code not in LimitadorTaxa.STATUS_SOBRECARGA or tentativa == self.max_tentativas:
+                break
+            response.close()
+
+        return response
+
+    def _baixar_para_arquivo(self, sessao, url, caminho_final, retomar=False, **kwargs):
+        """
+        Baixa uma URL em streaming direto para o disco.
+
+        O semáforo do host fica ocupado durante toda a transferência do corpo.
+        Com retomar=True, o download usa um arquivo parcial fixo que é mantido
+        em caso de falha; na próxima chamada o restante é pedido com um
+        cabeçalho Range. Se o servidor ignorar o Range, o arquivo recomeça.
+
+        Args:
+            sessao (requests.Session): Sessão usada na requisição (ou o módulo requests).
+            url (str): URL do arquivo.
+            caminho_final (str): Caminho do arquivo de destino.
+            retomar (bool): Se o download deve continuar um arquivo parcial existente.
+            **kwargs: Argumentos repassados para sessao.request.
+
+        Returns:
+            ArquivoSalvo: Caminho, quantidade de bytes e SHA-256 do arquivo.
+
+        Raises:
+            requests.HTTPError: Se o status da resposta não for 2xx.
+        """
+        parcial = caminho_parcial(caminho_final) if retomar else None
+        inicio = os.path.getsize(parcial) if parcial and os.path.exists(parcial) else 0
+        if inicio:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "Range": f"bytes={inicio}-"}
+
+        with self.concorrencia.semaforo(url):
+            response = self._requisitar(sessao, "GET", url, stream=True, **kwargs)
+            if inicio and response.status_code in (200, 416):
+                # Servidor ignorou ou recusou o Range: descartar o parcial e recomeçar
+                os.remove(parcial)
+                if response.status_code == 416:
+                    response.close()
+                    kwargs["headers"] = {k: v for k, v in kwargs["headers"].items() if k != "Range"}
+                    response = self._requisitar(sessao, "GET", url, stream=True, **kwargs)
+            if not response.ok:
+                response.close()
+            response.raise_for_status()
+            # Bytes já em disco antes desta resposta (zero se o parcial foi descartado acima)
+            existentes = os.path.getsize(parcial) if parcial and os.path.exists(parcial) else 0
+            inicio_transferencia = time.perf_counter()
+            arquivo = salvar_resposta(response, caminho_final, parcial=parcial)
+            self.metricas.registrar_transferencia(url, arquivo.tamanho - existentes,
+                                                  time.perf_counter() - inicio_transferencia)
+            return arquivo
+
+    def _baixar_detectando_extensao(self, sessao, url, pasta, nome_base, **kwargs):
+        """
+        Baixa uma URL em streaming e define a extensão do arquivo pelo conteúdo.
+
+        O tipo é identificado pelos magic bytes do primeiro bloco e validado
+        com identificar_extensao_permitida antes de qualquer escrita em disco.
+
+        Args:
+            sessao (requests.Session): Sessão usada na requisição (ou o módulo requests).
+            url (str): URL do arquivo.
+            pasta (str): Pasta de destino.
+            nome_base (str): Nome do arquivo sem extensão.
+            **kwargs: Argumentos repassados para sessao.request.
+
+        Returns:
+            tuple: (ArquivoSalvo, extensão identificada).
+
+        Raises:
+            requests.HTTPError: Se o status da resposta não for 2xx.
+            ValueError: Se o tipo do arquivo não for identificado ou não for permitido.
+        """
+        with self.concorrencia.semaforo(url):
+            response = self._requisitar(sessao, "GET", url, stream=True, **kwargs)
+            try:
+                response.raise_for_status()
+                blocos = response.iter_content(TAMANHO_BLOCO)
+                primeiro_bloco = next(blocos, b"")
+                extensao = detectar_extensao(primeiro_bloco, response.headers.get("Content-Type"))
+                if extensao is None:
+                    raise ValueError("Tipo do arquivo não identificado pelo conteúdo.")
+                extensao = self.identificar_extensao_permitida(f"{nome_base}.{extensao}")
+
+                caminho_final = os.path.join(pasta, f"{nome_base}.{extensao}")
+                inicio_transferencia = time.perf_counter()
+                arquivo = salvar_em_streaming(chain([primeiro_bloco], blocos), caminho_final)
+                self.metricas.registrar_transferencia(url, arquivo.tamanho, time.perf_counter() - inicio_transferencia)
+            finally:
+                response.close()
+
+        return arquivo, extensao
+
+    def _reaproveitar_do_armazem(self, id_onbase, pasta, nome_base):
+        """
+        Cria o arquivo do documento a partir do armazém, se ele já tiver sido baixado.
+
+        Returns:
+            tuple: (ArquivoSalvo, extensão), ou None sem armazém ou se o documento não estiver nele.
+        """
+        if self.armazem is None:
+            return None
+        return self.armazem.reaproveitar(id_onbase, pasta, nome_base)
+
+    def _guardar_no_armazem(self, arquivo, id_onbase, extensao):
+        """
+        Guarda um arquivo recém-baixado no armazém (o arquivo vira um hardlink).
+
+        Returns:
+            ArquivoSalvo: O mesmo arquivo.
+        """
+        if self.armazem is None:
+            return arquivo
+        return self.armazem.guardar(arquivo, id_onbase, extensao)
+
+    def _adiar(self, num_processo, documento, erro, tentar):
+        # Um documento com falha não interrompe o processo: vai para a fila de repetição
+        self.fila_repeticao.adiar(num_processo, documento, erro, tentar)
+        return None
+
+    def _sessao_compartilhada(self, sessao, url):
+        return (
+            self.gerenciador_sessao is not None
+            and sessao is self.gerenciador_sessao.sessao
+            and url != self.url_autenticacao
+        )
+
+    def _obter_metadados(self, sessao, num_processo, converter, metodo, url, revalidar=False, **kwargs):
+        """
+        Requisição de metadados (JSON) de um processo, passando pelo cache de metadados.
+
+        Dentro da validade do cache a resposta guardada é usada sem nenhuma
+        requisição, e portanto sem passar pelo limitador de taxa. Vencida,
+        uma requisição GET leva If-None-Match/If-Modified-Since e um 304
+        renova a entrada. Em POST a revalidação não se aplica (o servidor
+        responderia 412), então só a validade é usada.
+
+        Com revalidar=True a entrada nunca é usada sem consultar o servidor:
+        GET sempre leva os cabeçalhos condicionais e POST sempre é refeito.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            num_processo (int): Número do processo, usado nas mensagens de erro.
+            converter (callable): Converte o JSON da resposta no resultado. A resposta só é
+                guardada no cache se a conversão funcionar.
+            metodo (str): Método HTTP.
+            url (str): URL da requisição.
+            revalidar (bool): Ignorar a validade do cache e confirmar a resposta com o servidor.
+            **kwargs: Argumentos repassados para _requisitar.
+
+        Returns:
+            object: Resultado de converter.
+
+        Raises:
+            ValueError: Em caso de erro na requisição ou processamento dos dados.
+        """
+        chave = entrada = None
+        if self.cache_metadados is not None:
+            chave = self.cache_metadados.chave(metodo, url, kwargs.get("json"))
+            entrada = self.cache_metadados.obter(chave)
+            if entrada is not None and not revalidar and self.cache_metadados.valida(entrada):
+                return converter(entrada.conteudo)
+            if entrada is not None and metodo == "GET":
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), **self.cache_metadados.condicionais(entrada)}
+
+        response = self._requisitar(sessao, metodo, url, **kwargs)
+        if response.status_code == 304 and entrada is not None:
+            self.cache_metadados.renovar(chave)
+            return converter(entrada.conteudo)
+
+        if not response.ok:
+            raise ValueError(
+                f"Erro ao obter informações dos documentos do processo {num_processo}. "
+                f"Status Code: {response.status_code}, Response: {response.text}"
+            )
+
+        try:
+            conteudo = response.json()
+            resultado = converter(conteudo)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Erro ao processar os dados do processo {num_processo}: {str(e)}")
+
+        if chave is not None:
+            self.cache_metadados.guardar(chave, conteudo, response.headers.get("ETag"),
+                                         response.headers.get("Last-Modified"))
+        return resultado
+
     def identificar_extensao_permitida(self, texto):
         """
         Verifica se a string possui uma extensão da lista permitida.
@@ -98,16 +471,19 @@ class RequisicoesLiberty:
 
            
 
-    def obter_documentos_auto(self, session, num_processo):
+    @medir_etapa("metadados")
+    def obter_documentos_auto(self, session, num_processo, revalidar=False):
         """
         Obtém os documentos necessários para um processo.
 
         Args:
             session (requests.Session): Sessão autenticada.
             num_processo (int): Número do processo.
+            revalidar (bool): Consultar o servidor mesmo com a lista ainda válida no cache de metadados.
 
         Returns:
-            pd.DataFrame: DataFrame contendo os documentos.
+            ListaDocumentos: Um DocumentoAuto por arquivo (use para_dataframe() para relatórios). Com
+                             um manifesto, o num_documento é o das execuções anteriores.
 
         Raises:
             ValueError: Em caso de erro na requisição ou processamento dos dados.
@@ -118,184 +494,688 @@ class RequisicoesLiberty:
             "pUploadPerfil": 2,
         }
 
-        url = "https://portalintegracao.yelumseguros.com.br/LibertySinistroUpload/Upload/PUD_Default_Novo.aspx/CarregaDocumentosNecessarios"
-        response = session.post(url, json=payload, headers=self.headers)
+        url = f"{self.url_portal_integracao}/Upload/PUD_Default_Novo.aspx/CarregaDocumentosNecessarios"
 
-        if not response.ok:
-            raise ValueError(
-                f"Erro ao obter informações dos documentos do processo {num_processo}. "
-                f"Status Code: {response.status_code}, Response: {response.text}"
-            )
+        # Documentos sem id são ignorados e a numeração é feita por NomeDocumento
+        documentos = self._obter_metadados(
+            session, num_processo, lambda conteudo: ListaDocumentos(iterar_documentos_auto(conteudo['d'])),
+            "POST", url, revalidar=revalidar, json=payload, headers=self.headers,
+        )
+        return self._numerar_documentos(num_processo, "auto", documentos)
 
-        try:
-            json_data = response.json()['d']
-            df = pd.DataFrame(json_data)
-
-            # Excluir documentos sem id
-            df = df[df['IDOnbase'] != 0]
+    def _numerar_documentos(self, num_processo, fluxo, documentos):
+        """
+        Com um manifesto, mantém o num_documento das execuções anteriores.
 
-            # Criar numeração para arquivos
-            df['num_documento'] = df.groupby('NomeDocumento').cumcount() + 1
+        Na retomada, a numeração por posição da listagem mudaria quando a API
+        passa a listar um documento novo, e o nome de um arquivo já entregue
+        seria usado por outro IDOnbase/idonbase.
 
-            # Filtrar colunas relevantes
-            #df = df[["NomeDocumento", "CodigoTipoDocumento", "IDOnbase"]]
+        Returns:
+            ListaDocumentos: Os documentos, renumerados pelo manifesto se houver um.
+        """
+        if self.manifesto is None:
+            return documentos
+        return self.manifesto.numerar(num_processo, fluxo, documentos)
 
-            return df
-        
-        except (ValueError, KeyError) as e:
-            raise ValueError(f"Erro ao processar os dados do processo {num_processo}: {str(e)}")
+    def _verificar_destino(self, num_processo, id_onbase, pasta, nome_base):
+        """
+        Garante que o nome do arquivo não pertence a outro documento no manifesto.
 
-    def adicionar_extensoes_auto(self, sessao, df, num_processo):
+        Raises:
+            ValueError: Se o manifesto registrar esse arquivo para outro IDOnbase/idonbase.
+        """
+        if self.manifesto is None or num_processo is None:
+            return
+        dono = self.manifesto.dono_do_arquivo(num_processo, pasta, nome_base)
+        if dono is not None and dono != str(id_onbase):
+            raise ValueError(f"O arquivo {nome_base} já pertence ao documento {dono} no manifesto.")
+
+    @rastrear("etapa")
+    def adicionar_extensoes_auto(self, sessao, documentos, num_processo, max_workers=None):
         """
         Adiciona extensões aos documentos com base no IDOnbase.
 
+        A extensão é procurada primeiro no manifesto e no cache de extensões;
+        apenas os documentos não encontrados consultam o ReceberDocumentoOnBase,
+        em paralelo.
+
         Args:
             sessao (requests.Session): Sessão autenticada.
-            df (pd.DataFrame): DataFrame contendo os documentos.
+            documentos (iterable): DocumentoAuto retornados por obter_documentos_auto.
             num_processo (int): Número do processo.
+            max_workers (int, optional): Número de threads para as consultas. Padrão: limite do host.
 
         Returns:
-            pd.DataFrame: DataFrame atualizado com as extensões.
+            ListaDocumentos: Os mesmos documentos, com a extensão preenchida.
 
         Raises:
             Exception: Em caso de erro durante o processamento.
         """
-        url = "https://portalintegracao.yelumseguros.com.br/LibertySinistroUpload/Upload/PUD_Default_Novo.aspx/ReceberDocumentoOnBase"
-        lista_extensoes = []
-
-        for i, row in df.iterrows():
-            payload = {
-                "codDocumento": row['CodigoTipoDocumento'],
-                "idOnBase": row['IDOnbase'],
-                "pAqvGrd": False,
-                "pCodigoClienteOperacional": "96011528",
-                "pMaterializar": False,
-                "pNumeroOcorrencia": num_processo,
-                "pUploadPerfil": 2,
-            }
+        documentos = list(documentos)
+        lista_extensoes = [None] * len(documentos)
+        pendentes = []
+
+        for posicao, documento in enumerate(documentos):
+            extensao = None
+            if self.manifesto is not None:
+                self.manifesto.registrar(num_processo, documento.id_onbase, "auto", documento.nome_documento,
+                                         documento.num_documento, documento.codigo_tipo_documento)
+                extensao = self.manifesto.extensao(num_processo, documento.id_onbase)
+            if extensao is None and self.cache_extensoes is not None:
+                extensao = self.cache_extensoes.obter(documento.codigo_tipo_documento, documento.id_onbase)
+
+            if extensao is None:
+                pendentes.append(posicao)
+            else:
+                lista_extensoes[posicao] = extensao
+
+        if pendentes:
+            if max_workers is None:
+                max_workers = self.concorrencia.limite(self.url_portal_integracao)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futuros = {
+                    posicao: executor.submit(self._resolver_extensao_auto, sessao, documentos[posicao], num_processo)
+                    for posicao in pendentes
+                }
+                for posicao, futuro in futuros.items():
+                    lista_extensoes[posicao] = futuro.result()
+
+        if self.manifesto is not None:
+            for documento, extensao in zip(documentos, lista_extensoes):
+                self.manifesto.marcar_extensao(num_processo, documento.id_onbase, extensao)
+
+        return ListaDocumentos(
+            documento._replace(extensao=extensao) for documento, extensao in zip(documentos, lista_extensoes)
+        )
+
+    @medir_etapa("extensoes")
+    def _resolver_extensao_auto(self, sessao, documento, num_processo):
+        """
+        Consulta o ReceberDocumentoOnBase para descobrir a extensão de um documento.
 
-            response = sessao.post(url, json=payload, headers=self.headers)
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            documento (DocumentoAuto): Documento a consultar.
+            num_processo (int): Número do processo.
 
-            if response.ok:
-                try:
-                    
-                    link = response.json()['d']['Result']
-                    extensao = self.identificar_extensao_permitida(link)
-                    lista_extensoes.append(extensao)
-                except Exception as e:
-                    raise ValueError(f"Erro ao processar extensão: {str(e)}")
-            else:
-                raise ValueError(f"Erro na requisição para obter extensão. Response: {response.text}")
+        Returns:
+            str: Extensão identificada.
+
+        Raises:
+            ValueError: Se a requisição falhar ou a extensão não for permitida.
+        """
+        url = f"{self.url_portal_integracao}/Upload/PUD_Default_Novo.aspx/ReceberDocumentoOnBase"
+        payload = {
+            "codDocumento": documento.codigo_tipo_documento,
+            "idOnBase": documento.id_onbase,
+            "pAqvGrd": False,
+            "pCodigoClienteOperacional": "96011528",
+            "pMaterializar": False,
+            "pNumeroOcorrencia": num_processo,
+            "pUploadPerfil": 2,
+        }
+
+        response = self._requisitar(sessao, "POST", url, json=payload, headers=self.headers)
+
+        if not response.ok:
+            raise ValueError(f"Erro na requisição para obter extensão. Response: {response.text}")
+
+        try:
+            link = response.json()['d']['Result']
+            extensao = self.identificar_extensao_permitida(link)
+        except Exception as e:
+            raise ValueError(f"Erro ao processar extensão: {str(e)}")
 
-            time.sleep(2)
+        if self.cache_extensoes is not None:
+            self.cache_extensoes.guardar(documento.codigo_tipo_documento, documento.id_onbase, extensao)
+        return extensao
 
-        df['extensoes'] = lista_extensoes
-        return df
-    
-    def download_documentos_auto(self, sessao, df, num_processo):
+    @medir_etapa("transferencia")
+    def _baixar_documento_auto(self, sessao, documento, output_dir, num_processo=None):
+        """
+        Faz o download de um único documento AUTO.
+
+        As novas tentativas e o backoff ficam a cargo de _requisitar. Com um
+        manifesto, documentos já concluídos não são baixados novamente; com um
+        armazém, documentos já baixados em outro processo viram um hardlink.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            documento (DocumentoAuto): Documento, com a extensão preenchida.
+            output_dir (str): Pasta de destino.
+            num_processo (int, optional): Número do processo, usado no manifesto.
+
+        Returns:
+            ArquivoSalvo: Caminho, quantidade de bytes e SHA-256 do arquivo.
+
+        Raises:
+            ValueError: Se o download falhar após todas as tentativas.
+        """
+        url_download = self.url_portal_integracao + "/file_upload/{}_api.{}"
+        url_download_atualizado = url_download.format(documento.id_onbase, documento.extensao)
+        usar_manifesto = self.manifesto is not None and num_processo is not None
+
+        if usar_manifesto:
+            arquivo = self.manifesto.arquivo_concluido(num_processo, documento.id_onbase)
+            if arquivo is not None:
+                return arquivo
+
+        nome_base = f"{documento.nome_documento}_{documento.num_documento}"
+        self._verificar_destino(num_processo, documento.id_onbase, output_dir, nome_base)
+        reaproveitado = self._reaproveitar_do_armazem(documento.id_onbase, output_dir, nome_base)
+        if reaproveitado is not None:
+            arquivo, _ = reaproveitado
+            if usar_manifesto:
+                self.manifesto.marcar_concluido(num_processo, documento.id_onbase, arquivo, documento.extensao)
+            return arquivo
+
+        # Baixar o arquivo em streaming direto para o disco
+        file_name = os.path.join(output_dir, f"{nome_base}.{documento.extensao}")
+        try:
+            arquivo = self._baixar_para_arquivo(sessao, url_download_atualizado, file_name,
+                                                retomar=usar_manifesto, headers=self.headers)
+            arquivo = self._guardar_no_armazem(arquivo, documento.id_onbase, documento.extensao)
+            if usar_manifesto:
+                self.manifesto.marcar_concluido(num_processo, documento.id_onbase, arquivo, documento.extensao)
+            return arquivo
+        except requests.RequestException as e:
+            if usar_manifesto:
+                self.manifesto.marcar_falha(num_processo, documento.id_onbase, e)
+
+        raise ValueError(f"Problema no download do documento {documento.nome_documento}_{documento.num_documento}.")
+
+    @rastrear("etapa")
+    def download_documentos_auto(self, sessao, documentos, num_processo):
         """
         Faz o download dos documentos processados.
 
+        Um documento que falha após todas as tentativas não interrompe os
+        demais: os arquivos concluídos são mantidos e o documento vai para
+        self.fila_repeticao, drenada no fim do lote.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            documentos (iterable): DocumentoAuto com a extensão preenchida.
+            num_processo (int): Número do processo.
+
+        Returns:
+            list: ArquivoSalvo de cada documento, na ordem recebida, ou None para os que falharam.
+        """
+        # Criar o diretório de saída
+        output_dir = os.path.join("download", str(num_processo))
+        os.makedirs(output_dir, exist_ok=True)
+
+        arquivos = []
+        for documento in documentos:
+            tentar = partial(self._baixar_documento_auto, sessao, documento, output_dir, num_processo)
+            try:
+                arquivos.append(tentar())
+            except ValueError as e:
+                arquivos.append(self._adiar(num_processo, documento, e, tentar))
+
+        return arquivos
+
+    @rastrear("etapa")
+    def download_documentos_auto_concorrente(self, sessao, documentos, num_processo, max_workers=None):
+        """
+        Faz o download dos documentos processados em paralelo.
+
+        O número de downloads simultâneos é limitado pelo semáforo do host
+        portalintegracao e o ritmo pelo limitador de taxa compartilhado.
+        Documentos que falham vão para self.fila_repeticao, como em
+        download_documentos_auto.
+
         Args:
             sessao (requests.Session): Sessão autenticada.
-            df (pd.DataFrame): DataFrame contendo os documentos.
+            documentos (iterable): DocumentoAuto com a extensão preenchida.
             num_processo (int): Número do processo.
+            max_workers (int, optional): Número de threads. Padrão: limite do host.
+
+        Returns:
+            list: ArquivoSalvo de cada documento, na ordem recebida, ou None para os que falharam.
+        """
+        output_dir = os.path.join("download", str(num_processo))
+        os.makedirs(output_dir, exist_ok=True)
+
+        if max_workers is None:
+            max_workers = self.concorrencia.limite(self.url_portal_integracao)
+
+        tentativas = [
+            (documento, partial(self._baixar_documento_auto, sessao, documento, output_dir, num_processo))
+            for documento in documentos
+        ]
+        return self._executar_tentativas(tentativas, num_processo, max_workers)
+
+    def _executar_tentativas(self, tentativas, num_processo, max_workers):
+        """
+        Executa os downloads em paralelo, adiando os documentos que falharem.
+
+        Args:
+            tentativas (list): Pares (documento, função sem argumentos que baixa o documento).
+            num_processo (int): Número do processo.
+            max_workers (int): Número de threads.
+
+        Returns:
+            list: Resultado de cada função, na ordem recebida, ou None para as que falharam com ValueError.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futuros = [executor.submit(tentar) for _, tentar in tentativas]
+            resultados = []
+            for (documento, tentar), futuro in zip(tentativas, futuros):
+                try:
+                    resultados.append(futuro.result())
+                except ValueError as e:
+                    resultados.append(self._adiar(num_processo, documento, e, tentar))
+        return resultados
+
+    def _baixar_documento_auto_detectando(self, sessao, documento, output_dir, num_processo):
+        """
+        Faz o download de um documento AUTO sem consultar a extensão antes.
+
+        Se a extensão já estiver no manifesto ou no cache, o download segue o
+        caminho normal. Caso contrário, o arquivo é pedido com extensao_url_padrao
+        e a extensão é identificada pelo conteúdo (medido na etapa 'deteccao'). Se
+        o servidor recusar a URL ou o tipo não for reconhecido, a extensão é
+        consultada no ReceberDocumentoOnBase.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            documento (DocumentoAuto): Documento, sem a extensão.
+            output_dir (str): Pasta de destino.
+            num_processo (int): Número do processo.
+
+        Returns:
+            tuple: (ArquivoSalvo, extensão do arquivo).
 
         Raises:
-            Exception: Em caso de falhas no download.
+            ValueError: Se o download falhar.
+        """
+        extensao = None
+        if self.manifesto is not None:
+            self.manifesto.registrar(num_processo, documento.id_onbase, "auto", documento.nome_documento,
+                                     documento.num_documento, documento.codigo_tipo_documento)
+            arquivo = self.manifesto.arquivo_concluido(num_processo, documento.id_onbase)
+            if arquivo is not None:
+                return arquivo, os.path.splitext(arquivo.caminho)[1].lstrip(".")
+            extensao = self.manifesto.extensao(num_processo, documento.id_onbase)
+
+        nome_base = f"{documento.nome_documento}_{documento.num_documento}"
+        self._verificar_destino(num_processo, documento.id_onbase, output_dir, nome_base)
+        reaproveitado = self._reaproveitar_do_armazem(documento.id_onbase, output_dir, nome_base)
+        if reaproveitado is not None:
+            arquivo, extensao_arquivo = reaproveitado
+            if self.manifesto is not None:
+                # O manifesto guarda a extensão da URL; a do armazém só nomeia o arquivo
+                self.manifesto.marcar_concluido(num_processo, documento.id_onbase, arquivo, extensao)
+            return arquivo, extensao_arquivo
+
+        if extensao is None and self.cache_extensoes is not None:
+            extensao = self.cache_extensoes.obter(documento.codigo_tipo_documento, documento.id_onbase)
+
+        if extensao is None:
+            url_download = self.url_portal_integracao + "/file_upload/{}_api.{}"
+            url_download_atualizado = url_download.format(documento.id_onbase, self.extensao_url_padrao)
+            try:
+                # Etapa própria: um palpite errado da extensão da URL não é uma transferência com falha
+                with self.metricas.etapa("deteccao"):
+                    arquivo, extensao = self._baixar_detectando_extensao(
+                        sessao, url_download_atualizado, output_dir, nome_base, headers=self.headers
+                    )
+            except (requests.RequestException, ValueError):
+                extensao = self._resolver_extensao_auto(sessao, documento, num_processo)
+            else:
+                arquivo = self._guardar_no_armazem(arquivo, documento.id_onbase, extensao)
+                # O tipo identificado pelo conteúdo (ex: jpg para um .jpeg) só nomeia o arquivo local. Para
+                # montar a URL depois, vale a extensão que o servidor atendeu.
+                if self.cache_extensoes is not None:
+                    self.cache_extensoes.guardar(documento.codigo_tipo_documento, documento.id_onbase,
+                                                 self.extensao_url_padrao)
+                if self.manifesto is not None:
+                    self.manifesto.marcar_concluido(num_processo, documento.id_onbase, arquivo, self.extensao_url_padrao)
+                return arquivo, extensao
+
+        if self.manifesto is not None:
+            self.manifesto.marcar_extensao(num_processo, documento.id_onbase, extensao)
+        documento = documento._replace(extensao=extensao)
+        return self._baixar_documento_auto(sessao, documento, output_dir, num_processo), extensao
+
+    @rastrear("etapa")
+    def download_documentos_auto_detectando(self, sessao, documentos, num_processo, max_workers=None):
         """
-        url_download = "https://portalintegracao.yelumseguros.com.br/LibertySinistroUpload/file_upload/{}_api.{}"
-        max_retries = 3
-        backoff_factor = 60
+        Faz o download dos documentos AUTO sem a etapa adicionar_extensoes_auto.
 
-        # Criar o diretório de saída
+        A extensão de cada arquivo é identificada pelo conteúdo depois do
+        download, o que elimina uma requisição ReceberDocumentoOnBase por
+        documento. Os downloads rodam em paralelo, limitados pelo host.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            documentos (iterable): DocumentoAuto retornados por obter_documentos_auto.
+            num_processo (int): Número do processo.
+            max_workers (int, optional): Número de threads. Padrão: limite do host.
+
+        Returns:
+            list: ArquivoSalvo de cada documento, na ordem recebida, ou None para os que
+                  falharam (adiados em self.fila_repeticao). As extensões identificadas
+                  ficam no manifesto e no cache de extensões.
+        """
         output_dir = os.path.join("download", str(num_processo))
         os.makedirs(output_dir, exist_ok=True)
 
+        if max_workers is None:
+            max_workers = self.concorrencia.limite(self.url_portal_integracao)
+
+        tentativas = [
+            (documento, partial(self._baixar_documento_auto_detectando_arquivo, sessao, documento, output_dir, num_processo))
+            for documento in documentos
+        ]
+        return self._executar_tentativas(tentativas, num_processo, max_workers)
+
+    def _baixar_documento_auto_detectando_arquivo(self, sessao, documento, output_dir, num_processo):
+        arquivo, _ = self._baixar_documento_auto_detectando(sessao, documento, output_dir, num_processo)
+        return arquivo
+
+    def tamanho_documento_auto(self, sessao, documento):
+        """
+        Consulta o tamanho de um documento AUTO com uma requisição HEAD, sem baixá-lo.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            documento (DocumentoAuto): Documento com a extensão preenchida.
+
+        Returns:
+            int: Tamanho em bytes (Content-Length), ou None se o servidor não informar.
+        """
+        url = self.url_portal_integracao + f"/file_upload/{documento.id_onbase}_api.{documento.extensao}"
         try:
-            for i, row in df.iterrows():
-                tentativa = 0
-                sucesso = False
-                time.sleep(10)  # Tempo inicial de espera para evitar sobrecarga
-
-                while tentativa < max_retries and not sucesso:
-                    print(row['NomeDocumento'])
-                    print(row['num_documento'])
-                    print(tentativa)
-                    time.sleep(backoff_factor * tentativa)  # Aplicar backoff exponencial
-                    url_download_atualizado = url_download.format(row['IDOnbase'], row['extensoes'])
-
-                    # Fazer a requisição para baixar o arquivo
-                    response = sessao.get(url_download_atualizado, headers=self.headers)
-
-                    # Verificar se o download foi bem-sucedido
-                    if response.status_code == 200:
-                        file_name = os.path.join(output_dir, f"{row['NomeDocumento']}_{row['num_documento']}.{row['extensoes']}")
-                        with open(file_name, "wb") as file:
-                            file.write(response.content)
-
-                        sucesso = True
-                    else:
-                        tentativa += 1
-
-                if not sucesso:
-                    shutil.rmtree(output_dir, ignore_errors=True)
-                    print(url_download.format(row['IDOnbase'], row['extensoes']))
-                    raise ValueError(f"Problema no download dos arquivos do processo {num_processo}.")
+            response = self._requisitar(sessao, "HEAD", url, headers=self.headers, allow_redirects=True)
+        except requests.RequestException:
+            return None
+        response.close()
+        tamanho = response.headers.get("Content-Length")
+        return int(tamanho) if response.ok and tamanho and tamanho.isdigit() else None
+
+    def baixar_item_catalogo(self, sessao, item):
+        """
+        Baixa um documento do catálogo do lote (ver CatalogoLote), de qualquer fluxo.
 
-        except Exception as e:
-            # Certificar que a pasta será limpa em caso de erro inesperado
-            shutil.rmtree(output_dir, ignore_errors=True)
-            raise
+        Documentos AUTO sem extensão são baixados identificando a extensão pelo
+        conteúdo. Em caso de falha, o documento vai para self.fila_repeticao.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            item (ItemCatalogo): Documento e processo.
 
-    def obter_documentos_danos_eletricos(self, session, num_processo):
+        Returns:
+            ArquivoSalvo: Arquivo baixado, ou None se falhou.
+        """
+        documento, num_processo = item.documento, item.processo
+        if item.fluxo == "danos_eletricos":
+            tentar = partial(self._baixar_documento_danos_eletricos, documento, num_processo)
+            erros_esperados = Exception
+        else:
+            output_dir = os.path.join("download", str(num_processo))
+            os.makedirs(output_dir, exist_ok=True)
+            baixar = self._baixar_documento_auto if documento.extensao else self._baixar_documento_auto_detectando_arquivo
+            tentar = partial(baixar, sessao, documento, output_dir, num_processo)
+            erros_esperados = ValueError
+        try:
+            return tentar()
+        except erros_esperados as e:
+            return self._adiar(num_processo, documento, e, tentar)
+
+    @classmethod
+    def orcamento_sem_navegador(cls):
+        """
+        Indica se o orçamento pode ser baixado por download_orcamento_auto.
+
+        Returns:
+            bool: True se url_relatorio_orcamento e url_relatorio_fotos estiverem configuradas.
+                  Caso contrário o orçamento precisa ser gerado pela página, no navegador.
+        """
+        return bool(cls.url_relatorio_orcamento and cls.url_relatorio_fotos)
+
+    @medir_etapa("orcamento")
+    def download_orcamento_auto(self, sessao, num_processo):
+        """
+        Baixa o PDF do orçamento e o relatório de fotos de um processo AUTO sem navegador.
+
+        Substitui Procedimentos.baixar_orcamento, que percorre três abas no
+        Chrome. Os arquivos são salvos em download/<processo> como
+        'Orcamento' e 'Relatorio_Fotos', com a extensão identificada pelo conteúdo.
+
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            num_processo (int): Número do processo.
+
+        Returns:
+            list: ArquivoSalvo do orçamento e do relatório de fotos.
+
+        Raises:
+            ValueError: Se as rotas dos relatórios não estiverem configuradas ou o conteúdo não for válido.
+            requests.HTTPError: Se algum relatório não puder ser baixado.
+        """
+        if not self.orcamento_sem_navegador():
+            raise ValueError(
+                "Rotas do orçamento não configuradas: defina RequisicoesLiberty.url_relatorio_orcamento "
+                "e RequisicoesLiberty.url_relatorio_fotos."
+            )
+
+        output_dir = os.path.join("download", str(num_processo))
+        os.makedirs(output_dir, exist_ok=True)
+
+        arquivos = []
+        for url, nome_base in (
+            (self.url_relatorio_orcamento, "Orcamento"),
+            (self.url_relatorio_fotos, "Relatorio_Fotos"),
+        ):
+            arquivo, _ = self._baixar_detectando_extensao(
+                sessao, url.format(num_processo=num_processo), output_dir, nome_base, headers=self.headers
+            )
+            arquivos.append(arquivo)
+
+        return arquivos
+
+    @medir_etapa("metadados")
+    def obter_documentos_danos_eletricos(self, session, num_processo, revalidar=False):
         """
         Obtém e processa os documentos relacionados a danos elétricos.
 
         Args:
             session (requests.Session): Sessão autenticada.
             num_processo (int): Número do processo para busca de documentos.
+            revalidar (bool): Consultar o servidor mesmo com a lista ainda válida no cache de metadados.
 
         Returns:
-            pd.DataFrame: DataFrame contendo os documentos processados.
+            ListaDocumentos: Um DocumentoDanosEletricos por arquivo (use para_dataframe() para relatórios).
+                             Com um manifesto, o num_documento é o das execuções anteriores.
 
         Raises:
-            ValueError: Se a resposta da API for inválida.
-            KeyError: Se as colunas esperadas não estiverem presentes no JSON.
+            ValueError: Se a resposta da API for inválida ou não tiver os campos esperados.
         """
-        url = f"https://uploadsinistroresidenciabff.yelumseguros.com.br/tipodocumento/solicitados/2/1400/2/{num_processo}/96011528"
+        url = f"{self.url_upload_residencia}/tipodocumento/solicitados/2/1400/2/{num_processo}/96011528"
 
-        response = session.get(url, headers=self.headers)
-        if not response.ok:
-            raise ValueError(
-                f"Erro ao obter informações dos documentos do processo {num_processo}. "
-                f"Status Code: {response.status_code}, Response: {response.text}"
-            )
+        # Um registro por item de documentosOcorrencia, numerado por descrição
+        documentos = self._obter_metadados(
+            session, num_processo, lambda conteudo: ListaDocumentos(iterar_documentos_danos_eletricos(conteudo)),
+            "GET", url, revalidar=revalidar, headers=self.headers,
+        )
+        return self._numerar_documentos(num_processo, "danos_eletricos", documentos)
 
-        try:
-            json_data = response.json()
-            df = pd.DataFrame(json_data)
 
-            if 'documentosOcorrencia' not in df.columns:
-                raise KeyError("A coluna 'documentosOcorrencia' não foi encontrada no JSON recebido.")
+    @rastrear("etapa")
+    def sincronizar_documentos(self, sessao, num_processo, fluxo="auto"):
+        """
+        Obtém os documentos do processo e mantém só os que ainda não foram baixados.
 
-            # Explode a coluna documentosOcorrencia e processa os dados
-            df_exploded = df.explode('documentosOcorrencia')
-            df_exploded['descricao'] = df_exploded['descricao'].str.replace("/", "", regex=False)
-            df_exploded['idonbase'] = df_exploded['documentosOcorrencia'].apply(
-                lambda x: x.get('idOnbase', None)
-            )
-            df_exploded['num_documento'] = df_exploded.groupby('descricao').cumcount() + 1
+        Modo incremental para processos executados todos os dias: a listagem
+        atual é comparada com a registrada no manifesto (IDOnbase/idonbase e
+        NomeDocumento/descricao) e apenas os documentos novos, ou que ainda
+        não foram concluídos, seguem para download. O num_documento dos
+        documentos já conhecidos não muda entre as execuções. A listagem é
+        sempre confirmada com o servidor (sem usar o cache de metadados dentro
+        da validade), para não perder documentos enviados há pouco.
 
-            return df_exploded.reset_index(drop=True)
-        except (ValueError, KeyError) as e:
-            raise ValueError(f"Erro ao processar os dados do processo {num_processo}: {str(e)}")
+        Args:
+            sessao (requests.Session): Sessão autenticada.
+            num_processo (int): Número do processo.
+            fluxo (str): 'auto' ou 'danos_eletricos'.
 
+        Returns:
+            ListaDocumentos: Os documentos a baixar, com o num_documento estável.
+
+        Raises:
+            ValueError: Sem manifesto, ou se a listagem dos documentos falhar.
+        """
+        if self.manifesto is None:
+            raise ValueError("A sincronização incremental precisa de um manifesto.")
+        if fluxo == "danos_eletricos":
+            documentos = self.obter_documentos_danos_eletricos(sessao, num_processo, revalidar=True)
+        else:
+            documentos = self.obter_documentos_auto(sessao, num_processo, revalidar=True)
+        return self.manifesto.sincronizar(num_processo, fluxo, documentos)
+
+    def _obter_sessao_transferencias(self):
+        """
+        Retorna a sessão com pool de conexões usada no fluxo de danos elétricos.
+
+        As rotas do uploadsinistroresidenciabff e os links assinados do storage
+        não usam o login da API, então a sessão é separada da sessão autenticada
+        (uma resposta 403 de um link expirado não dispara um novo login).
+
+        Returns:
+            requests.Session: Sessão criada na primeira chamada e reaproveitada depois.
+        """
+        with self._lock_sessao_transferencias:
+            if self.sessao_transferencias is None:
+                tamanho_pool = self.gerenciador_sessao.tamanho_pool if self.gerenciador_sessao is not None else 10
+                self.sessao_transferencias = montar_pool(requests.Session(), tamanho_pool)
+            return self.sessao_transferencias
+
+    def fechar_sessao_transferencias(self):
+        """
+        Encerra a sessão do fluxo de danos elétricos e libera as conexões do pool.
+        """
+        with self._lock_sessao_transferencias:
+            if self.sessao_transferencias is not None:
+                self.sessao_transferencias.close()
+                self.sessao_transferencias = None
+
+    def _pasta_danos_eletricos(self, num_processo):
+        output_dir = os.path.join(os.getcwd(), f"dados/{str(num_processo)}")
+        os.makedirs(output_dir, exist_ok=True)
+        return output_dir
+
+    def _documento_danos_eletricos_pronto(self, documento, num_processo, output_dir):
+        """
+        Retorna o arquivo do documento se ele não precisar ser baixado.
+
+        Consulta o manifesto (download já concluído) e o armazém (mesmo idonbase
+        baixado em outro processo). Sem nenhum dos dois, registra o documento
+        como pendente no manifesto.
+
+        Returns:
+            ArquivoSalvo: Arquivo já disponível, ou None.
+
+        Raises:
+            ValueError: Se o manifesto registrar o nome do arquivo para outro documento.
+        """
+        if self.manifesto is not None:
+            arquivo = self.manifesto.arquivo_concluido(num_processo, documento.id_onbase)
+            if arquivo is not None:
+                return arquivo
+            self.manifesto.registrar(num_processo, documento.id_onbase, "danos_eletricos", documento.descricao,
+                                     documento.num_documento, documento.codigo)
+
+        nome_base = f"{documento.descricao}_{documento.num_documento}"
+        self._verificar_destino(num_processo, documento.id_onbase, output_dir, nome_base)
+        reaproveitado = self._reaproveitar_do_armazem(documento.id_onbase, output_dir, nome_base)
+        if reaproveitado is None:
+            return None
+        arquivo, extensao = reaproveitado
+        if self.manifesto is not None:
+            self.manifesto.marcar_concluido(num_processo, documento.id_onbase, arquivo, extensao)
+        return arquivo
+
+    @medir_etapa("links")
+    def _resolver_link_danos_eletricos(self, sessao, documento, num_processo):
+        """
+        Obtém o link assinado de download de um documento de danos elétricos.
+
+        Args:
+            sessao (requests.Session): Sessão com pool de conexões.
+            documento (DocumentoDanosEletricos): Documento a resolver.
+            num_processo (int): Número do processo.
+
+        Returns:
+            tuple: (link de download, extensão do arquivo).
+
+        Raises:
+            requests.HTTPError: Se a requisição falhar.
+            ValueError: Se o link não vier na resposta ou a extensão não for permitida.
+        """
+        url = (f"{self.url_upload_residencia}/tipoDocOcorrencia/exibir/"
+               f"{num_processo}/{documento.codigo}/2/{documento.id_onbase}")
+
+        response = self._requisitar(sessao, "GET", url)
+        response.raise_for_status()
+        link = response.json().get('message')
+
+        if not link:
+            raise ValueError("Link de download não encontrado na resposta da API.")
+
+        return link, self.identificar_extensao_permitida(link)
+
+    def _transferir_danos_eletricos(self, sessao, documento, link, extensao, output_dir):
+        """
+        Baixa o arquivo de um link assinado em streaming para a pasta do processo.
+
+        Returns:
+            ArquivoSalvo: Caminho, quantidade de bytes e SHA-256 do arquivo.
+
+        Raises:
+            requests.RequestException: Se o download falhar após todas as tentativas.
+        """
+        caminho_completo = os.path.join(output_dir, f"{documento.descricao}_{documento.num_documento}.{extensao}")
+        with self.metricas.etapa("transferencia"):
+            return self._baixar_para_arquivo(sessao, link, caminho_completo, retomar=self.manifesto is not None)
+
+    def _registrar_resultado_danos_eletricos(self, documento, num_processo, arquivo, extensao, erro):
+        """
+        Conclui um documento de danos elétricos: guarda o arquivo no armazém e
+        registra o resultado no manifesto e nas métricas.
+
+        Returns:
+            ArquivoSalvo: Arquivo gravado, ou None se o download falhou.
+        """
+        if erro is not None:
+            nome = f"{documento.descricao}_{documento.num_documento}"
+            if isinstance(erro, requests.RequestException):
+                logger.warning("Erro de requisição no documento %s do processo %s: %s", nome, num_processo, erro)
+            elif isinstance(erro, ValueError):
+                logger.warning("Erro de validação no documento %s do processo %s: %s", nome, num_processo, erro)
+            else:
+                logger.error("Erro inesperado no documento %s do processo %s", nome, num_processo, exc_info=erro)
+            self.metricas.registrar_falha("transferencia")
+            if self.manifesto is not None:
+                self.manifesto.marcar_falha(num_processo, documento.id_onbase, erro)
+            return None
+
+        arquivo = self._guardar_no_armazem(arquivo, documento.id_onbase, extensao)
+        if self.manifesto is not None:
+            self.manifesto.marcar_concluido(num_processo, documento.id_onbase, arquivo, extensao)
+        return arquivo
 
     def download_arquivos_danos_eletricos(self, num_processo, tipo_documento, id, descricao, numero_documentos):
         """
         Baixa um arquivo com base nos parâmetros fornecidos e salva localmente.
 
+        Executa as três etapas de download_documentos_danos_eletricos_pipeline
+        (link, transferência e registro) para um único documento, na sessão
+        com pool de conexões. Em caso de falha o documento vai para
+        self.fila_repeticao.
+
         Args:
             num_processo (int): Número do processo.
             tipo_documento (str): Tipo do documento (ex: 'pdf', 'jpg').
@@ -303,46 +1183,174 @@ class RequisicoesLiberty:
             descricao (str): Descrição do documento.
             numero_documentos (int): Sequencial do documento.
 
+        Returns:
+            ArquivoSalvo: Caminho, quantidade de bytes e SHA-256 do arquivo, ou None em caso de erro.
+        """
+        documento = DocumentoDanosEletricos(descricao, tipo_documento, id, numero_documentos)
+        tentar = partial(self._baixar_documento_danos_eletricos, documento, num_processo)
+        try:
+            return tentar()
+        except Exception as err:
+            return self._adiar(num_processo, documento, err, tentar)
+
+    def _baixar_documento_danos_eletricos(self, documento, num_processo):
+        """
+        Baixa um documento de danos elétricos, levantando o erro em caso de falha.
+
+        Returns:
+            ArquivoSalvo: Caminho, quantidade de bytes e SHA-256 do arquivo.
+
         Raises:
-            ValueError: Se a extensão não for permitida.
-            Exception: Para outros erros durante o download.
+            Exception: O erro do link ou da transferência, depois de registrado no manifesto.
         """
+        output_dir = self._pasta_danos_eletricos(num_processo)
+        arquivo = self._documento_danos_eletricos_pronto(documento, num_processo, output_dir)
+        if arquivo is not None:
+            return arquivo
+
+        sessao = self._obter_sessao_transferencias()
+        extensao = None
         try:
-            # Construir a URL de download
-            url = f"https://uploadsinistroresidenciabff.yelumseguros.com.br/tipoDocOcorrencia/exibir/{num_processo}/{tipo_documento}/2/{id}"
-            
-            # Realizar a requisição GET para obter o link de download
-            response = requests.get(url)
-            response.raise_for_status()
-            link = response.json().get('message')
-            
-            if not link:
-                raise ValueError("Link de download não encontrado na resposta da API.")
+            link, extensao = self._resolver_link_danos_eletricos(sessao, documento, num_processo)
+            arquivo = self._transferir_danos_eletricos(sessao, documento, link, extensao, output_dir)
+        except Exception as err:
+            self._registrar_resultado_danos_eletricos(documento, num_processo, None, extensao, err)
+            raise
 
-            # Obter o conteúdo do arquivo
-            documento = requests.get(link).content
+        return self._registrar_resultado_danos_eletricos(documento, num_processo, arquivo, extensao, None)
 
-            # Verificar a extensão do arquivo
-            tipo_extensao = self.identificar_extensao_permitida(link)
+    @rastrear("etapa")
+    def download_documentos_danos_eletricos_pipeline(self, documentos, num_processo, transferencias=None,
+                                                      resolvedores=2, tamanho_fila=None, ao_concluir=None):
+        """
+        Baixa os documentos de danos elétricos de um processo em três etapas encadeadas.
 
-            # Criar o diretório 'output' se não existir
-            output_dir = os.path.join(os.getcwd(), f"dados/{str(num_processo)}")
-            os.makedirs(output_dir, exist_ok=True)
+        - Resolvedores: obtêm os links assinados (tipoDocOcorrencia/exibir) à frente das transferências.
+        - Transferências: baixam os arquivos dos links em streaming para o disco.
+        - Registro (thread que chamou o método): guarda no armazém e registra no manifesto.
 
-            # Criar o nome do arquivo
-            nome_arquivo = f"{descricao}_{numero_documentos}.{tipo_extensao}"
-            caminho_completo = os.path.join(output_dir, nome_arquivo)
+        As etapas se comunicam por filas limitadas: os links dos próximos
+        documentos são obtidos enquanto o atual é transferido, mas nunca mais
+        de 'tamanho_fila' à frente, para que os links assinados não expirem na
+        fila. Documentos já concluídos no manifesto ou presentes no armazém vão
+        direto para o registro; os que falham vão para self.fila_repeticao.
 
-            # Salvar o arquivo localmente
-            with open(caminho_completo, 'wb') as arquivo:
-                arquivo.write(documento)
+        Args:
+            documentos (iterable): DocumentoDanosEletricos retornados por obter_documentos_danos_eletricos.
+            num_processo (int): Número do processo.
+            transferencias (int, optional): Transferências simultâneas. Padrão: limite do host.
+            resolvedores (int): Threads que obtêm os links.
+            tamanho_fila (int, optional): Máximo de links aguardando transferência. Padrão: 2 x transferencias.
+            ao_concluir (callable, optional): Chamada como ao_concluir(documento, arquivo) a cada documento
+                concluído, na ordem de conclusão; arquivo é None quando o download falhou.
 
-        except requests.RequestException as err:
-            print(f"Erro de requisição: {err}")
-        except ValueError as err:
-            print(f"Erro de validação: {err}")
-        except Exception as err:
-            print(f"Ocorreu um erro inesperado: {err}")
-        finally:
-            time.sleep(3)  # Aguardar entre downloads para evitar sobrecarga
+        Returns:
+            list: ArquivoSalvo (ou None, em caso de falha) de cada documento, na ordem recebida.
+        """
+        documentos = list(documentos)
+        if not documentos:
+            return []
+        if transferencias is None:
+            transferencias = self.concorrencia.limite(self.url_upload_residencia)
+        resolvedores = max(1, min(resolvedores, len(documentos)))
+        transferencias = max(1, min(transferencias, len(documentos)))
+
+        sessao = self._obter_sessao_transferencias()
+        output_dir = self._pasta_danos_eletricos(num_processo)
+        entrada = queue.Queue()
+        for posicao, documento in enumerate(documentos):
+            entrada.put((posicao, documento))
+        links = queue.Queue(maxsize=tamanho_fila or 2 * transferencias)
+        concluidos = queue.Queue()
+        resolvedores_ativos = [resolvedores]
+        lock_resolvedores = threading.Lock()
+
+        def resolver():
+            while True:
+                try:
+                    posicao, documento = entrada.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    arquivo = self._documento_danos_eletricos_pronto(documento, num_processo, output_dir)
+                    if arquivo is not None:
+                        concluidos.put((posicao, arquivo, None, None, True))
+                        continue
+                    link, extensao = self._resolver_link_danos_eletricos(sessao, documento, num_processo)
+                except Exception as err:
+                    concluidos.put((posicao, None, None, err, False))
+                    continue
+                links.put((posicao, link, extensao))
+            with lock_resolvedores:
+                resolvedores_ativos[0] -= 1
+                if resolvedores_ativos[0] == 0:
+                    for _ in range(transferencias):
+                        links.put(None)
+
+        def transferir():
+            while True:
+                item = links.get()
+                if item is None:
+                    break
+                posicao, link, extensao = item
+                try:
+                    arquivo = self._transferir_danos_eletricos(sessao, documentos[posicao], link, extensao, output_dir)
+                    concluidos.put((posicao, arquivo, extensao, None, False))
+                except Exception as err:
+                    concluidos.put((posicao, None, extensao, err, False))
+
+        threads = [
+            threading.Thread(target=resolver, name=f"danos-links-{indice + 1}", daemon=True)
+            for indice in range(resolvedores)
+        ] + [
+            threading.Thread(target=transferir, name=f"danos-transferencia-{indice + 1}", daemon=True)
+            for indice in range(transferencias)
+        ]
+        for thread in threads:
+            thread.start()
+
+        arquivos = [None] * len(documentos)
+        for _ in documentos:
+            posicao, arquivo, extensao, erro, pronto = concluidos.get()
+            documento = documentos[posicao]
+            if not pronto:
+                arquivo = self._registrar_resultado_danos_eletricos(documento, num_processo, arquivo, extensao, erro)
+            if erro is not None:
+                self._adiar(num_processo, documento, erro,
+                            partial(self._baixar_documento_danos_eletricos, documento, num_processo))
+            arquivos[posicao] = arquivo
+            if ao_concluir is not None:
+                ao_concluir(documento, arquivo)
+
+        for thread in threads:
+            thread.join()
+        return arquivos
+
+    def download_documentos_danos_eletricos_concorrente(self, documentos, num_processo, max_workers=None):
+        """
+        Baixa em paralelo todos os documentos de danos elétricos de um processo.
+
+        Usa download_documentos_danos_eletricos_pipeline com max_workers transferências.
+
+        Args:
+            documentos (iterable): DocumentoDanosEletricos retornados por obter_documentos_danos_eletricos.
+            num_processo (int): Número do processo.
+            max_workers (int, optional): Número de transferências simultâneas. Padrão: limite do host.
 
+        Returns:
+            list: Um dicionário por documento (descricao, num_documento, caminho, tamanho, sha256),
+                  na ordem recebida. Os três últimos campos são None quando o download falhou.
+        """
+        documentos = list(documentos)
+        arquivos = self.download_documentos_danos_eletricos_pipeline(documentos, num_processo, transferencias=max_workers)
+
+        return [
+            {
+                "descricao": documento.descricao,
+                "num_documento": documento.num_documento,
+                "caminho": arquivo.caminho if arquivo else None,
+                "tamanho": arquivo.tamanho if arquivo else None,
+                "sha256": arquivo.sha256 if arquivo else None,
+            }
+            for documento, arquivo in zip(documentos, arquivos)
+        ]
@@ -0,0 +1,181 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+from classe_requisicoes.escrita import ArquivoSalvo
+
+
+class ArmazemConteudo:
+    """
+    Armazém de arquivos endereçado pelo SHA-256 do conteúdo.
+
+    Cada conteúdo é guardado uma única vez em 'objetos/<2 primeiros>/<sha256>'
+    e os arquivos das pastas dos processos (download/<processo>, dados/<processo>)
+    são hardlinks para ele. Um índice SQLite liga cada IDOnbase/idonbase ao
+    conteúdo, para que um documento já baixado em outro processo ou execução
+    seja reaproveitado sem nenhuma requisição.
+
+    Os hardlinks exigem que o armazém e as pastas de destino estejam no mesmo
+    disco; quando não for possível criar o link, o arquivo é copiado.
+
+    Atributos:
+        pasta (str): Pasta raiz do armazém.
+
+    Métodos:
+        - localizar(id_onbase): Retorna o SHA-256 e a extensão do conteúdo já guardado para o documento.
+        - reaproveitar(id_onbase, pasta, nome_base): Cria o arquivo do documento a partir do armazém, sem download.
+        - guardar(arquivo, id_onbase, extensao): Guarda um arquivo recém-baixado e o troca por um hardlink.
+    """
+
+    def __init__(self, pasta="armazem"):
+        """
+        Abre (ou cria) o armazém.
+
+        Args:
+            pasta (str): Pasta raiz do armazém.
+        """
+        self.pasta = pasta
+        os.makedirs(os.path.join(pasta, "objetos"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(os.path.join(pasta, "indice.sqlite3"), check_same_thread=False)
+        with self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conteudos (
+                    sha256 TEXT PRIMARY KEY,
+                    tamanho INTEGER NOT NULL,
+                    extensao TEXT,
+                    criado_em TEXT
+                )
+                """
+            )
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documentos (
+                    id_onbase TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL REFERENCES conteudos (sha256)
+                )
+                """
+            )
+
+    def _caminho_objeto(self, sha256):
+        return os.path.join(self.pasta, "objetos", sha256[:2], sha256)
+
+    def localizar(self, id_onbase):
+        """
+        Procura o conteúdo já guardado para o documento.
+
+        O conteúdo só é considerado disponível se o objeto ainda existir com o
+        tamanho registrado.
+
+        Args:
+            id_onbase (int): IDOnbase/idonbase do documento.
+
+        Returns:
+            tuple: (sha256, tamanho, extensão), ou None se o documento não estiver no armazém.
+        """
+        with self._lock:
+            linha = self._conexao.execute(
+                """
+                SELECT c.sha256, c.tamanho, c.extensao FROM documentos d
+                JOIN conteudos c ON c.sha256 = d.sha256
+                WHERE d.id_onbase = ?
+                """,
+                (str(id_onbase),),
+            ).fetchone()
+        if linha is None:
+            return None
+        objeto = self._caminho_objeto(linha[0])
+        if not os.path.isfile(objeto) or os.path.getsize(objeto) != linha[1]:
+            return None
+        return tuple(linha)
+
+    def reaproveitar(self, id_onbase, pasta, nome_base):
+        """
+        Cria o arquivo do documento como hardlink para o conteúdo já guardado.
+
+        Args:
+            id_onbase (int): IDOnbase/idonbase do documento.
+            pasta (str): Pasta de destino.
+            nome_base (str): Nome do arquivo sem extensão.
+
+        Returns:
+            tuple: (ArquivoSalvo, extensão), ou None se o documento não estiver no armazém.
+        """
+        encontrado = self.localizar(id_onbase)
+        if encontrado is None:
+            return None
+        sha256, tamanho, extensao = encontrado
+        caminho_final = os.path.join(pasta, f"{nome_base}.{extensao}")
+        _vincular(self._caminho_objeto(sha256), caminho_final)
+        return ArquivoSalvo(caminho_final, tamanho, sha256), extensao
+
+    def guardar(self, arquivo: ArquivoSalvo, id_onbase=None, extensao=None):
+        """
+        Guarda um arquivo baixado no armazém.
+
+        Se o conteúdo ainda não existir, o arquivo vira o objeto do armazém (um
+        hardlink, sem cópia). Se já existir (mesmos bytes com outro nome ou de
+        outro processo), o arquivo é trocado por um hardlink para o objeto
+        existente e o espaço da cópia é liberado.
+
+        Args:
+            arquivo (ArquivoSalvo): Arquivo gravado por salvar_em_streaming.
+            id_onbase (int, optional): IDOnbase/idonbase do documento, para reaproveitar depois.
+            extensao (str, optional): Extensão do arquivo.
+
+        Returns:
+            ArquivoSalvo: O mesmo arquivo.
+        """
+        objeto = self._caminho_objeto(arquivo.sha256)
+        with self._lock:
+            if os.path.isfile(objeto):
+                _vincular(objeto, arquivo.caminho)
+            else:
+                _vincular(arquivo.caminho, objeto)
+            with self._conexao:
+                self._conexao.execute(
+                    """
+                    INSERT INTO conteudos (sha256, tamanho, extensao, criado_em) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (sha256) DO UPDATE SET extensao = COALESCE(conteudos.extensao, excluded.extensao)
+                    """,
+                    (arquivo.sha256, arquivo.tamanho, extensao, datetime.now().isoformat(timespec="seconds")),
+                )
+                if id_onbase is not None:
+                    self._conexao.execute(
+                        "INSERT OR REPLACE INTO documentos (id_onbase, sha256) VALUES (?, ?)",
+                        (str(id_onbase), arquivo.sha256),
+                    )
+        return arquivo
+
+    def fechar(self):
+        """
+        Fecha a conexão com o índice.
+        """
+        with self._lock:
+            self._conexao.close()
+
+
+def _vincular(origem, destino):
+    # Substitui 'destino' por um hardlink para 'origem' de forma atômica (cópia se o link não for possível)
+    if os.path.exists(destino) and os.path.samefile(origem, destino):
+        return
+    pasta = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, prefix=f".{os.path.basename(destino)}.", suffix=".link")
+    os.close(descritor)
+    os.remove(temporario)
+    try:
+        try:
+            os.link(origem, temporario)
+        except OSError:
+            shutil.copyfile(origem, temporario)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
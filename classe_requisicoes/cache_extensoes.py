@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+import time
+
+
+class CacheExtensoes:
+    """
+    Cache persistente (SQLite) de extensões por (CodigoTipoDocumento, IDOnbase).
+
+    A extensão de um documento no OnBase não muda, então o resultado do
+    ReceberDocumentoOnBase pode ser reaproveitado entre execuções. O cache é
+    limitado a 'tamanho_maximo' entradas, descartando as usadas há mais tempo (LRU).
+
+    Atributos:
+        caminho (str): Caminho do arquivo SQLite.
+        tamanho_maximo (int): Número máximo de entradas mantidas.
+
+    Métodos:
+        - obter(codigo_tipo, id_onbase): Retorna a extensão em cache, ou None.
+        - guardar(codigo_tipo, id_onbase, extensao): Guarda a extensão e aplica o limite de tamanho.
+    """
+
+    def __init__(self, caminho="cache_extensoes.sqlite3", tamanho_maximo=100_000):
+        """
+        Abre (ou cria) o cache.
+
+        Args:
+            caminho (str): Caminho do arquivo SQLite.
+            tamanho_maximo (int): Número máximo de entradas mantidas.
+        """
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        with self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extensoes (
+                    codigo_tipo TEXT NOT NULL,
+                    id_onbase TEXT NOT NULL,
+                    extensao TEXT NOT NULL,
+                    ultimo_acesso INTEGER NOT NULL,
+                    PRIMARY KEY (codigo_tipo, id_onbase)
+                )
+                """
+            )
+            self._conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_extensoes_ultimo_acesso ON extensoes (ultimo_acesso)"
+            )
+
+    def obter(self, codigo_tipo, id_onbase):
+        """
+        Retorna a extensão em cache e marca a entrada como usada.
+
+        Args:
+            codigo_tipo (int): CodigoTipoDocumento.
+            id_onbase (int): IDOnbase do documento.
+
+        Returns:
+            str: Extensão, ou None se não estiver em cache.
+        """
+        chave = (str(codigo_tipo), str(id_onbase))
+        with self._lock, self._conexao:
+            linha = self._conexao.execute(
+                "SELECT extensao FROM extensoes WHERE codigo_tipo = ? AND id_onbase = ?", chave
+            ).fetchone()
+            if linha is None:
+                return None
+            self._conexao.execute(
+                "UPDATE extensoes SET ultimo_acesso = ? WHERE codigo_tipo = ? AND id_onbase = ?",
+                (time.time_ns(), *chave),
+            )
+            return linha[0]
+
+    def guardar(self, codigo_tipo, id_onbase, extensao):
+        """
+        Guarda a extensão e descarta as entradas menos usadas acima do limite.
+
+        Args:
+            codigo_tipo (int): CodigoTipoDocumento.
+            id_onbase (int): IDOnbase do documento.
+            extensao (str): Extensão resolvida.
+        """
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO extensoes (codigo_tipo, id_onbase, extensao, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                (str(codigo_tipo), str(id_onbase), extensao, time.time_ns()),
+            )
+            excesso = self._conexao.execute("SELECT COUNT(*) FROM extensoes").fetchone()[0] - self.tamanho_maximo
+            if excesso > 0:
+                self._conexao.execute(
+                    """
+                    DELETE FROM extensoes WHERE rowid IN (
+                        SELECT rowid FROM extensoes ORDER BY ultimo_acesso LIMIT ?
+                    )
+                    """,
+                    (excesso,),
+                )
+
+    def fechar(self):
+        """
+        Fecha a conexão com o SQLite.
+        """
+        with self._lock:
+            self._conexao.close()
@@ -0,0 +1,219 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+EntradaMetadados = namedtuple("EntradaMetadados", ["conteudo", "etag", "ultima_modificacao", "obtido_em"])
+EntradaMetadados.__doc__ = """
+Resposta de metadados guardada no cache.
+
+Atributos:
+    conteudo (dict | list): JSON da resposta.
+    etag (str): Cabeçalho ETag da resposta, ou None.
+    ultima_modificacao (str): Cabeçalho Last-Modified da resposta, ou None.
+    obtido_em (float): Momento (time.time()) em que a resposta foi obtida ou revalidada.
+"""
+
+
+class CacheMetadados:
+    """
+    Cache de curta duração das respostas de metadados (listas de documentos).
+
+    O CarregaDocumentosNecessarios e o tipodocumento/solicitados são
+    chamados de novo para o mesmo processo em novas tentativas, em novos
+    logins e a cada rerun do Streamlit. Dentro da validade ('ttl') a resposta
+    guardada é usada sem nenhuma requisição; depois dela, a entrada ainda
+    serve para uma revalidação condicional (If-None-Match/If-Modified-Since)
+    quando o servidor informou ETag ou Last-Modified.
+
+    As entradas ficam em memória (as 'tamanho_memoria' mais recentes) e em
+    SQLite, para valer também entre execuções. Entradas com mais de
+    'idade_maxima' segundos são descartadas ao abrir o cache.
+
+    Atributos:
+        caminho (str): Caminho do arquivo SQLite.
+        ttl (float): Validade de uma resposta, em segundos.
+        acertos (int): Respostas servidas do cache sem requisição.
+        revalidacoes (int): Respostas confirmadas pelo servidor com 304.
+
+    Métodos:
+        - chave(metodo, url, corpo): Chave de cache de uma requisição.
+        - obter(chave): Retorna a entrada guardada, válida ou não.
+        - valida(entrada): Indica se a entrada ainda está dentro da validade.
+        - condicionais(entrada): Cabeçalhos para revalidar a entrada.
+        - guardar(chave, conteudo, etag, ultima_modificacao): Guarda uma resposta.
+        - renovar(chave): Renova a validade de uma entrada confirmada pelo servidor.
+        - invalidar(chave): Descarta uma entrada, ou todas.
+    """
+
+    def __init__(self, caminho="cache_metadados.sqlite3", ttl=300, tamanho_memoria=256, idade_maxima=86_400):
+        """
+        Abre (ou cria) o cache.
+
+        Args:
+            caminho (str): Caminho do arquivo SQLite.
+            ttl (float): Validade de uma resposta, em segundos.
+            tamanho_memoria (int): Número de entradas mantidas em memória.
+            idade_maxima (float): Idade, em segundos, a partir da qual uma entrada é descartada do disco.
+        """
+        self.caminho = caminho
+        self.ttl = ttl
+        self.tamanho_memoria = tamanho_memoria
+        self.acertos = 0
+        self.revalidacoes = 0
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        with self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    conteudo TEXT NOT NULL,
+                    etag TEXT,
+                    ultima_modificacao TEXT,
+                    obtido_em REAL NOT NULL
+                )
+                """
+            )
+            self._conexao.execute("DELETE FROM respostas WHERE obtido_em < ?", (time.time() - idade_maxima,))
+
+    @staticmethod
+    def chave(metodo, url, corpo=None):
+        """
+        Chave de cache de uma requisição.
+
+        Args:
+            metodo (str): Método HTTP.
+            url (str): URL da requisição.
+            corpo (dict, optional): Corpo JSON da requisição (ex: o payload do CarregaDocumentosNecessarios).
+
+        Returns:
+            str: Método, URL e corpo normalizado.
+        """
+        if corpo is None:
+            return f"{metodo} {url}"
+        return f"{metodo} {url} {json.dumps(corpo, sort_keys=True, default=str)}"
+
+    def _lembrar(self, chave, entrada):
+        # Chamado com o lock: mantém só as entradas mais recentes em memória
+        self._memoria[chave] = entrada
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.tamanho_memoria:
+            self._memoria.popitem(last=False)
+
+    def obter(self, chave):
+        """
+        Retorna a entrada guardada, da memória ou do disco.
+
+        Args:
+            chave (str): Chave retornada por chave().
+
+        Returns:
+            EntradaMetadados: Entrada guardada (dentro da validade ou não), ou None.
+        """
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is None:
+                linha = self._conexao.execute(
+                    "SELECT conteudo, etag, ultima_modificacao, obtido_em FROM respostas WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is None:
+                    return None
+                entrada = EntradaMetadados(json.loads(linha[0]), linha[1], linha[2], linha[3])
+            self._lembrar(chave, entrada)
+            return entrada
+
+    def valida(self, entrada):
+        """
+        Indica se a entrada ainda está dentro da validade.
+
+        Args:
+            entrada (EntradaMetadados): Entrada retornada por obter().
+
+        Returns:
+            bool: True se a entrada pode ser usada sem requisição (o uso é contado em self.acertos).
+        """
+        if time.time() - entrada.obtido_em >= self.ttl:
+            return False
+        with self._lock:
+            self.acertos += 1
+        return True
+
+    @staticmethod
+    def condicionais(entrada):
+        """
+        Cabeçalhos para revalidar uma entrada vencida.
+
+        Args:
+            entrada (EntradaMetadados): Entrada retornada por obter().
+
+        Returns:
+            dict: If-None-Match e/ou If-Modified-Since; vazio se o servidor não informou ETag nem Last-Modified.
+        """
+        headers = {}
+        if entrada.etag:
+            headers["If-None-Match"] = entrada.etag
+        if entrada.ultima_modificacao:
+            headers["If-Modified-Since"] = entrada.ultima_modificacao
+        return headers
+
+    def guardar(self, chave, conteudo, etag=None, ultima_modificacao=None):
+        """
+        Guarda uma resposta em memória e em disco.
+
+        Args:
+            chave (str): Chave retornada por chave().
+            conteudo (dict | list): JSON da resposta.
+            etag (str, optional): Cabeçalho ETag da resposta.
+            ultima_modificacao (str, optional): Cabeçalho Last-Modified da resposta.
+        """
+        entrada = EntradaMetadados(conteudo, etag, ultima_modificacao, time.time())
+        with self._lock, self._conexao:
+            self._lembrar(chave, entrada)
+            self._conexao.execute(
+                """
+                INSERT OR REPLACE INTO respostas (chave, conteudo, etag, ultima_modificacao, obtido_em)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (chave, json.dumps(conteudo), etag, ultima_modificacao, entrada.obtido_em),
+            )
+
+    def renovar(self, chave):
+        """
+        Renova a validade de uma entrada que o servidor confirmou com 304.
+
+        Args:
+            chave (str): Chave retornada por chave().
+        """
+        agora = time.time()
+        with self._lock, self._conexao:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                self._lembrar(chave, entrada._replace(obtido_em=agora))
+            self._conexao.execute("UPDATE respostas SET obtido_em = ? WHERE chave = ?", (agora, chave))
+            self.revalidacoes += 1
+
+    def invalidar(self, chave=None):
+        """
+        Descarta uma entrada, ou todas.
+
+        Args:
+            chave (str, optional): Chave retornada por chave(). Sem chave, esvazia o cache.
+        """
+        with self._lock, self._conexao:
+            if chave is None:
+                self._memoria.clear()
+                self._conexao.execute("DELETE FROM respostas")
+            else:
+                self._memoria.pop(chave, None)
+                self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+
+    def fechar(self):
+        """
+        Fecha a conexão com o SQLite.
+        """
+        with self._lock:
+            self._conexao.close()
@@ -0,0 +1,318 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import zip_longest
+
+from classe_requisicoes.documentos import DocumentoAuto
+from classe_rastreamento import rastrear
+
+ItemCatalogo = namedtuple("ItemCatalogo", ["processo", "fluxo", "documento", "tamanho"], defaults=(None,))
+ItemCatalogo.__doc__ = """
+Documento de um processo no catálogo do lote.
+
+Atributos:
+    processo (int): Número do processo.
+    fluxo (str): 'auto' ou 'danos_eletricos'.
+    documento (DocumentoAuto | DocumentoDanosEletricos): Documento a baixar.
+    tamanho (int): Tamanho em bytes informado pelo servidor (HEAD), ou None se desconhecido.
+"""
+
+ESTRATEGIAS = {
+    "maior_primeiro": "Maiores primeiro",
+    "round_robin": "Alternando entre processos",
+    "planilha": "Ordem da planilha",
+}
+
+
+class CatalogoLote:
+    """
+    Catálogo de todos os documentos de um lote, montado antes dos downloads.
+
+    Os metadados de todos os processos da planilha são obtidos em paralelo
+    (e, no AUTO, também as extensões), o que permite saber o tamanho do lote,
+    ordenar as transferências e estimar o término antes de baixar qualquer
+    arquivo. O catálogo pode ser salvo em Parquet para análise.
+
+    Atributos:
+        fluxo (str): 'auto' ou 'danos_eletricos'.
+        itens (list): ItemCatalogo de todos os processos, na ordem da planilha.
+        erros (dict): Exceção de cada processo cujos metadados não puderam ser obtidos.
+
+    Métodos:
+        - carregar(requisicoes, sessao, processos, max_workers, resolver_extensoes, incremental): Obtém os metadados de todos os processos.
+        - medir_tamanhos(requisicoes, sessao, max_workers): Consulta o tamanho dos arquivos com HEAD, quando possível.
+        - contagens(): Documentos e bytes por processo.
+        - tabela(): DataFrame com um documento por linha.
+        - salvar(caminho): Grava o catálogo em Parquet.
+    """
+
+    def __init__(self, fluxo):
+        self.fluxo = fluxo
+        self.itens = []
+        self.erros = {}
+        self._processos = []
+
+    @rastrear("etapa")
+    def carregar(self, requisicoes, sessao, processos, max_workers=4, resolver_extensoes=True, incremental=False):
+        """
+        Obtém em paralelo os documentos de todos os processos.
+
+        Args:
+            requisicoes (RequisicoesLiberty): Cliente da API.
+            sessao (requests.Session): Sessão autenticada.
+            processos (iterable): Números dos processos, na ordem da planilha.
+            max_workers (int): Processos consultados ao mesmo tempo.
+            resolver_extensoes (bool): No AUTO, se as extensões devem ser obtidas agora
+                (desnecessário quando a extensão é identificada pelo conteúdo).
+            incremental (bool): Catalogar só os documentos novos desde as execuções anteriores
+                (ver RequisicoesLiberty.sincronizar_documentos).
+
+        Returns:
+            CatalogoLote: O próprio catálogo.
+        """
+        self._processos = list(processos)
+
+        def obter(processo):
+            if incremental:
+                documentos = requisicoes.sincronizar_documentos(sessao, processo, self.fluxo)
+            elif self.fluxo == "danos_eletricos":
+                documentos = requisicoes.obter_documentos_danos_eletricos(sessao, processo)
+            else:
+                documentos = requisicoes.obter_documentos_auto(sessao, processo)
+            if self.fluxo == "auto" and resolver_extensoes:
+                documentos = requisicoes.adicionar_extensoes_auto(sessao, documentos, processo)
+            return documentos
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futuros = [executor.submit(obter, processo) for processo in self._processos]
+            for processo, futuro in zip(self._processos, futuros):
+                try:
+                    documentos = futuro.result()
+                except Exception as e:
+                    self.erros[processo] = e
+                    continue
+                self.itens.extend(ItemCatalogo(processo, self.fluxo, documento) for documento in documentos)
+        return self
+
+    @rastrear("etapa")
+    def medir_tamanhos(self, requisicoes, sessao, max_workers=4):
+        """
+        Consulta o tamanho de cada arquivo com uma requisição HEAD.
+
+        Só é possível para documentos AUTO com extensão conhecida: os de
+        danos elétricos precisam de um link assinado, que expira e é obtido
+        apenas na hora da transferência.
+
+        Args:
+            requisicoes (RequisicoesLiberty): Cliente da API.
+            sessao (requests.Session): Sessão autenticada.
+            max_workers (int): Consultas simultâneas.
+
+        Returns:
+            CatalogoLote: O próprio catálogo.
+        """
+        posicoes = [
+            posicao for posicao, item in enumerate(self.itens)
+            if isinstance(item.documento, DocumentoAuto) and item.documento.extensao and item.tamanho is None
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futuros = {
+                posicao: executor.submit(requisicoes.tamanho_documento_auto, sessao, self.itens[posicao].documento)
+                for posicao in posicoes
+            }
+            for posicao, futuro in futuros.items():
+                self.itens[posicao] = self.itens[posicao]._replace(tamanho=futuro.result())
+        return self
+
+    def contagens(self):
+        """
+        Returns:
+            list: Um dicionário por processo, na ordem da planilha, com o número de
+                  documentos, o total de bytes conhecido e os documentos sem tamanho.
+        """
+        por_processo = {processo: {"Processo": str(processo), "Documentos": 0, "MB conhecidos": 0.0,
+                                   "Sem tamanho": 0, "Erro": ""}
+                        for processo in self._processos}
+        for item in self.itens:
+            linha = por_processo[item.processo]
+            linha["Documentos"] += 1
+            if item.tamanho is None:
+                linha["Sem tamanho"] += 1
+            else:
+                linha["MB conhecidos"] += item.tamanho / (1024 * 1024)
+        for processo, erro in self.erros.items():
+            por_processo[processo]["Erro"] = str(erro)
+        for linha in por_processo.values():
+            linha["MB conhecidos"] = round(linha["MB conhecidos"], 2)
+        return list(por_processo.values())
+
+    def tabela(self):
+        """
+        Returns:
+            pd.DataFrame: Um documento por linha (processo, fluxo, nome, codigo, id_onbase,
+                          num_documento, extensao, tamanho), com as mesmas colunas nos dois fluxos.
+        """
+        import pandas as pd
+
+        linhas = []
+        for item in self.itens:
+            documento = item.documento
+            if isinstance(documento, DocumentoAuto):
+                nome, codigo, extensao = documento.nome_documento, documento.codigo_tipo_documento, documento.extensao
+            else:
+                nome, codigo, extensao = documento.descricao, documento.codigo, None
+            linhas.append({
+                "processo": str(item.processo),
+                "fluxo": item.fluxo,
+                "nome": nome,
+                "codigo": str(codigo),
+                "id_onbase": str(documento.id_onbase),
+                "num_documento": documento.num_documento,
+                "extensao": extensao,
+                "tamanho": item.tamanho,
+            })
+        return pd.DataFrame(linhas, columns=["processo", "fluxo", "nome", "codigo", "id_onbase",
+                                             "num_documento", "extensao", "tamanho"]).astype({"tamanho": "Int64"})
+
+    def salvar(self, caminho):
+        """
+        Grava o catálogo em Parquet (formato colunar, lido por pandas, pyarrow, DuckDB...).
+
+        Args:
+            caminho (str | file): Arquivo de destino.
+
+        Returns:
+            str | file: O destino gravado.
+        """
+        self.tabela().to_parquet(caminho, index=False)
+        return caminho
+
+
+def ordenar_itens(itens, estrategia="maior_primeiro"):
+    """
+    Define a ordem das transferências do lote.
+
+    - maior_primeiro: arquivos maiores primeiro, para que o fim do lote tenha
+      só arquivos pequenos e nenhum download longo fique sozinho ocupando uma
+      vaga enquanto as outras estão ociosas. Arquivos sem tamanho conhecido
+      são tratados como do tamanho médio.
+    - round_robin: um documento de cada processo por vez, para que todos os
+      processos avancem juntos (e os hosts de storage sejam alternados).
+    - planilha: processo a processo, na ordem da planilha.
+
+    Args:
+        itens (iterable): ItemCatalogo.
+        estrategia (str): Uma das chaves de ESTRATEGIAS.
+
+    Returns:
+        list: Os itens na ordem em que devem ser transferidos.
+
+    Raises:
+        ValueError: Se a estratégia não existir.
+    """
+    itens = list(itens)
+    if estrategia == "maior_primeiro":
+        conhecidos = [item.tamanho for item in itens if item.tamanho is not None]
+        media = sum(conhecidos) / len(conhecidos) if conhecidos else 0
+        return sorted(itens, key=lambda item: item.tamanho if item.tamanho is not None else media, reverse=True)
+    if estrategia == "round_robin":
+        grupos = {}
+        for item in itens:
+            grupos.setdefault(item.processo, []).append(item)
+        return [item for rodada in zip_longest(*grupos.values()) for item in rodada if item is not None]
+    if estrategia == "planilha":
+        return itens
+    raise ValueError(f"Estratégia desconhecida: {estrategia}")
+
+
+def executar_agenda(requisicoes, sessao, itens, max_workers=4):
+    """
+    Transfere os itens na ordem recebida, mantendo max_workers transferências ativas.
+
+    Os itens são entregues ao pool na ordem da agenda; assim que uma vaga
+    fica livre, o próximo item começa. Documentos que falham vão para a fila
+    de repetição de requisicoes.
+
+    Args:
+        requisicoes (RequisicoesLiberty): Cliente da API.
+        sessao (requests.Session): Sessão autenticada.
+        itens (list): ItemCatalogo, já ordenados por ordenar_itens.
+        max_workers (int): Transferências simultâneas.
+
+    Yields:
+        tuple: (ItemCatalogo, ArquivoSalvo ou None), na ordem de conclusão.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futuros = {executor.submit(requisicoes.baixar_item_catalogo, sessao, item): item for item in itens}
+        for futuro in as_completed(futuros):
+            yield futuros[futuro], futuro.result()
+
+
+class EstimativaTermino:
+    """
+    Estima o tempo restante do lote pelo progresso em bytes.
+
+    Itens sem tamanho conhecido contam como o tamanho médio dos conhecidos;
+    sem nenhum tamanho conhecido, o progresso é medido em documentos.
+
+    Atributos:
+        total (int): Número de documentos.
+        concluidos (int): Documentos concluídos (com sucesso ou falha).
+
+    Métodos:
+        - registrar(item, arquivo): Registra a conclusão de um item.
+        - fracao(): Fração concluída, entre 0 e 1.
+        - restante_segundos(): Tempo restante estimado.
+        - texto(): Resumo para a barra de progresso.
+    """
+
+    def __init__(self, itens):
+        itens = list(itens)
+        conhecidos = [item.tamanho for item in itens if item.tamanho is not None]
+        self._media = sum(conhecidos) / len(conhecidos) if conhecidos else None
+        self._peso_total = sum(self._peso(item) for item in itens)
+        self._peso_concluido = 0
+        self.total = len(itens)
+        self.concluidos = 0
+        self._inicio = time.monotonic()
+
+    def _peso(self, item):
+        if self._media is None:
+            return 1
+        return item.tamanho if item.tamanho is not None else self._media
+
+    def registrar(self, item, arquivo):
+        self.concluidos += 1
+        # O peso do item é o previsto, para que a fração chegue a 1 no fim mesmo com tamanhos errados
+        self._peso_concluido += self._peso(item)
+
+    def fracao(self):
+        if not self._peso_total:
+            return 1.0
+        return min(1.0, self._peso_concluido / self._peso_total)
+
+    def restante_segundos(self):
+        """
+        Returns:
+            float: Segundos restantes pelo ritmo até agora, ou None antes do primeiro item.
+        """
+        fracao = self.fracao()
+        if fracao <= 0:
+            return None
+        decorrido = time.monotonic() - self._inicio
+        return decorrido / fracao - decorrido
+
+    def texto(self):
+        restante = self.restante_segundos()
+        previsao = "calculando..." if restante is None else f"cerca de {_formatar_duracao(restante)} restantes"
+        return f"{self.concluidos} de {self.total} documentos, {previsao}"
+
+
+def _formatar_duracao(segundos):
+    minutos, segundos = divmod(int(round(segundos)), 60)
+    horas, minutos = divmod(minutos, 60)
+    if horas:
+        return f"{horas}h{minutos:02d}min"
+    if minutos:
+        return f"{minutos}min{segundos:02d}s"
+    return f"{segundos}s"
@@ -0,0 +1,65 @@
+import threading
+from urllib.parse import urlparse
+
+
+class LimitadorConcorrencia:
+    """
+    Controla o número máximo de requisições simultâneas por host.
+
+    Atributos:
+        limites (dict): Limite de requisições simultâneas por host.
+        limite_padrao (int): Limite aplicado a hosts não configurados (ex: links assinados de storage).
+
+    Métodos:
+        - limite(url): Retorna o limite configurado para o host da URL.
+        - semaforo(url): Retorna o semáforo compartilhado do host da URL.
+    """
+
+    LIMITES_PADRAO = {
+        "portalintegracao.yelumseguros.com.br": 4,
+        "uploadsinistroresidenciabff.yelumseguros.com.br": 4,
+    }
+
+    def __init__(self, limites_por_host=None, limite_padrao=4):
+        """
+        Inicializa o limitador com os limites por host.
+
+        Args:
+            limites_por_host (dict, optional): Limites que sobrescrevem os padrões, ex: {"portalintegracao.yelumseguros.com.br": 2}.
+            limite_padrao (int): Limite para hosts não listados.
+        """
+        self.limites = dict(self.LIMITES_PADRAO)
+        if limites_por_host:
+            self.limites.update(limites_por_host)
+        self.limite_padrao = limite_padrao
+        self._semaforos = {}
+        self._lock = threading.Lock()
+
+    def limite(self, url):
+        """
+        Retorna o limite de requisições simultâneas para o host da URL.
+
+        Args:
+            url (str): URL ou host.
+
+        Returns:
+            int: Limite configurado.
+        """
+        host = urlparse(url).hostname or url
+        return max(1, int(self.limites.get(host, self.limite_padrao)))
+
+    def semaforo(self, url):
+        """
+        Retorna o semáforo do host da URL, criando-o na primeira chamada.
+
+        Args:
+            url (str): URL da requisição.
+
+        Returns:
+            threading.BoundedSemaphore: Semáforo compartilhado pelo host.
+        """
+        host = urlparse(url).hostname or url
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.limite(url))
+            return self._semaforos[host]
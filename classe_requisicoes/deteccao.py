@@ -0,0 +1,118 @@
+import re
+
+_ASSINATURAS = [
+    (b"%PDF", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"II*\x00", "tif"),
+    (b"MM\x00*", "tif"),
+]
+
+_ASSINATURA_ZIP = b"PK\x03\x04"
+_ASSINATURA_OLE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Pastas internas que identificam cada formato OOXML
+_PASTAS_OOXML = [
+    (b"word/", "docx"),
+    (b"xl/", "xlsx"),
+    (b"ppt/", "pptx"),
+]
+
+# Nomes de streams (UTF-16LE) que identificam cada formato OLE
+_STREAMS_OLE = [
+    ("WordDocument".encode("utf-16-le"), "doc"),
+    ("Workbook".encode("utf-16-le"), "xls"),
+    ("Book".encode("utf-16-le"), "xls"),
+    ("PowerPoint Document".encode("utf-16-le"), "ppt"),
+]
+
+_CABECALHOS_EML = (
+    "received", "from", "to", "subject", "date", "message-id", "mime-version",
+    "return-path", "delivered-to", "reply-to", "content-type",
+)
+_PADRAO_CABECALHO = re.compile(r"^([A-Za-z][A-Za-z0-9-]*):")
+
+# Content-Types com que um documento txt ou eml pode ser servido; texto com outro tipo
+# (application/json, text/xml, text/javascript...) é resposta da API, não documento
+_TIPOS_TEXTO_DOCUMENTO = ("text/plain", "message/rfc822", "application/octet-stream")
+
+
+def detectar_extensao(bloco, tipo_conteudo=None):
+    """
+    Identifica o tipo de arquivo pelos primeiros bytes do conteúdo (magic bytes).
+
+    Reconhece PDF, PNG, JPEG, GIF, TIFF, OOXML (docx/xlsx/pptx), OLE
+    (doc/xls/ppt), EML e texto simples. Para OOXML e OLE o bloco precisa
+    conter o índice do arquivo, o que em geral acontece no primeiro bloco
+    lido da rede.
+
+    Páginas HTML (Content-Type text/html ou conteúdo iniciado por <html ou
+    <!DOCTYPE) não são aceitas: são páginas de erro ou de login devolvidas
+    com status 200, não documentos. Pelo mesmo motivo, texto só vira txt ou
+    eml sem Content-Type ou com um tipo de documento (text/plain,
+    message/rfc822, application/octet-stream); application/json e os demais
+    tipos de texto são recusados.
+
+    Args:
+        bloco (bytes): Primeiro bloco do arquivo.
+        tipo_conteudo (str, optional): Cabeçalho Content-Type da resposta.
+
+    Returns:
+        str: Extensão identificada, ou None se o tipo não for reconhecido.
+    """
+    if not bloco:
+        return None
+    tipo = tipo_conteudo.split(";")[0].strip().lower() if tipo_conteudo else ""
+    if tipo == "text/html":
+        return None
+
+    for assinatura, extensao in _ASSINATURAS:
+        if bloco.startswith(assinatura):
+            return extensao
+
+    if bloco.startswith(_ASSINATURA_ZIP):
+        for pasta, extensao in _PASTAS_OOXML:
+            if pasta in bloco:
+                return extensao
+        return None
+
+    if bloco.startswith(_ASSINATURA_OLE):
+        for stream, extensao in _STREAMS_OLE:
+            if stream in bloco:
+                return extensao
+        return None
+
+    if tipo and tipo not in _TIPOS_TEXTO_DOCUMENTO:
+        return None
+    return _detectar_texto(bloco)
+
+
+def _detectar_texto(bloco):
+    amostra = bloco[:8192]
+    inicio = amostra.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if inicio.startswith((b"<html", b"<!doctype")):
+        return None
+    controles = sum(1 for byte in amostra if byte < 0x20 and byte not in b"\t\n\r\x0c")
+    if b"\x00" in amostra or controles > len(amostra) // 100:
+        return None
+    try:
+        texto = amostra.decode("utf-8")
+    except UnicodeDecodeError:
+        texto = amostra.decode("latin-1")
+
+    cabecalhos = set()
+    for linha in texto.splitlines():
+        if not linha.strip():
+            break
+        match = _PADRAO_CABECALHO.match(linha)
+        if match:
+            cabecalhos.add(match.group(1).lower())
+        elif not linha[:1].isspace():
+            cabecalhos.clear()
+            break
+
+    if len(cabecalhos.intersection(_CABECALHOS_EML)) >= 2:
+        return "eml"
+    return "txt"
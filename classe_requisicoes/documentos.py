@@ -0,0 +1,117 @@
+from collections import namedtuple
+
+DocumentoAuto = namedtuple(
+    "DocumentoAuto",
+    ["nome_documento", "codigo_tipo_documento", "id_onbase", "num_documento", "extensao"],
+    defaults=(None,),
+)
+DocumentoAuto.__doc__ = """
+Documento de um processo AUTO, como retornado pelo CarregaDocumentosNecessarios.
+
+Atributos:
+    nome_documento (str): Nome do tipo de documento (NomeDocumento).
+    codigo_tipo_documento (int): Código do tipo de documento (CodigoTipoDocumento).
+    id_onbase (int): Identificador do arquivo no OnBase (IDOnbase).
+    num_documento (int): Sequencial do documento dentro do mesmo nome, a partir de 1.
+    extensao (str): Extensão do arquivo, ou None enquanto não for identificada.
+"""
+
+DocumentoDanosEletricos = namedtuple("DocumentoDanosEletricos", ["descricao", "codigo", "id_onbase", "num_documento"])
+DocumentoDanosEletricos.__doc__ = """
+Documento de um processo de danos elétricos, como retornado pelo tipodocumento/solicitados.
+
+Atributos:
+    descricao (str): Descrição do tipo de documento, sem '/'.
+    codigo (int): Código do tipo de documento.
+    id_onbase (int): Identificador do arquivo no OnBase.
+    num_documento (int): Sequencial do documento dentro da mesma descrição, a partir de 1.
+"""
+
+# Nomes das colunas usadas nos DataFrames antes dos registros, mantidos nos relatórios
+_COLUNAS_AUTO = {
+    "nome_documento": "NomeDocumento",
+    "codigo_tipo_documento": "CodigoTipoDocumento",
+    "id_onbase": "IDOnbase",
+    "num_documento": "num_documento",
+    "extensao": "extensoes",
+}
+_COLUNAS_DANOS_ELETRICOS = {
+    "descricao": "descricao",
+    "codigo": "codigo",
+    "id_onbase": "idonbase",
+    "num_documento": "num_documento",
+}
+
+
+class ListaDocumentos(list):
+    """
+    Lista de DocumentoAuto ou DocumentoDanosEletricos.
+
+    Uma lista comum (barata de criar, percorrer e enviar para outros
+    processos); o pandas só é importado quando um relatório é pedido.
+
+    Métodos:
+        - para_dataframe(): Converte os documentos em um DataFrame com as colunas de antes.
+    """
+
+    def para_dataframe(self):
+        """
+        Returns:
+            pd.DataFrame: Uma linha por documento, com as colunas usadas nos DataFrames
+                          originais (ex: NomeDocumento, IDOnbase, extensoes).
+        """
+        import pandas as pd
+
+        if not self:
+            return pd.DataFrame()
+        colunas = _COLUNAS_AUTO if isinstance(self[0], DocumentoAuto) else _COLUNAS_DANOS_ELETRICOS
+        return pd.DataFrame([documento._asdict() for documento in self]).rename(columns=colunas)
+
+
+def iterar_documentos_auto(itens):
+    """
+    Converte os itens do CarregaDocumentosNecessarios em DocumentoAuto.
+
+    Itens sem arquivo (IDOnbase 0) são ignorados e o num_documento é
+    numerado por NomeDocumento, na ordem recebida.
+
+    Args:
+        itens (iterable): Dicionários da chave 'd' da resposta.
+
+    Yields:
+        DocumentoAuto: Um registro por arquivo.
+
+    Raises:
+        KeyError: Se algum item não tiver os campos esperados.
+    """
+    contagem = {}
+    for item in itens:
+        if item["IDOnbase"] == 0:
+            continue
+        nome = item["NomeDocumento"]
+        contagem[nome] = contagem.get(nome, 0) + 1
+        yield DocumentoAuto(nome, item["CodigoTipoDocumento"], item["IDOnbase"], contagem[nome])
+
+
+def iterar_documentos_danos_eletricos(tipos):
+    """
+    Converte a resposta do tipodocumento/solicitados em DocumentoDanosEletricos.
+
+    Cada tipo traz uma lista 'documentosOcorrencia'; cada item dela vira um
+    registro. Tipos sem documentos não geram registros.
+
+    Args:
+        tipos (iterable): Dicionários retornados pela API.
+
+    Yields:
+        DocumentoDanosEletricos: Um registro por arquivo.
+
+    Raises:
+        KeyError: Se algum tipo não tiver os campos esperados.
+    """
+    contagem = {}
+    for tipo in tipos:
+        descricao = tipo["descricao"].replace("/", "")
+        for documento in tipo["documentosOcorrencia"] or []:
+            contagem[descricao] = contagem.get(descricao, 0) + 1
+            yield DocumentoDanosEletricos(descricao, tipo["codigo"], documento.get("idOnbase"), contagem[descricao])
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+ArquivoSalvo = namedtuple("ArquivoSalvo", ["caminho", "tamanho", "sha256"])
+ArquivoSalvo.__doc__ = """
+Arquivo gravado em disco.
+
+Atributos:
+    caminho (str): Caminho final do arquivo.
+    tamanho (int): Quantidade de bytes gravados.
+    sha256 (str): Hash SHA-256 do conteúdo, em hexadecimal.
+"""
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def caminho_parcial(caminho_final):
+    """
+    Retorna o caminho fixo do arquivo parcial usado para retomar um download.
+
+    Args:
+        caminho_final (str): Caminho do arquivo de destino.
+
+    Returns:
+        str: Caminho do arquivo parcial, na mesma pasta do destino.
+    """
+    pasta, nome = os.path.split(caminho_final)
+    return os.path.join(pasta, f".{nome}.part")
+
+
+def salvar_em_streaming(blocos, caminho_final, parcial=None):
+    """
+    Grava blocos de bytes em um arquivo temporário e o move atomicamente para o destino.
+
+    O arquivo temporário fica na mesma pasta do destino, com nome único, para
+    que vários downloads possam ser gravados ao mesmo tempo. O conteúdo é
+    sincronizado em disco (fsync) antes do os.replace, então um arquivo com o
+    nome final está sempre completo.
+
+    Quando 'parcial' é informado, os blocos são acrescentados a esse arquivo
+    (que pode já conter o início do download) e ele é mantido em caso de erro,
+    para que o download seja retomado depois.
+
+    Args:
+        blocos (iterable): Blocos de bytes, ex: response.iter_content(TAMANHO_BLOCO).
+        caminho_final (str): Caminho do arquivo de destino.
+        parcial (str, optional): Arquivo parcial a continuar, ver caminho_parcial.
+
+    Returns:
+        ArquivoSalvo: Caminho, quantidade de bytes e SHA-256 do arquivo.
+    """
+    pasta = os.path.dirname(os.path.abspath(caminho_final))
+    os.makedirs(pasta, exist_ok=True)
+
+    hash_sha256 = hashlib.sha256()
+    tamanho = 0
+    if parcial is None:
+        descritor, caminho_temporario = tempfile.mkstemp(
+            dir=pasta, prefix=f".{os.path.basename(caminho_final)}.", suffix=".part"
+        )
+        arquivo = os.fdopen(descritor, "wb")
+    else:
+        caminho_temporario = parcial
+        arquivo = open(parcial, "a+b")
+        arquivo.seek(0)
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b""):
+            hash_sha256.update(bloco)
+            tamanho += len(bloco)
+    try:
+        with arquivo:
+            for bloco in blocos:
+                if not bloco:
+                    continue
+                arquivo.write(bloco)
+                hash_sha256.update(bloco)
+                tamanho += len(bloco)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(caminho_temporario, caminho_final)
+    except BaseException:
+        if parcial is None and os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+        raise
+
+    return ArquivoSalvo(caminho_final, tamanho, hash_sha256.hexdigest())
+
+
+def salvar_resposta(response, caminho_final, tamanho_bloco=TAMANHO_BLOCO, parcial=None):
+    """
+    Grava o corpo de uma resposta HTTP em disco sem carregá-lo inteiro na memória.
+
+    A requisição deve ter sido feita com stream=True. A resposta é fechada ao final.
+
+    Args:
+        response (requests.Response): Resposta com corpo ainda não lido.
+        caminho_final (str): Caminho do arquivo de destino.
+        tamanho_bloco (int): Tamanho de cada bloco lido da rede.
+        parcial (str, optional): Arquivo parcial a continuar (resposta 206 a um Range).
+
+    Returns:
+        ArquivoSalvo: Caminho, quantidade de bytes e SHA-256 do arquivo.
+    """
+    try:
+        return salvar_em_streaming(response.iter_content(tamanho_bloco), caminho_final, parcial)
+    finally:
+        response.close()
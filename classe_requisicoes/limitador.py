@@ -0,0 +1,161 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from classe_rastreamento import RASTREADOR
+
+
+class _EstadoHost:
+    """
+    Estado do balde de tokens de um host.
+    """
+
+    __slots__ = ("taxa", "tokens", "ultimo", "bloqueado_ate")
+
+    def __init__(self, taxa, tokens):
+        self.taxa = taxa
+        self.tokens = tokens
+        self.ultimo = time.monotonic()
+        self.bloqueado_ate = 0.0
+
+
+class LimitadorTaxa:
+    """
+    Limitador de taxa adaptativo (token bucket com ajuste AIMD) por host.
+
+    A taxa de cada host cresce de forma aditiva enquanto as respostas são
+    saudáveis e cai de forma multiplicativa em respostas 429/5xx ou erros
+    de conexão. O cabeçalho Retry-After, quando presente, bloqueia o host
+    até o instante indicado pelo servidor.
+
+    Atributos:
+        taxa_inicial (float): Requisições por segundo no início.
+        taxa_minima (float): Menor taxa permitida após reduções.
+        taxa_maxima (float): Maior taxa permitida após aumentos.
+        incremento (float): Aumento aditivo da taxa a cada resposta saudável.
+        fator_reducao (float): Fator multiplicativo aplicado em respostas de sobrecarga.
+        capacidade (float): Tamanho máximo do balde (rajada permitida).
+
+    Métodos:
+        - aguardar(url): Bloqueia até existir um token disponível para o host.
+        - registrar_resposta(url, status_code, retry_after): Ajusta a taxa com base na resposta.
+        - registrar_erro(url): Ajusta a taxa após um erro de conexão.
+        - taxa(url): Retorna a taxa atual do host.
+    """
+
+    STATUS_SOBRECARGA = (429, 500, 502, 503, 504)
+
+    def __init__(self, taxa_inicial=1.0, taxa_minima=0.05, taxa_maxima=10.0,
+                 incremento=0.2, fator_reducao=0.5, capacidade=2.0):
+        self.taxa_inicial = taxa_inicial
+        self.taxa_minima = taxa_minima
+        self.taxa_maxima = taxa_maxima
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.capacidade = capacidade
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, url):
+        host = urlparse(url).hostname or url
+        if host not in self._estados:
+            self._estados[host] = _EstadoHost(self.taxa_inicial, min(1.0, self.capacidade))
+        return self._estados[host]
+
+    def taxa(self, url):
+        """
+        Retorna a taxa atual (requisições por segundo) do host da URL.
+        """
+        with self._lock:
+            return self._estado(url).taxa
+
+    def aguardar(self, url):
+        """
+        Bloqueia até existir um token disponível para o host da URL.
+
+        Args:
+            url (str): URL da requisição.
+
+        Returns:
+            float: Tempo total de espera em segundos.
+        """
+        esperado = 0.0
+        while True:
+            with self._lock:
+                estado = self._estado(url)
+                agora = time.monotonic()
+                if agora < estado.bloqueado_ate:
+                    espera = estado.bloqueado_ate - agora
+                else:
+                    estado.tokens = min(self.capacidade, estado.tokens + (agora - estado.ultimo) * estado.taxa)
+                    estado.ultimo = agora
+                    if estado.tokens >= 1:
+                        estado.tokens -= 1
+                        return esperado
+                    espera = (1 - estado.tokens) / estado.taxa
+            RASTREADOR.dormir(espera, "aguardar limitador de taxa")
+            esperado += espera
+
+    def registrar_resposta(self, url, status_code, retry_after=None):
+        """
+        Ajusta a taxa do host com base no status da resposta.
+
+        Args:
+            url (str): URL da requisição.
+            status_code (int): Status HTTP recebido.
+            retry_after (str, optional): Valor do cabeçalho Retry-After.
+        """
+        with self._lock:
+            estado = self._estado(url)
+            if status_code in self.STATUS_SOBRECARGA:
+                self._reduzir(estado)
+                segundos = interpretar_retry_after(retry_after)
+                if segundos:
+                    estado.bloqueado_ate = max(estado.bloqueado_ate, time.monotonic() + segundos)
+            elif 200 <= status_code < 400:
+                estado.taxa = min(self.taxa_maxima, estado.taxa + self.incremento)
+
+    def registrar_erro(self, url):
+        """
+        Reduz a taxa do host após um erro de conexão ou timeout.
+
+        Args:
+            url (str): URL da requisição.
+        """
+        with self._lock:
+            self._reduzir(self._estado(url))
+
+    def _reduzir(self, estado):
+        estado.taxa = max(self.taxa_minima, estado.taxa * self.fator_reducao)
+        estado.tokens = 0.0
+        estado.ultimo = time.monotonic()
+
+
+def interpretar_retry_after(valor):
+    """
+    Converte o cabeçalho Retry-After em segundos.
+
+    Args:
+        valor (str): Número de segundos ou data HTTP.
+
+    Returns:
+        float: Segundos de espera, ou None se o valor for inválido.
+    """
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except (TypeError, ValueError):
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+# Limitador compartilhado por todas as instâncias de RequisicoesLiberty
+LIMITADOR_COMPARTILHADO = LimitadorTaxa()
@@ -0,0 +1,342 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from classe_requisicoes.documentos import DocumentoAuto, ListaDocumentos
+from classe_requisicoes.escrita import ArquivoSalvo
+
+
+class ManifestoDownloads:
+    """
+    Manifesto persistente (SQLite) dos documentos de um lote.
+
+    Cada documento é identificado por processo + IDOnbase/idonbase e guarda
+    os metadados, a extensão resolvida, o tamanho, o SHA-256 e o status do
+    download. Uma nova execução da mesma planilha consulta o manifesto para
+    pular o que já foi concluído.
+
+    Atributos:
+        caminho (str): Caminho do arquivo SQLite.
+
+    Métodos:
+        - registrar(processo, id_onbase, fluxo, nome, num_documento, codigo_tipo): Registra um documento como pendente.
+        - extensao(processo, id_onbase): Retorna a extensão já resolvida do documento.
+        - arquivo_concluido(processo, id_onbase): Retorna o arquivo se o download já foi concluído e continua em disco.
+        - marcar_concluido(processo, id_onbase, arquivo, extensao): Registra o download concluído.
+        - marcar_falha(processo, id_onbase, erro): Registra a falha do download.
+        - pendentes(processo): Lista os documentos ainda não concluídos.
+        - numerar(processo, fluxo, documentos): Retorna os documentos com a numeração das execuções anteriores.
+        - sincronizar(processo, fluxo, documentos): Retorna só os documentos novos, com numeração estável.
+        - dono_do_arquivo(processo, pasta, nome_base): Retorna o IDOnbase que já usa o nome de arquivo.
+    """
+
+    STATUS_PENDENTE = "pendente"
+    STATUS_CONCLUIDO = "concluido"
+    STATUS_FALHOU = "falhou"
+
+    def __init__(self, caminho="manifesto_downloads.sqlite3"):
+        """
+        Abre (ou cria) o manifesto.
+
+        Args:
+            caminho (str): Caminho do arquivo SQLite.
+        """
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        with self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documentos (
+                    processo TEXT NOT NULL,
+                    id_onbase TEXT NOT NULL,
+                    fluxo TEXT,
+                    nome TEXT,
+                    num_documento INTEGER,
+                    codigo_tipo TEXT,
+                    extensao TEXT,
+                    caminho TEXT,
+                    tamanho INTEGER,
+                    sha256 TEXT,
+                    status TEXT NOT NULL,
+                    erro TEXT,
+                    atualizado_em TEXT,
+                    PRIMARY KEY (processo, id_onbase)
+                )
+                """
+            )
+
+    def _executar(self, sql, parametros=()):
+        with self._lock, self._conexao:
+            return self._conexao.execute(sql, parametros).fetchall()
+
+    def registrar(self, processo, id_onbase, fluxo=None, nome=None, num_documento=None, codigo_tipo=None):
+        """
+        Registra um documento como pendente, sem alterar documentos já existentes.
+
+        Args:
+            processo (int): Número do processo.
+            id_onbase (int): IDOnbase/idonbase do documento.
+            fluxo (str, optional): Fluxo de origem, ex: 'auto' ou 'danos_eletricos'.
+            nome (str, optional): NomeDocumento/descricao.
+            num_documento (int, optional): Sequencial do documento.
+            codigo_tipo (str, optional): Código do tipo de documento.
+        """
+        self._executar(
+            """
+            INSERT INTO documentos (processo, id_onbase, fluxo, nome, num_documento, codigo_tipo, status, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (processo, id_onbase) DO UPDATE SET
+                fluxo = excluded.fluxo,
+                nome = excluded.nome,
+                num_documento = excluded.num_documento,
+                codigo_tipo = excluded.codigo_tipo
+            """,
+            (str(processo), str(id_onbase), fluxo, nome, _inteiro(num_documento), _texto(codigo_tipo),
+             self.STATUS_PENDENTE, _agora()),
+        )
+
+    def extensao(self, processo, id_onbase):
+        """
+        Retorna a extensão já resolvida do documento.
+
+        Returns:
+            str: Extensão, ou None se ainda não foi resolvida.
+        """
+        linhas = self._executar(
+            "SELECT extensao FROM documentos WHERE processo = ? AND id_onbase = ?",
+            (str(processo), str(id_onbase)),
+        )
+        return linhas[0]["extensao"] if linhas else None
+
+    def arquivo_concluido(self, processo, id_onbase):
+        """
+        Retorna o arquivo do documento se o download já foi concluído.
+
+        O arquivo só é considerado concluído se ainda existir em disco com o
+        tamanho registrado.
+
+        Returns:
+            ArquivoSalvo: Arquivo concluído, ou None.
+        """
+        linhas = self._executar(
+            "SELECT caminho, tamanho, sha256 FROM documentos WHERE processo = ? AND id_onbase = ? AND status = ?",
+            (str(processo), str(id_onbase), self.STATUS_CONCLUIDO),
+        )
+        if not linhas:
+            return None
+        linha = linhas[0]
+        if not linha["caminho"] or not os.path.isfile(linha["caminho"]):
+            return None
+        if os.path.getsize(linha["caminho"]) != linha["tamanho"]:
+            return None
+        return ArquivoSalvo(linha["caminho"], linha["tamanho"], linha["sha256"])
+
+    def marcar_concluido(self, processo, id_onbase, arquivo: ArquivoSalvo, extensao=None):
+        """
+        Registra o download concluído do documento.
+
+        Args:
+            processo (int): Número do processo.
+            id_onbase (int): IDOnbase/idonbase do documento.
+            arquivo (ArquivoSalvo): Arquivo gravado.
+            extensao (str, optional): Extensão resolvida.
+        """
+        self._executar(
+            """
+            INSERT INTO documentos (processo, id_onbase, extensao, caminho, tamanho, sha256, status, erro, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)
+            ON CONFLICT (processo, id_onbase) DO UPDATE SET
+                extensao = COALESCE(excluded.extensao, documentos.extensao),
+                caminho = excluded.caminho,
+                tamanho = excluded.tamanho,
+                sha256 = excluded.sha256,
+                status = excluded.status,
+                erro = NULL,
+                atualizado_em = excluded.atualizado_em
+            """,
+            (str(processo), str(id_onbase), extensao, arquivo.caminho, arquivo.tamanho, arquivo.sha256,
+             self.STATUS_CONCLUIDO, _agora()),
+        )
+
+    def marcar_extensao(self, processo, id_onbase, extensao):
+        """
+        Registra a extensão resolvida do documento.
+        """
+        self._executar(
+            "UPDATE documentos SET extensao = ?, atualizado_em = ? WHERE processo = ? AND id_onbase = ?",
+            (extensao, _agora(), str(processo), str(id_onbase)),
+        )
+
+    def marcar_falha(self, processo, id_onbase, erro):
+        """
+        Registra a falha do download do documento.
+
+        Args:
+            processo (int): Número do processo.
+            id_onbase (int): IDOnbase/idonbase do documento.
+            erro (str): Descrição do erro.
+        """
+        self._executar(
+            """
+            INSERT INTO documentos (processo, id_onbase, status, erro, atualizado_em)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (processo, id_onbase) DO UPDATE SET
+                status = excluded.status,
+                erro = excluded.erro,
+                atualizado_em = excluded.atualizado_em
+            """,
+            (str(processo), str(id_onbase), self.STATUS_FALHOU, str(erro), _agora()),
+        )
+
+    def pendentes(self, processo=None):
+        """
+        Lista os documentos ainda não concluídos.
+
+        Args:
+            processo (int, optional): Filtra por processo.
+
+        Returns:
+            list: Linhas (sqlite3.Row) dos documentos pendentes ou com falha.
+        """
+        sql = "SELECT * FROM documentos WHERE status != ?"
+        parametros = [self.STATUS_CONCLUIDO]
+        if processo is not None:
+            sql += " AND processo = ?"
+            parametros.append(str(processo))
+        return self._executar(sql + " ORDER BY processo, nome, num_documento", parametros)
+
+    def numerar(self, processo, fluxo, documentos):
+        """
+        Aplica aos documentos da listagem atual a numeração das execuções anteriores.
+
+        Um documento é o mesmo de antes quando tem o mesmo IDOnbase/idonbase e
+        o mesmo NomeDocumento/descricao; ele mantém o num_documento registrado,
+        mesmo que a API passe a listá-lo em outra posição. Documentos novos (ou
+        reclassificados para outro nome) recebem o próximo número livre do
+        nome, para não sobrescrever arquivos já entregues, e são registrados
+        como pendentes.
+
+        Args:
+            processo (int): Número do processo.
+            fluxo (str): 'auto' ou 'danos_eletricos'.
+            documentos (iterable): DocumentoAuto ou DocumentoDanosEletricos da listagem atual.
+
+        Returns:
+            ListaDocumentos: Todos os documentos, com o num_documento estável.
+        """
+        return ListaDocumentos(documento for documento, _ in self._numerar(processo, fluxo, documentos))
+
+    def sincronizar(self, processo, fluxo, documentos):
+        """
+        Compara a lista atual de documentos do processo com a das execuções anteriores.
+
+        A numeração segue numerar(). O que já foi concluído não é baixado de
+        novo, mesmo que o arquivo não esteja mais na pasta do processo.
+
+        Args:
+            processo (int): Número do processo.
+            fluxo (str): 'auto' ou 'danos_eletricos'.
+            documentos (iterable): DocumentoAuto ou DocumentoDanosEletricos da listagem atual.
+
+        Returns:
+            ListaDocumentos: Os documentos novos e os que ainda não foram concluídos, com o
+                             num_documento estável.
+        """
+        return ListaDocumentos(
+            documento for documento, status in self._numerar(processo, fluxo, documentos)
+            if status != self.STATUS_CONCLUIDO
+        )
+
+    def dono_do_arquivo(self, processo, pasta, nome_base):
+        """
+        Retorna o documento que já usa um nome de arquivo na pasta do processo.
+
+        Args:
+            processo (int): Número do processo.
+            pasta (str): Pasta do arquivo.
+            nome_base (str): Nome do arquivo sem extensão.
+
+        Returns:
+            str: IDOnbase/idonbase do documento registrado com esse arquivo (qualquer extensão), ou None.
+        """
+        alvo = os.path.abspath(os.path.join(pasta, nome_base))
+        linhas = self._executar(
+            "SELECT id_onbase, caminho FROM documentos WHERE processo = ? AND caminho IS NOT NULL",
+            (str(processo),),
+        )
+        for linha in linhas:
+            if os.path.splitext(os.path.abspath(linha["caminho"]))[0] == alvo:
+                return linha["id_onbase"]
+        return None
+
+    def _numerar(self, processo, fluxo, documentos):
+        # Retorna (documento, status) na ordem da listagem; documentos novos entram como pendentes
+        numerados = []
+        with self._lock, self._conexao:
+            linhas = self._conexao.execute(
+                "SELECT id_onbase, nome, num_documento, status FROM documentos WHERE processo = ?",
+                (str(processo),),
+            ).fetchall()
+            anteriores = {linha["id_onbase"]: linha for linha in linhas}
+            ultimos = {}
+            for linha in linhas:
+                if linha["num_documento"] is not None:
+                    ultimos[linha["nome"]] = max(ultimos.get(linha["nome"], 0), linha["num_documento"])
+
+            for documento in documentos:
+                nome, codigo = _nome_e_codigo(documento)
+                anterior = anteriores.get(str(documento.id_onbase))
+                if anterior is not None and anterior["nome"] == nome and anterior["num_documento"] is not None:
+                    numerados.append((documento._replace(num_documento=anterior["num_documento"]), anterior["status"]))
+                    continue
+
+                ultimos[nome] = ultimos.get(nome, 0) + 1
+                documento = documento._replace(num_documento=ultimos[nome])
+                self._conexao.execute(
+                    """
+                    INSERT INTO documentos (processo, id_onbase, fluxo, nome, num_documento, codigo_tipo, status, atualizado_em)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (processo, id_onbase) DO UPDATE SET
+                        fluxo = excluded.fluxo,
+                        nome = excluded.nome,
+                        num_documento = excluded.num_documento,
+                        codigo_tipo = excluded.codigo_tipo,
+                        caminho = NULL,
+                        status = excluded.status,
+                        erro = NULL,
+                        atualizado_em = excluded.atualizado_em
+                    """,
+                    (str(processo), str(documento.id_onbase), fluxo, nome, documento.num_documento, _texto(codigo),
+                     self.STATUS_PENDENTE, _agora()),
+                )
+                numerados.append((documento, self.STATUS_PENDENTE))
+        return numerados
+
+    def fechar(self):
+        """
+        Fecha a conexão com o SQLite.
+        """
+        with self._lock:
+            self._conexao.close()
+
+
+def _nome_e_codigo(documento):
+    if isinstance(documento, DocumentoAuto):
+        return documento.nome_documento, documento.codigo_tipo_documento
+    return documento.descricao, documento.codigo
+
+
+def _agora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _inteiro(valor):
+    return None if valor is None else int(valor)
+
+
+def _texto(valor):
+    return None if valor is None else str(valor)
@@ -0,0 +1,351 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlparse
+from classe_rastreamento import RASTREADOR
+
+# Limites superiores (em segundos) dos intervalos do histograma de latência
+LIMITES_HISTOGRAMA = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+_PADRAO_IDENTIFICADOR = re.compile(r"[0-9a-fA-F-]{16,}|\d+")
+
+
+def _limite_texto(limite):
+    return "+Inf" if limite == float("inf") else limite
+
+
+def nome_endpoint(url):
+    """
+    Nome curto do endpoint de uma URL, usado para agrupar as métricas.
+
+    Números e identificadores longos (ex: IDOnbase, links assinados) viram
+    '{n}', para que todas as chamadas a uma mesma rota fiquem juntas.
+
+    Args:
+        url (str): URL da requisição.
+
+    Returns:
+        str: Host e caminho normalizados, ex: 'portalintegracao.yelumseguros.com.br/.../file_upload/{n}_api.pdf'.
+    """
+    partes = urlparse(url)
+    return f"{partes.hostname}{_PADRAO_IDENTIFICADOR.sub('{n}', partes.path)}"
+
+
+def medir_etapa(nome):
+    """
+    Decorador que mede um método como uma etapa do pipeline em self.metricas.
+
+    Com o RASTREADOR ativo, cada chamada também vira um span na linha do tempo.
+
+    Args:
+        nome (str): Nome da etapa.
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def medido(self, *args, **kwargs):
+            with self.metricas.etapa(nome), RASTREADOR.span(metodo.__name__, "etapa", etapa=nome):
+                return metodo(self, *args, **kwargs)
+        return medido
+    return decorador
+
+
+class _Histograma:
+    """
+    Histograma de durações com intervalos fixos, como os do Prometheus.
+    """
+
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * len(LIMITES_HISTOGRAMA)
+        self.soma = 0.0
+        self.total = 0
+
+    def registrar(self, duracao):
+        for indice, limite in enumerate(LIMITES_HISTOGRAMA):
+            if duracao <= limite:
+                self.contagens[indice] += 1
+                break
+        self.soma += duracao
+        self.total += 1
+
+    def percentil(self, p):
+        # Estimativa pelo limite superior do intervalo, como o histogram_quantile do Prometheus
+        if not self.total:
+            return None
+        alvo = self.total * p / 100
+        acumulado = 0
+        for limite, contagem in zip(LIMITES_HISTOGRAMA, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return LIMITES_HISTOGRAMA[-1]
+
+
+class _MetricasEndpoint:
+    __slots__ = ("requisicoes", "latencia", "transferencia", "bytes", "novas_tentativas", "erros_conexao", "status")
+
+    def __init__(self):
+        self.requisicoes = 0
+        self.latencia = _Histograma()
+        self.transferencia = _Histograma()
+        self.bytes = 0
+        self.novas_tentativas = 0
+        self.erros_conexao = 0
+        self.status = {}
+
+
+class ColetorMetricas:
+    """
+    Coleta métricas das chamadas HTTP e das etapas do pipeline.
+
+    Por endpoint: número de requisições, histograma da latência até os
+    cabeçalhos, histograma da transferência do corpo, bytes recebidos,
+    novas tentativas, erros de conexão e contagem por status HTTP. Por etapa
+    (login e orçamento por chamada, metadados por processo, extensoes, links
+    e transferencia por documento): histograma da duração e falhas. Seguro
+    para uso a partir de várias threads.
+
+    Métodos:
+        - registrar_requisicao(url, status, duracao, tentativa): Registra uma tentativa de requisição.
+        - registrar_erro_conexao(url, duracao, tentativa): Registra uma tentativa que falhou sem resposta.
+        - registrar_transferencia(url, quantidade_bytes, duracao): Registra a leitura do corpo de um download.
+        - etapa(nome): Context manager que mede uma etapa do pipeline.
+        - registrar_falha(nome): Conta uma falha de etapa tratada sem exceção.
+        - snapshot(): Retorna todas as métricas em um dicionário.
+        - json(): Snapshot em JSON.
+        - prometheus(): Snapshot no formato texto do Prometheus.
+        - tabela_endpoints() / tabela_etapas(): Linhas resumidas para exibição.
+    """
+
+    def __init__(self):
+        self._endpoints = {}
+        self._etapas = {}
+        self._falhas_etapas = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, url):
+        nome = nome_endpoint(url)
+        if nome not in self._endpoints:
+            self._endpoints[nome] = _MetricasEndpoint()
+        return self._endpoints[nome]
+
+    def registrar_requisicao(self, url, status, duracao, tentativa=1):
+        """
+        Registra uma tentativa de requisição que recebeu resposta.
+
+        Args:
+            url (str): URL da requisição.
+            status (int): Status HTTP da resposta.
+            duracao (float): Segundos até receber os cabeçalhos.
+            tentativa (int): Número da tentativa (a partir de 1).
+        """
+        with self._lock:
+            metricas = self._endpoint(url)
+            metricas.requisicoes += 1
+            metricas.latencia.registrar(duracao)
+            metricas.status[status] = metricas.status.get(status, 0) + 1
+            if tentativa > 1:
+                metricas.novas_tentativas += 1
+
+    def registrar_erro_conexao(self, url, duracao, tentativa=1):
+        """
+        Registra uma tentativa de requisição que falhou sem resposta (timeout, conexão recusada...).
+
+        Args:
+            url (str): URL da requisição.
+            duracao (float): Segundos até o erro.
+            tentativa (int): Número da tentativa (a partir de 1).
+        """
+        with self._lock:
+            metricas = self._endpoint(url)
+            metricas.requisicoes += 1
+            metricas.erros_conexao += 1
+            metricas.latencia.registrar(duracao)
+            if tentativa > 1:
+                metricas.novas_tentativas += 1
+
+    def registrar_transferencia(self, url, quantidade_bytes, duracao):
+        """
+        Registra a leitura do corpo de uma resposta em streaming.
+
+        Args:
+            url (str): URL do arquivo.
+            quantidade_bytes (int): Bytes recebidos.
+            duracao (float): Segundos gastos lendo e gravando o corpo.
+        """
+        with self._lock:
+            metricas = self._endpoint(url)
+            metricas.bytes += quantidade_bytes
+            metricas.transferencia.registrar(duracao)
+
+    @contextmanager
+    def etapa(self, nome):
+        """
+        Mede a duração de uma etapa do pipeline, contando as falhas.
+
+        Args:
+            nome (str): Nome da etapa, ex: 'login', 'metadados', 'extensoes', 'transferencia'.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.registrar_falha(nome)
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self._lock:
+                self._etapas.setdefault(nome, _Histograma()).registrar(duracao)
+
+    def registrar_falha(self, nome):
+        """
+        Conta uma falha da etapa, para quando o erro é tratado sem levantar exceção.
+
+        Args:
+            nome (str): Nome da etapa.
+        """
+        with self._lock:
+            self._falhas_etapas[nome] = self._falhas_etapas.get(nome, 0) + 1
+
+    def snapshot(self):
+        """
+        Retorna todas as métricas coletadas até agora.
+
+        Returns:
+            dict: {'endpoints': {...}, 'etapas': {...}}, com os histogramas como
+                  contagens por limite superior (não cumulativas).
+        """
+        with self._lock:
+            return {
+                "endpoints": {
+                    nome: {
+                        "requisicoes": metricas.requisicoes,
+                        "novas_tentativas": metricas.novas_tentativas,
+                        "erros_conexao": metricas.erros_conexao,
+                        "status": {str(status): total for status, total in sorted(metricas.status.items())},
+                        "bytes": metricas.bytes,
+                        "latencia": self._histograma_dict(metricas.latencia),
+                        "transferencia": self._histograma_dict(metricas.transferencia),
+                    }
+                    for nome, metricas in sorted(self._endpoints.items())
+                },
+                "etapas": {
+                    nome: {**self._histograma_dict(histograma), "falhas": self._falhas_etapas.get(nome, 0)}
+                    for nome, histograma in sorted(self._etapas.items())
+                },
+            }
+
+    @staticmethod
+    def _histograma_dict(histograma):
+        return {
+            "total": histograma.total,
+            "soma_segundos": round(histograma.soma, 6),
+            "p50": _limite_texto(histograma.percentil(50)),
+            "p95": _limite_texto(histograma.percentil(95)),
+            "intervalos": {
+                str(_limite_texto(limite)): contagem
+                for limite, contagem in zip(LIMITES_HISTOGRAMA, histograma.contagens)
+            },
+        }
+
+    def json(self):
+        """
+        Returns:
+            str: Snapshot das métricas em JSON.
+        """
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def prometheus(self):
+        """
+        Snapshot no formato de exposição em texto do Prometheus.
+
+        Returns:
+            str: Métricas prontas para um endpoint /metrics ou um arquivo do node_exporter.
+        """
+        linhas = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            etapas = sorted(self._etapas.items())
+            falhas_etapas = dict(self._falhas_etapas)
+
+            linhas.append("# TYPE liberty_requisicoes_total counter")
+            for nome, metricas in endpoints:
+                for status, total in sorted(metricas.status.items()):
+                    linhas.append(f'liberty_requisicoes_total{{endpoint="{nome}",status="{status}"}} {total}')
+                if metricas.erros_conexao:
+                    linhas.append(f'liberty_requisicoes_total{{endpoint="{nome}",status="erro"}} {metricas.erros_conexao}')
+
+            linhas.append("# TYPE liberty_novas_tentativas_total counter")
+            for nome, metricas in endpoints:
+                linhas.append(f'liberty_novas_tentativas_total{{endpoint="{nome}"}} {metricas.novas_tentativas}')
+
+            linhas.append("# TYPE liberty_bytes_recebidos_total counter")
+            for nome, metricas in endpoints:
+                linhas.append(f'liberty_bytes_recebidos_total{{endpoint="{nome}"}} {metricas.bytes}')
+
+            for metrica, atributo in (("liberty_latencia_segundos", "latencia"),
+                                      ("liberty_transferencia_segundos", "transferencia")):
+                linhas.append(f"# TYPE {metrica} histogram")
+                for nome, metricas in endpoints:
+                    linhas.extend(self._linhas_histograma(metrica, f'endpoint="{nome}"', getattr(metricas, atributo)))
+
+            linhas.append("# TYPE liberty_etapa_segundos histogram")
+            for nome, histograma in etapas:
+                linhas.extend(self._linhas_histograma("liberty_etapa_segundos", f'etapa="{nome}"', histograma))
+
+            linhas.append("# TYPE liberty_etapa_falhas_total counter")
+            for nome, _ in etapas:
+                linhas.append(f'liberty_etapa_falhas_total{{etapa="{nome}"}} {falhas_etapas.get(nome, 0)}')
+
+        return "\n".join(linhas) + "\n"
+
+    @staticmethod
+    def _linhas_histograma(metrica, rotulo, histograma):
+        linhas = []
+        acumulado = 0
+        for limite, contagem in zip(LIMITES_HISTOGRAMA, histograma.contagens):
+            acumulado += contagem
+            linhas.append(f'{metrica}_bucket{{{rotulo},le="{_limite_texto(limite)}"}} {acumulado}')
+        linhas.append(f"{metrica}_sum{{{rotulo}}} {histograma.soma}")
+        linhas.append(f"{metrica}_count{{{rotulo}}} {histograma.total}")
+        return linhas
+
+    def tabela_endpoints(self):
+        """
+        Returns:
+            list: Uma linha (dict) por endpoint, para exibir em tabela.
+        """
+        return [
+            {
+                "endpoint": nome,
+                "requisicoes": dados["requisicoes"],
+                "novas tentativas": dados["novas_tentativas"],
+                "erros de conexão": dados["erros_conexao"],
+                "status": ", ".join(f"{status}: {total}" for status, total in dados["status"].items()),
+                "latência p50 (s)": dados["latencia"]["p50"],
+                "latência p95 (s)": dados["latencia"]["p95"],
+                "MB recebidos": round(dados["bytes"] / (1024 * 1024), 2),
+            }
+            for nome, dados in self.snapshot()["endpoints"].items()
+        ]
+
+    def tabela_etapas(self):
+        """
+        Returns:
+            list: Uma linha (dict) por etapa do pipeline, para exibir em tabela.
+        """
+        return [
+            {
+                "etapa": nome,
+                "execuções": dados["total"],
+                "falhas": dados["falhas"],
+                "tempo total (s)": round(dados["soma_segundos"], 2),
+                "p50 (s)": dados["p50"],
+                "p95 (s)": dados["p95"],
+            }
+            for nome, dados in self.snapshot()["etapas"].items()
+        ]
@@ -0,0 +1,110 @@
+import random
+import threading
+from collections import namedtuple
+
+from classe_rastreamento import RASTREADOR
+
+DocumentoAdiado = namedtuple("DocumentoAdiado", ["processo", "documento", "tentar", "tentativas", "erro"])
+DocumentoAdiado.__doc__ = """
+Documento cujo download falhou e aguarda uma nova tentativa.
+
+Atributos:
+    processo (int): Número do processo.
+    documento (DocumentoAuto | DocumentoDanosEletricos): Documento que falhou.
+    tentar (callable): Função sem argumentos que baixa o documento de novo e retorna o ArquivoSalvo.
+    tentativas (int): Quantas vezes o documento já falhou.
+    erro (Exception): Último erro.
+"""
+
+
+class FilaRepeticao:
+    """
+    Fila de documentos que falharam, para novas tentativas no fim do lote.
+
+    Uma falha em um documento não interrompe o processo: o documento é
+    adiado e os demais continuam. Ao final do lote, drenar() tenta de novo
+    os adiados em rodadas, com espera exponencial e jitter entre elas. O que
+    continuar falhando fica marcado como 'falhou' no manifesto e é retomado
+    por uma execução posterior.
+
+    Métodos:
+        - adiar(processo, documento, erro, tentar): Adiciona um documento à fila.
+        - adiados(processo): Lista os documentos na fila.
+        - drenar(max_rodadas, espera_base, espera_maxima, ao_recuperar): Tenta de novo os documentos da fila.
+    """
+
+    def __init__(self):
+        self._itens = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._itens)
+
+    def adiar(self, processo, documento, erro, tentar, tentativas=1):
+        """
+        Adiciona um documento à fila.
+
+        Args:
+            processo (int): Número do processo.
+            documento (DocumentoAuto | DocumentoDanosEletricos): Documento que falhou.
+            erro (Exception): Erro do download.
+            tentar (callable): Função sem argumentos que baixa o documento de novo.
+            tentativas (int): Quantas vezes o documento já falhou.
+        """
+        with self._lock:
+            self._itens.append(DocumentoAdiado(processo, documento, tentar, tentativas, erro))
+
+    def adiados(self, processo=None):
+        """
+        Lista os documentos na fila.
+
+        Args:
+            processo (int, optional): Filtra por processo.
+
+        Returns:
+            list: DocumentoAdiado na ordem em que falharam.
+        """
+        with self._lock:
+            return [item for item in self._itens if processo is None or item.processo == processo]
+
+    def drenar(self, max_rodadas=3, espera_base=2.0, espera_maxima=60.0, ao_recuperar=None):
+        """
+        Tenta de novo os documentos da fila.
+
+        Antes de cada rodada espera um tempo sorteado entre 0 e
+        min(espera_maxima, espera_base * 2 ** rodada) ("full jitter"), para que
+        as novas tentativas não cheguem juntas ao servidor. Documentos que
+        falham de novo voltam para a fila para a rodada seguinte.
+
+        Args:
+            max_rodadas (int): Número máximo de rodadas.
+            espera_base (float): Espera máxima, em segundos, antes da primeira rodada.
+            espera_maxima (float): Limite da espera entre rodadas.
+            ao_recuperar (callable, optional): Chamada como ao_recuperar(item, arquivo) a cada documento recuperado.
+
+        Returns:
+            list: Tuplas (DocumentoAdiado, ArquivoSalvo) dos documentos recuperados. Os que
+                  continuarem falhando permanecem na fila.
+        """
+        recuperados = []
+        for rodada in range(max_rodadas):
+            with self._lock:
+                pendentes, self._itens = self._itens, []
+            if not pendentes:
+                break
+            RASTREADOR.dormir(random.uniform(0, min(espera_maxima, espera_base * 2 ** rodada)),
+                              "aguardar nova tentativa")
+            for item in pendentes:
+                try:
+                    arquivo = item.tentar()
+                    erro = None
+                except Exception as e:
+                    arquivo, erro = None, e
+                if arquivo is None:
+                    self.adiar(item.processo, item.documento, erro or item.erro, item.tentar, item.tentativas + 1)
+                    continue
+                recuperados.append((item, arquivo))
+                if ao_recuperar is not None:
+                    ao_recuperar(item, arquivo)
+        return recuperados
@@ -0,0 +1,125 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def montar_pool(sessao, tamanho_pool=10):
+    """
+    Configura o pool de conexões de uma sessão, para reaproveitar conexões entre requisições.
+
+    Args:
+        sessao (requests.Session): Sessão a configurar.
+        tamanho_pool (int): Número máximo de conexões mantidas por host.
+
+    Returns:
+        requests.Session: A própria sessão.
+    """
+    adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+class GerenciadorSessao:
+    """
+    Mantém uma única sessão autenticada para todo o lote de processos.
+
+    A mesma requests.Session (e seu pool de conexões) é compartilhada por
+    todos os processos. A autenticação é feita apenas na primeira chamada e
+    repetida somente quando o servidor indica sessão expirada (401/403).
+
+    Atributos:
+        autenticar (callable): Função que autentica uma sessão, ex: RequisicoesLiberty.autenticar.
+        tamanho_pool (int): Número máximo de conexões mantidas por host.
+        geracao (int): Contador incrementado a cada autenticação.
+
+    Métodos:
+        - obter_sessao(): Retorna a sessão autenticada, autenticando na primeira chamada.
+        - reautenticar(geracao): Autentica novamente se a sessão ainda for da geração informada.
+        - adotar(sessao): Passa a compartilhar uma sessão já autenticada por outro meio (ex: o navegador).
+        - fechar(): Encerra a sessão e suas conexões.
+    """
+
+    def __init__(self, autenticar, tamanho_pool=10):
+        """
+        Inicializa o gerenciador sem autenticar.
+
+        Args:
+            autenticar (callable): Recebe uma requests.Session e realiza o login nela.
+            tamanho_pool (int): Número máximo de conexões mantidas por host.
+        """
+        self.autenticar = autenticar
+        self.tamanho_pool = tamanho_pool
+        self.geracao = 0
+        self.sessao = None
+        self._lock = threading.Lock()
+
+    def _criar_sessao(self):
+        return montar_pool(requests.Session(), self.tamanho_pool)
+
+    def obter_sessao(self):
+        """
+        Retorna a sessão compartilhada, autenticando-a na primeira chamada.
+
+        Returns:
+            requests.Session: Sessão autenticada.
+
+        Raises:
+            requests.HTTPError: Se a autenticação falhar.
+        """
+        with self._lock:
+            if self.sessao is None:
+                sessao = self._criar_sessao()
+                self.autenticar(sessao)
+                self.sessao = sessao
+                self.geracao += 1
+            return self.sessao
+
+    def adotar(self, sessao):
+        """
+        Passa a compartilhar uma sessão autenticada fora do gerenciador.
+
+        Usado para reaproveitar o login feito no navegador. Se essa sessão
+        expirar, reautenticar faz o login pela API na mesma sessão.
+
+        Args:
+            sessao (requests.Session): Sessão já autenticada.
+
+        Returns:
+            requests.Session: A própria sessão, com o pool de conexões configurado.
+        """
+        montar_pool(sessao, self.tamanho_pool)
+        with self._lock:
+            self.sessao = sessao
+            self.geracao += 1
+        return sessao
+
+    def reautenticar(self, geracao):
+        """
+        Autentica novamente a sessão compartilhada.
+
+        Várias threads podem detectar a expiração ao mesmo tempo; apenas a
+        primeira refaz o login, as demais reaproveitam a nova autenticação.
+
+        Args:
+            geracao (int): Geração da sessão usada na requisição que falhou.
+
+        Returns:
+            bool: True se o login foi refeito por esta chamada.
+        """
+        with self._lock:
+            if self.sessao is None or geracao != self.geracao:
+                return False
+            self.sessao.cookies.clear()
+            self.autenticar(self.sessao)
+            self.geracao += 1
+            return True
+
+    def fechar(self):
+        """
+        Encerra a sessão compartilhada e libera as conexões do pool.
+        """
+        with self._lock:
+            if self.sessao is not None:
+                self.sessao.close()
+                self.sessao = None